@@ -0,0 +1,454 @@
+"""Synthetic load test for the bot's command handlers.
+
+Replays a generated stream of fake Telegram updates (``/mood``,
+``/moodstats``, ``/habit``, ``/habit_done``, ``/habits`` and ``/reflect``)
+against temporary databases and a local stub of the OpenAI API. Updates are
+dispatched through :class:`bot.concurrency.PerUserUpdateProcessor`, just like
+in the running bot. The latency of every update is measured from its dispatch
+to the end of its handler, so waiting for the user's earlier updates and for
+a free concurrency slot is included.
+
+By default the GPT service runs without the reflection cache and rate
+limits, so every ``/reflect`` reaches the stub; ``--production-gpt`` adds
+them with the bot's settings.
+
+Example::
+
+    python benchmarks/bench_handlers.py --users 50 --updates 2000 \\
+        --concurrency 16 --output results.json --baseline previous.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+import openai
+
+from bot import handler, reflect_handler
+from bot.concurrency import PerUserUpdateProcessor
+from openai_stub import OpenAIStub
+from services import async_db
+from services.container import container
+
+DEFAULT_MIX = {
+    "mood": 20,
+    "moodstats": 15,
+    "habit": 10,
+    "habit_done": 20,
+    "habits": 20,
+    "reflect": 15,
+}
+HANDLERS: Dict[str, Callable[[Any, Any], Awaitable[None]]] = {
+    "mood": handler.mood,
+    "moodstats": handler.moodstats,
+    "habit": handler.habit,
+    "habit_done": handler.habit_done,
+    "habits": handler.habits,
+    "reflect": reflect_handler.reflect,
+}
+# Replies that mean the command failed or was refused, including the rate
+# limit and the template fallback.
+ERROR_MARKERS = (
+    "Fehler",
+    "nicht verfügbar",
+    "nicht erreichbar",
+    "zu lange",
+    "Bitte warte",
+    "stark gefragt",
+)
+MOODS = ["gut", "müde", "gestresst", "entspannt", "😊"]
+STYLES = ["motivierend", "analytisch", "humorvoll"]
+SETUP_HABIT = "Lesen"
+
+Workload = List[Tuple[str, int, List[str]]]
+
+
+@dataclass
+class BenchmarkConfig:
+    """Parameters of one benchmark run.
+
+    Attributes:
+        users: Number of distinct simulated users.
+        updates: Number of updates in the generated stream.
+        concurrency: Updates processed at once, as ``MAX_CONCURRENT_UPDATES``.
+        rate: Updates dispatched per second; ``0`` dispatches all at once.
+        mix: Relative weight of every command in the stream.
+        model_latency: Seconds the OpenAI stub waits before answering.
+        telegram_latency: Seconds every simulated reply or edit takes.
+        seed: Seed of the workload generator; equal seeds replay equal streams.
+        production_gpt: Use the bot's reflection cache and rate limits instead
+            of sending every ``/reflect`` to the model.
+    """
+
+    users: int = 20
+    updates: int = 500
+    concurrency: int = 16
+    rate: float = 0.0
+    mix: Dict[str, int] = field(default_factory=lambda: dict(DEFAULT_MIX))
+    model_latency: float = 0.05
+    telegram_latency: float = 0.0
+    seed: int = 1
+    production_gpt: bool = False
+
+
+class FakeMessage:
+    """Message stand-in that records the bot's replies and edits."""
+
+    def __init__(self, latency: float, texts: List[str]) -> None:
+        self._latency = latency
+        self.texts = texts
+
+    async def reply_text(self, text: str) -> "FakeMessage":
+        await self._send(text)
+        return FakeMessage(self._latency, self.texts)
+
+    async def edit_text(self, text: str) -> None:
+        await self._send(text)
+
+    async def _send(self, text: str) -> None:
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        self.texts.append(text)
+
+
+def make_update(user_id: int, latency: float = 0.0) -> SimpleNamespace:
+    """Return a fake ``Update`` of a private chat with ``user_id``."""
+    return SimpleNamespace(
+        effective_user=SimpleNamespace(id=user_id),
+        effective_chat=SimpleNamespace(id=user_id),
+        message=FakeMessage(latency, []),
+    )
+
+
+def make_context(args: List[str], bot_data: Dict[str, Any]) -> SimpleNamespace:
+    """Return a fake callback context carrying ``args``."""
+    return SimpleNamespace(
+        args=args, application=SimpleNamespace(bot_data=bot_data)
+    )
+
+
+def generate_workload(config: BenchmarkConfig) -> Workload:
+    """Return ``(command, user_id, args)`` for every update of the stream."""
+    rng = random.Random(config.seed)
+    commands = list(config.mix)
+    weights = [config.mix[command] for command in commands]
+    workload = []
+    for index in range(config.updates):
+        command = rng.choices(commands, weights)[0]
+        user_id = rng.randint(1, config.users)
+        if command == "mood":
+            args = [rng.choice(MOODS)]
+        elif command == "habit":
+            args = [f"Gewohnheit {index}"]
+        elif command == "habit_done":
+            args = [SETUP_HABIT]
+        elif command == "reflect":
+            # distinct texts, so no request is answered by a coalesced one
+            args = [rng.choice(STYLES), f"Tag {index} war anstrengend."]
+        else:
+            args = []
+        workload.append((command, user_id, args))
+    return workload
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Return the nearest-rank ``q`` percentile (``0 < q <= 100``)."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def _is_error(texts: List[str]) -> bool:
+    """Return whether the bot answered with an error or refusal."""
+    return any(marker in text for text in texts for marker in ERROR_MARKERS)
+
+
+def summarize(
+    samples: Dict[str, List[float]],
+    errors: Dict[str, int],
+    elapsed: float,
+) -> Dict[str, Any]:
+    """Return throughput and latency percentiles in milliseconds per command."""
+    commands = {}
+    for command, values in sorted(samples.items()):
+        commands[command] = {
+            "count": len(values),
+            "errors": errors.get(command, 0),
+            "mean_ms": round(sum(values) / len(values) * 1000, 3),
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+            "max_ms": round(max(values) * 1000, 3),
+        }
+    total = sum(len(values) for values in samples.values())
+    return {
+        "updates": total,
+        "duration_s": round(elapsed, 3),
+        "throughput_per_s": round(total / elapsed, 2) if elapsed else 0.0,
+        "commands": commands,
+    }
+
+
+def _create_gpt_service(workdir: Path, production: bool) -> Any:
+    """Build a GPT service that keeps its files in ``workdir``.
+
+    Args:
+        workdir: Directory for the interaction log and the cache.
+        production: Add the reflection cache and the rate limits configured in
+            :mod:`bot.reflect_handler`; without them every request reaches
+            the model.
+    """
+    from services.gpt_service import GPTService
+    from services.rate_limit import KeyedRateLimiter, TokenBucket
+    from services.reflection_cache import ReflectionCache
+    from services.resilience import CircuitBreaker, TemplateFallback
+
+    extras: Dict[str, Any] = {}
+    if production:
+        extras = {
+            "cache": ReflectionCache(db_path=workdir / "reflection_cache.db"),
+            "user_limiter": KeyedRateLimiter(
+                reflect_handler.USER_BURST,
+                reflect_handler.USER_REFLECTIONS_PER_HOUR / 3600,
+            ),
+            "global_limiter": TokenBucket(
+                reflect_handler.GLOBAL_BURST,
+                reflect_handler.GLOBAL_REFLECTIONS_PER_SECOND,
+            ),
+        }
+    return GPTService(
+        log_path=workdir / "gpt_logs.db",
+        legacy_log_path=workdir / "gpt_logs.json",
+        breaker=CircuitBreaker(),
+        fallback=TemplateFallback(),
+        **extras,
+    )
+
+
+async def run(config: BenchmarkConfig, workdir: Path) -> Dict[str, Any]:
+    """Replay a generated workload and return the summarized measurements.
+
+    Args:
+        config: Benchmark parameters.
+        workdir: Empty directory for the temporary databases.
+    """
+    saved = (async_db.mood_db_path, async_db.habit_db_path, openai.api_base)
+    saved_key = os.environ.get("OPENAI_API_KEY")
+    stub = OpenAIStub(config.model_latency)
+    await stub.start()
+    async_db.configure(workdir / "mood.db", workdir / "habits.db")
+    openai.api_base = stub.api_base
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    container.register(
+        "gpt", lambda: _create_gpt_service(workdir, config.production_gpt)
+    )
+    bot_data: Dict[str, Any] = {"admin_ids": frozenset()}
+    workload = generate_workload(config)
+    samples: Dict[str, List[float]] = {command: [] for command in config.mix}
+    errors: Dict[str, int] = {}
+
+    async def handle(command: str, update: Any, context: Any) -> bool:
+        """Run the handler and return whether it failed."""
+        try:
+            await HANDLERS[command](update, context)
+        except Exception:
+            return True
+        return _is_error(update.message.texts)
+
+    async def dispatch(
+        processor: PerUserUpdateProcessor, index: int, start: float
+    ) -> None:
+        command, user_id, args = workload[index]
+        if config.rate:
+            await asyncio.sleep(start + index / config.rate - time.perf_counter())
+        update = make_update(user_id, config.telegram_latency)
+        outcome: List[bool] = []
+
+        async def call() -> None:
+            outcome.append(await handle(command, update, make_context(args, bot_data)))
+
+        dispatched = time.perf_counter()
+        await processor.process_update(update, call())
+        samples[command].append(time.perf_counter() - dispatched)
+        if outcome[0]:
+            errors[command] = errors.get(command, 0) + 1
+
+    try:
+        await asyncio.gather(
+            *(
+                handler.habit(make_update(user_id), make_context([SETUP_HABIT], {}))
+                for user_id in range(1, config.users + 1)
+            )
+        )
+        processor = PerUserUpdateProcessor(config.concurrency)
+        async with processor:
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(dispatch(processor, i, start) for i in range(len(workload)))
+            )
+            elapsed = time.perf_counter() - start
+    finally:
+        await reflect_handler.close()
+        await stub.stop()
+        container.register("gpt", reflect_handler._create_gpt_service)
+        async_db.configure(saved[0], saved[1])
+        openai.api_base = saved[2]
+        if saved_key is None:
+            os.environ.pop("OPENAI_API_KEY", None)
+        else:
+            os.environ["OPENAI_API_KEY"] = saved_key
+
+    result = summarize({c: v for c, v in samples.items() if v}, errors, elapsed)
+    result["model_requests"] = stub.requests
+    return result
+
+
+def _git_revision() -> str | None:
+    """Return the checked-out revision, or ``None`` outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Return one line per command comparing p50 and p99 with ``baseline``."""
+    lines = []
+    for command, current in result["commands"].items():
+        before = baseline.get("commands", {}).get(command)
+        if before is None:
+            continue
+        parts = []
+        for key in ("p50_ms", "p99_ms"):
+            old, new = before[key], current[key]
+            change = (new - old) / old * 100 if old else 0.0
+            parts.append(f"{key[:3]} {old:.1f} -> {new:.1f} ({change:+.0f}%)")
+        lines.append(f"{command:<11} " + ", ".join(parts))
+    return lines
+
+
+def _format_table(result: Dict[str, Any]) -> str:
+    lines = [
+        f"{'command':<11} {'count':>6} {'errors':>6} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    ]
+    for command, stats in result["commands"].items():
+        lines.append(
+            f"{command:<11} {stats['count']:>6} {stats['errors']:>6} "
+            f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}"
+        )
+    lines.append(
+        f"{result['updates']} updates in {result['duration_s']:.2f}s "
+        f"({result['throughput_per_s']:.1f}/s)"
+    )
+    return "\n".join(lines)
+
+
+def _parse_mix(value: str) -> Dict[str, int]:
+    """Parse ``mood=3,reflect=1`` into command weights."""
+    mix = {}
+    for part in value.split(","):
+        command, _, weight = part.partition("=")
+        if command not in HANDLERS:
+            raise argparse.ArgumentTypeError(f"unknown command {command!r}")
+        mix[command] = int(weight or 1)
+    return mix
+
+
+def main(argv: List[str] | None = None) -> Dict[str, Any]:
+    """Run the benchmark from the command line and return its result."""
+    defaults = BenchmarkConfig()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--updates", type=int, default=defaults.updates)
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=defaults.rate,
+        help="updates dispatched per second; 0 sends all at once",
+    )
+    parser.add_argument(
+        "--mix",
+        type=_parse_mix,
+        default=defaults.mix,
+        help="command weights, e.g. mood=3,reflect=1",
+    )
+    parser.add_argument(
+        "--model-latency",
+        type=float,
+        default=defaults.model_latency,
+        help="seconds the OpenAI stub waits",
+    )
+    parser.add_argument(
+        "--telegram-latency",
+        type=float,
+        default=defaults.telegram_latency,
+        help="seconds every reply or edit takes",
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument(
+        "--production-gpt",
+        action="store_true",
+        help="use the bot's reflection cache and rate limits",
+    )
+    parser.add_argument("--output", type=Path, help="write the result as JSON")
+    parser.add_argument("--baseline", type=Path, help="earlier JSON result")
+    args = parser.parse_args(argv)
+
+    config = BenchmarkConfig(
+        users=args.users,
+        updates=args.updates,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        mix=args.mix,
+        model_latency=args.model_latency,
+        telegram_latency=args.telegram_latency,
+        seed=args.seed,
+        production_gpt=args.production_gpt,
+    )
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        measured = asyncio.run(run(config, Path(workdir)))
+    result = {
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": asdict(config),
+        **measured,
+    }
+    print(_format_table(result))
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text())
+        print(f"\ncompared with {args.baseline}:")
+        print("\n".join(compare(result, baseline)))
+    if args.output is not None:
+        args.output.write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n")
+    return result
+
+
+if __name__ == "__main__":
+    main()
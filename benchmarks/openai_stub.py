@@ -0,0 +1,96 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Answers ``POST /v1/chat/completions`` with a fixed reflection after a
+configurable delay, either as one JSON body or as a server-sent event stream,
+so benchmarks measure the bot and not the network or the model.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import Any, Dict
+
+from aiohttp import web
+
+REPLY = (
+    "Du hast heute bewusst auf dich geachtet. "
+    "Was möchtest du morgen davon beibehalten?"
+)
+
+
+class OpenAIStub:
+    """Serve canned chat completions on ``127.0.0.1``.
+
+    Attributes:
+        latency: Seconds to wait before the response, or before the first
+            streamed part.
+        chunk_delay: Seconds between two streamed parts.
+        requests: Number of completion requests received.
+    """
+
+    def __init__(self, latency: float = 0.05, chunk_delay: float = 0.0) -> None:
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self._runner: web.AppRunner | None = None
+        self.port = 0
+
+    @property
+    def api_base(self) -> str:
+        """Return the value for ``openai.api_base``."""
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    async def start(self) -> None:
+        """Start listening on a free port."""
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._completions)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        """Stop the server."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        if not body.get("stream"):
+            return web.json_response(
+                _completion(
+                    body["model"],
+                    {"message": {"role": "assistant", "content": REPLY}},
+                    usage={"prompt_tokens": 50, "completion_tokens": 20},
+                )
+            )
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream"}
+        )
+        await response.prepare(request)
+        for word in REPLY.split(" "):
+            chunk = _completion(body["model"], {"delta": {"content": word + " "}})
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+
+def _completion(model: str, choice: Dict[str, Any], **extra: Any) -> Dict[str, Any]:
+    """Return a chat completion object with a single choice."""
+    return {
+        "id": "chatcmpl-benchmark",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "finish_reason": None, **choice}],
+        **extra,
+    }
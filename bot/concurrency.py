@@ -0,0 +1,95 @@
+"""Concurrent update processing that keeps each user's updates in order."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+from typing import Any, Awaitable, Dict
+
+from telegram.ext import BaseUpdateProcessor
+
+MAX_CONCURRENT_UPDATES = 16
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates of different users concurrently.
+
+    Updates from the same user are handled one after another in the order they
+    arrived, so e.g. two quick ``/habit_done`` calls never interleave. Updates
+    without a user fall back to their chat; updates with neither run freely.
+
+    At most ``max_concurrent_updates`` updates run at once. An update only
+    takes a slot once it is its user's turn, so a user with a slow
+    ``/reflect`` and queued follow-ups occupies a single slot and never
+    delays other users.
+    """
+
+    __slots__ = ("_limit", "_locks", "_pending", "_running", "_slots")
+
+    def __init__(self, max_concurrent_updates: int = MAX_CONCURRENT_UPDATES) -> None:
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        # The base class acquires its semaphore before do_process_update, i.e.
+        # before the per-user lock, so it gets no effective limit; _slots
+        # enforces the real one. It sizes its semaphore from the
+        # max_concurrent_updates property, hence _limit is set afterwards.
+        self._limit = sys.maxsize
+        super().__init__(sys.maxsize)
+        self._limit = max_concurrent_updates
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        self._running = 0
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._pending: Dict[int, int] = {}
+
+    @property
+    def max_concurrent_updates(self) -> int:
+        """The maximum number of updates processed at once."""
+        return self._limit
+
+    @property
+    def current_concurrent_updates(self) -> int:
+        """The number of updates currently being processed."""
+        return self._running
+
+    @staticmethod
+    def _key(update: object) -> int | None:
+        """Return the ID whose updates must be serialized."""
+        user = getattr(update, "effective_user", None)
+        if user is not None:
+            return user.id
+        chat = getattr(update, "effective_chat", None)
+        return chat.id if chat is not None else None
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        """Await ``coroutine`` once a concurrency slot is free."""
+        async with self._slots:
+            self._running += 1
+            try:
+                await coroutine
+            finally:
+                self._running -= 1
+
+    async def do_process_update(
+        self, update: object, coroutine: Awaitable[Any]
+    ) -> None:
+        """Await ``coroutine`` once no earlier update of the same user runs."""
+        key = self._key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._pending[key] = self._pending.get(key, 0) + 1
+        try:
+            async with lock:
+                await self._run(coroutine)
+        finally:
+            self._pending[key] -= 1
+            if not self._pending[key]:
+                del self._pending[key]
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        """Nothing to set up."""
+
+    async def shutdown(self) -> None:
+        """Nothing to release."""
@@ -5,15 +5,19 @@ from __future__ import annotations
 import logging
 from telegram import Update
 from telegram.ext import ContextTypes
-from datetime import date, datetime, timedelta
-from collections import Counter
+from datetime import date, datetime
 import sqlite3
 
-from services import mood_service, habit_service
+from services import async_db, metrics
+from services.metrics import instrument_handler
 
 logger = logging.getLogger(__name__)
 
+MAX_HISTORY_DAYS = 365
+MAX_MESSAGE_LENGTH = 4096
 
+
+@instrument_handler
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the ``/start`` command.
 
@@ -31,6 +35,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         raise
 
 
+@instrument_handler
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the ``/help`` command.
 
@@ -50,6 +55,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         raise
 
 
+@instrument_handler
 async def mood(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the ``/mood`` command.
 
@@ -64,14 +70,11 @@ async def mood(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
     mood_text = " ".join(context.args)
     try:
-        previous = mood_service.get_last_mood(user_id)
-        mood_service.save_mood(user_id, mood_text, datetime.utcnow())
-
-        start = date.today() - timedelta(days=6)
-        week_entries = mood_service.get_moods(user_id, start, date.today())
-        chart = "".join(m for _, m in week_entries)
-        counts = Counter(m for _, m in week_entries)
-        stats = ", ".join(f"{m}: {c}" for m, c in counts.items())
+        previous, summary = await async_db.record_mood(
+            user_id, mood_text, datetime.utcnow()
+        )
+        chart = "".join(m for _, m in summary.window())
+        stats = ", ".join(f"{m}: {c}" for m, c in summary.counts().items())
 
         response = [f"Stimmung gespeichert: {mood_text}"]
         if previous:
@@ -88,16 +91,19 @@ async def mood(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         )
     except sqlite3.Error:
         logger.exception("Database error while saving mood")
+        metrics.mark_handler_failed()
         await update.message.reply_text(
             "Beim Speichern deiner Stimmung ist ein Fehler aufgetreten."
         )
     except Exception:
         logger.exception("Failed to handle /mood command")
+        metrics.mark_handler_failed()
         await update.message.reply_text(
             "Es ist ein unerwarteter Fehler aufgetreten."
         )
 
 
+@instrument_handler
 async def moodstats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the ``/moodstats`` command.
 
@@ -105,28 +111,29 @@ async def moodstats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     user_id = update.effective_user.id
     try:
-        start = date.today() - timedelta(days=6)
-        week_entries = mood_service.get_moods(user_id, start, date.today())
-        if not week_entries:
+        counts = (await async_db.get_mood_summary(user_id)).counts()
+        if not counts:
             await update.message.reply_text("Keine Einträge für die letzte Woche.")
             return
-        counts = Counter(m for _, m in week_entries)
         stats = "\n".join(f"{m}: {c}" for m, c in counts.items())
         await update.message.reply_text(
             f"Stimmungsübersicht der letzten 7 Tage:\n{stats}"
         )
     except sqlite3.Error:
         logger.exception("Database error while fetching mood stats")
+        metrics.mark_handler_failed()
         await update.message.reply_text(
             "Beim Abrufen der Statistik ist ein Fehler aufgetreten."
         )
     except Exception:
         logger.exception("Failed to handle /moodstats command")
+        metrics.mark_handler_failed()
         await update.message.reply_text(
             "Es ist ein unerwarteter Fehler aufgetreten."
         )
 
 
+@instrument_handler
 async def habit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the ``/habit`` command.
 
@@ -141,10 +148,11 @@ async def habit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
     name = " ".join(context.args)
     try:
-        habit_service.create_habit(user_id, name)
+        await async_db.create_habit(user_id, name)
         await update.message.reply_text(
             f"Gewohnheit '{name}' wurde angelegt.\n"
-            "Möchtest du tägliche Erinnerungen erhalten?"
+            "Möchtest du tägliche Erinnerungen erhalten? "
+            f"Dann sende z.B. /reminder {name} 20:00"
         )
     except ValueError:
         await update.message.reply_text(
@@ -152,16 +160,19 @@ async def habit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         )
     except sqlite3.Error:
         logger.exception("Database error while creating habit")
+        metrics.mark_handler_failed()
         await update.message.reply_text(
             "Beim Speichern der Gewohnheit ist ein Fehler aufgetreten."
         )
     except Exception:
         logger.exception("Failed to handle /habit command")
+        metrics.mark_handler_failed()
         await update.message.reply_text(
             "Es ist ein unerwarteter Fehler aufgetreten."
         )
 
 
+@instrument_handler
 async def habit_done(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the ``/habit_done`` command.
 
@@ -174,69 +185,226 @@ async def habit_done(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
         )
         return
 
-    name = " ".join(context.args).lower()
     try:
-        habits = habit_service.get_user_habits(user_id)
-        habit_entry = next(
-            (h for h in habits if h["name"].lower() == name), None
+        name, streak = await async_db.complete_habit_by_name(
+            user_id, " ".join(context.args)
         )
-        if not habit_entry:
-            await update.message.reply_text(
-                "Keine Gewohnheit mit diesem Namen gefunden."
-            )
-            return
-
-        habit_service.complete_habit(user_id, habit_entry["id"])
-        streak = habit_service.get_habit_streak(user_id, habit_entry["id"])
         message = (
-            f"Gewohnheit '{habit_entry['name']}' abgehakt! "
+            f"Gewohnheit '{name}' abgehakt! "
             f"Aktueller Streak: {streak} Tage."
         )
         if streak and streak % 7 == 0:
             message += f"\nGroßartig! Du hast {streak} Tage in Folge geschafft!"
         await update.message.reply_text(message)
+    except ValueError:
+        await update.message.reply_text("Keine Gewohnheit mit diesem Namen gefunden.")
     except sqlite3.Error:
         logger.exception("Database error while completing habit")
+        metrics.mark_handler_failed()
         await update.message.reply_text(
             "Beim Aktualisieren der Gewohnheit ist ein Fehler aufgetreten."
         )
     except Exception:
         logger.exception("Failed to handle /habit_done command")
+        metrics.mark_handler_failed()
         await update.message.reply_text(
             "Es ist ein unerwarteter Fehler aufgetreten."
         )
 
 
+@instrument_handler
 async def habits(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the ``/habits`` command.
 
     Sends an overview of all habits with their streaks and last seven days.
+    With a number of days, e.g. ``/habits 30``, longer windows are summarized
+    as completion rates.
     """
     user_id = update.effective_user.id
     try:
-        user_habits = habit_service.get_user_habits(user_id)
+        days = int(context.args[0]) if context.args else 7
+    except ValueError:
+        days = 0
+    if not 1 <= days <= MAX_HISTORY_DAYS:
+        await update.message.reply_text(
+            f"Bitte gib eine Anzahl Tage zwischen 1 und {MAX_HISTORY_DAYS} an, "
+            "z.B. /habits 30"
+        )
+        return
+
+    try:
+        user_habits = await async_db.get_habit_overview(user_id)
         if not user_habits:
             await update.message.reply_text("Keine Gewohnheiten gefunden.")
             return
 
-        start = date.today() - timedelta(days=6)
         lines = []
         for h in user_habits:
-            history = []
-            for i in range(7):
-                day = start + timedelta(days=i)
-                history.append("✅" if day in h["logs"] else "✗")
-            lines.append(
-                f"{h['name']} (Streak: {h['streak']}): {''.join(history)}"
-            )
+            history = h["history"]
+            if days <= 7:
+                row = history.render(days, done="✅", missed="✗")
+                lines.append(f"{h['name']} (Streak: {h['streak']}): {row}")
+            else:
+                lines.append(
+                    f"{h['name']} (Streak: {h['streak']}, "
+                    f"Rekord: {h['longest_streak']}): "
+                    f"{history.completion_rate(days):.0%} der letzten {days} Tage"
+                )
         await update.message.reply_text("\n".join(lines))
     except sqlite3.Error:
         logger.exception("Database error while listing habits")
+        metrics.mark_handler_failed()
         await update.message.reply_text(
             "Beim Abrufen deiner Gewohnheiten ist ein Fehler aufgetreten."
         )
     except Exception:
         logger.exception("Failed to handle /habits command")
+        metrics.mark_handler_failed()
+        await update.message.reply_text(
+            "Es ist ein unerwarteter Fehler aufgetreten."
+        )
+
+
+@instrument_handler
+async def habit_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the ``/habit_stats`` command.
+
+    Sends streaks, completion rates for 30, 90 and 365 days and a heatmap of
+    the current month for one habit.
+    """
+    user_id = update.effective_user.id
+    if not context.args:
+        await update.message.reply_text(
+            "Bitte gib den Namen der Gewohnheit an, z.B. /habit_stats Lesen"
+        )
+        return
+
+    try:
+        found = await async_db.get_habit_overview(user_id, " ".join(context.args))
+        if not found:
+            await update.message.reply_text(
+                "Keine Gewohnheit mit diesem Namen gefunden."
+            )
+            return
+
+        history = found[0]["history"]
+        today = date.today()
+        lines = [
+            f"Statistik für '{found[0]['name']}':",
+            f"Aktueller Streak: {history.current_streak(today)} Tage",
+            f"Längster Streak: {history.longest_streak()} Tage",
+        ]
+        for days in (30, 90, 365):
+            lines.append(
+                f"Letzte {days} Tage: {history.completion_rate(days, today):.0%}"
+            )
+        lines.append("")
+        lines.append(history.month_heatmap(today.year, today.month))
+        await update.message.reply_text("\n".join(lines))
+    except sqlite3.Error:
+        logger.exception("Database error while fetching habit stats")
+        metrics.mark_handler_failed()
+        await update.message.reply_text(
+            "Beim Abrufen der Statistik ist ein Fehler aufgetreten."
+        )
+    except Exception:
+        logger.exception("Failed to handle /habit_stats command")
+        metrics.mark_handler_failed()
+        await update.message.reply_text(
+            "Es ist ein unerwarteter Fehler aufgetreten."
+        )
+
+
+@instrument_handler
+async def reminder(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the ``/reminder`` command.
+
+    Sets a daily reminder for a habit, e.g. ``/reminder Lesen 20:00``.
+    """
+    user_id = update.effective_user.id
+    try:
+        remind_at = datetime.strptime(context.args[-1], "%H:%M").time()
+        name = " ".join(context.args[:-1])
+        if not name:
+            raise ValueError("Habit name missing")
+    except (IndexError, ValueError):
+        await update.message.reply_text(
+            "Bitte gib Gewohnheit und Uhrzeit an, z.B. /reminder Lesen 20:00"
+        )
+        return
+
+    try:
+        stored = await async_db.set_reminder(
+            user_id, name, remind_at, update.effective_chat.id
+        )
+        context.application.bot_data["reminders"].schedule(stored)
+        await update.message.reply_text(
+            f"Ich erinnere dich täglich um {remind_at:%H:%M} Uhr "
+            f"an '{stored.habit_name}'."
+        )
+    except ValueError:
+        await update.message.reply_text("Keine Gewohnheit mit diesem Namen gefunden.")
+    except sqlite3.Error:
+        logger.exception("Database error while setting reminder")
+        metrics.mark_handler_failed()
+        await update.message.reply_text(
+            "Beim Speichern der Erinnerung ist ein Fehler aufgetreten."
+        )
+    except Exception:
+        logger.exception("Failed to handle /reminder command")
+        metrics.mark_handler_failed()
+        await update.message.reply_text(
+            "Es ist ein unerwarteter Fehler aufgetreten."
+        )
+
+
+@instrument_handler
+async def reminder_off(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the ``/reminder_off`` command.
+
+    Removes the daily reminder of a habit.
+    """
+    user_id = update.effective_user.id
+    if not context.args:
+        await update.message.reply_text(
+            "Bitte gib den Namen der Gewohnheit an, z.B. /reminder_off Lesen"
+        )
+        return
+
+    try:
+        habit_id = await async_db.remove_reminder(user_id, " ".join(context.args))
+        if habit_id is None:
+            await update.message.reply_text(
+                "Für diese Gewohnheit ist keine Erinnerung eingerichtet."
+            )
+            return
+        context.application.bot_data["reminders"].cancel(habit_id)
+        await update.message.reply_text("Erinnerung wurde entfernt.")
+    except sqlite3.Error:
+        logger.exception("Database error while removing reminder")
+        metrics.mark_handler_failed()
+        await update.message.reply_text(
+            "Beim Entfernen der Erinnerung ist ein Fehler aufgetreten."
+        )
+    except Exception:
+        logger.exception("Failed to handle /reminder_off command")
+        metrics.mark_handler_failed()
         await update.message.reply_text(
             "Es ist ein unerwarteter Fehler aufgetreten."
         )
+
+
+@instrument_handler
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the ``/stats`` command.
+
+    Shows latency percentiles and error counts of handlers, database calls,
+    GPT requests and Telegram API calls. Only available to the users listed in
+    ``ADMIN_USER_IDS``.
+    """
+    admins = context.application.bot_data.get("admin_ids", frozenset())
+    if update.effective_user.id not in admins:
+        await update.message.reply_text("Dieser Befehl ist nur für Admins verfügbar.")
+        return
+    message = metrics.summary() or "Noch keine Messwerte vorhanden."
+    await update.message.reply_text(message[:MAX_MESSAGE_LENGTH])
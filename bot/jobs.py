@@ -0,0 +1,24 @@
+"""Scheduled background jobs for the KI Life Coach bot."""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+from datetime import time
+
+from telegram.ext import ContextTypes
+
+from services import async_db
+
+logger = logging.getLogger(__name__)
+
+STREAK_JOB_TIME = time(hour=0, minute=5)
+
+
+async def recompute_streaks(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Recompute all habit streaks and reset those broken by skipped days."""
+    try:
+        processed = await async_db.recompute_streaks()
+        logger.info("Nightly streak job processed %s habits", processed)
+    except sqlite3.Error:
+        logger.exception("Nightly streak job failed")
@@ -1,29 +1,53 @@
 """Telegram bot starter script for the KI Life Coach project.
 
 This module loads the bot configuration, registers basic command handlers
-and starts the polling loop. The Telegram token is read from the environment
-or from a local ``.env`` file.
+and starts receiving updates, either by long polling (the default) or through
+a webhook server when ``BOT_MODE=webhook``. Settings are read from the
+environment or from a local ``.env`` file.
 """
 
 from __future__ import annotations
 
+import time
+
+_IMPORT_START = time.perf_counter()
+
+import asyncio
 import logging
 import os
+import re
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import FrozenSet, Optional
 import sys
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from telegram.ext import Application, CommandHandler, ContextTypes
 
-codex/develop-habit-and-routine-tracking-module-2025-08-06
-from handler import help_command, start, mood, moodstats, habit, habit_done, habits
-from services.mood_service import init_db as init_mood_db
-from services import habit_service
+from handler import (
+    help_command,
+    start,
+    mood,
+    moodstats,
+    habit,
+    habit_done,
+    habits,
+    habit_stats,
+    reminder,
+    reminder_off,
+    stats,
+)
+import reflect_handler
 from reflect_handler import reflect
-from services.mood_service import init_db
-main
+import jobs
+from concurrency import MAX_CONCURRENT_UPDATES, PerUserUpdateProcessor
+from reminders import ReminderScheduler
+from timed_request import TimedRequest
+from services import metrics
+from services.container import container
+
+container.timings["imports"] = time.perf_counter() - _IMPORT_START
 
 # Configure logging once for the whole application
 logging.basicConfig(
@@ -33,29 +57,172 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+_SECRET_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,256}")
+
+
+@dataclass(frozen=True)
+class WebhookConfig:
+    """Settings for receiving updates through a webhook.
+
+    Attributes:
+        url: Public HTTPS base URL under which Telegram reaches the bot,
+            e.g. a reverse proxy that terminates TLS.
+        secret: Secret token Telegram sends with every request; requests
+            without it are rejected.
+        listen: Local address of the webhook server.
+        port: Local port of the webhook server.
+        path: URL path of the webhook endpoint.
+        max_connections: Maximum simultaneous connections Telegram opens.
+    """
+
+    url: str
+    secret: str
+    listen: str = "0.0.0.0"
+    port: int = 8443
+    path: str = "telegram"
+    max_connections: int = 40
+
+    @property
+    def webhook_url(self) -> str:
+        """Return the full URL registered with Telegram."""
+        return f"{self.url.rstrip('/')}/{self.path.lstrip('/')}"
+
+
+def _load_setting(name: str) -> Optional[str]:
+    """Return a setting from the environment or the ``.env`` file.
+
+    The environment takes precedence. If the variable is not set, a ``.env``
+    file in the project root is parsed manually.
+    """
+
+    value: Optional[str] = os.getenv(name)
+    if value:
+        return value
+
+    env_path = Path(__file__).resolve().parents[1] / ".env"
+    if env_path.exists():
+        for line in env_path.read_text().splitlines():
+            if line.startswith(f"{name}="):
+                value = line.split("=", 1)[1].strip()
+                if value:
+                    return value
+    return None
+
+
 def _load_token() -> str:
     """Return the Telegram bot token from env or ``.env``.
 
-    The function first checks the ``TELEGRAM_TOKEN`` environment variable.
-    If it is not set, a ``.env`` file in the project root is parsed manually.
-
     Raises:
         RuntimeError: If no token can be found.
     """
 
-    token: Optional[str] = os.getenv("TELEGRAM_TOKEN")
+    token = _load_setting("TELEGRAM_TOKEN")
     if token:
         return token
+    raise RuntimeError("TELEGRAM_TOKEN is not configured")
 
-    env_path = Path(__file__).resolve().parents[1] / ".env"
-    if env_path.exists():
-        for line in env_path.read_text().splitlines():
-            if line.startswith("TELEGRAM_TOKEN="):
-                token = line.split("=", 1)[1].strip()
-                if token:
-                    return token
 
-    raise RuntimeError("TELEGRAM_TOKEN is not configured")
+def _load_concurrency() -> int:
+    """Return how many updates may be processed at once.
+
+    Read from ``MAX_CONCURRENT_UPDATES``; ``1`` restores strictly sequential
+    processing.
+
+    Raises:
+        RuntimeError: If the setting is not a positive number.
+    """
+
+    value = _load_setting("MAX_CONCURRENT_UPDATES")
+    if value is None:
+        return MAX_CONCURRENT_UPDATES
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise RuntimeError("MAX_CONCURRENT_UPDATES must be a positive number")
+    return limit
+
+
+def _load_metrics_port() -> Optional[int]:
+    """Return the port of the metrics endpoint, or ``None`` if it is disabled.
+
+    Read from ``METRICS_PORT``.
+
+    Raises:
+        RuntimeError: If the setting is not a valid port number.
+    """
+
+    value = _load_setting("METRICS_PORT")
+    if value is None:
+        return None
+    try:
+        port = int(value)
+    except ValueError:
+        port = 0
+    if not 0 < port < 65536:
+        raise RuntimeError("METRICS_PORT must be a port number")
+    return port
+
+
+def _load_admin_ids() -> FrozenSet[int]:
+    """Return the Telegram user IDs allowed to use admin commands.
+
+    Read from the comma-separated ``ADMIN_USER_IDS``; empty if unset.
+
+    Raises:
+        RuntimeError: If an entry is not a number.
+    """
+
+    value = _load_setting("ADMIN_USER_IDS") or ""
+    try:
+        return frozenset(int(part) for part in value.split(",") if part.strip())
+    except ValueError as exc:
+        raise RuntimeError("ADMIN_USER_IDS must be comma-separated user IDs") from exc
+
+
+def _load_webhook_config() -> Optional[WebhookConfig]:
+    """Return the webhook settings, or ``None`` to use long polling.
+
+    Webhook mode is selected with ``BOT_MODE=webhook`` and requires
+    ``WEBHOOK_URL`` and ``WEBHOOK_SECRET``. ``WEBHOOK_LISTEN``,
+    ``WEBHOOK_PORT``, ``WEBHOOK_PATH`` and ``WEBHOOK_MAX_CONNECTIONS`` are
+    optional.
+
+    Raises:
+        RuntimeError: If the mode is unknown or a setting is missing or invalid.
+    """
+
+    mode = (_load_setting("BOT_MODE") or "polling").lower()
+    if mode == "polling":
+        return None
+    if mode != "webhook":
+        raise RuntimeError(f"Unknown BOT_MODE {mode!r}; use 'polling' or 'webhook'")
+
+    url = _load_setting("WEBHOOK_URL")
+    secret = _load_setting("WEBHOOK_SECRET")
+    if not url or not secret:
+        raise RuntimeError("Webhook mode needs WEBHOOK_URL and WEBHOOK_SECRET")
+    if not _SECRET_PATTERN.fullmatch(secret):
+        raise RuntimeError(
+            "WEBHOOK_SECRET may only contain A-Z, a-z, 0-9, _ and - (max. 256)"
+        )
+    defaults = WebhookConfig(url, secret)
+    try:
+        return WebhookConfig(
+            url=url,
+            secret=secret,
+            listen=_load_setting("WEBHOOK_LISTEN") or defaults.listen,
+            port=int(_load_setting("WEBHOOK_PORT") or defaults.port),
+            path=_load_setting("WEBHOOK_PATH") or defaults.path,
+            max_connections=int(
+                _load_setting("WEBHOOK_MAX_CONNECTIONS") or defaults.max_connections
+            ),
+        )
+    except ValueError as exc:
+        raise RuntimeError(
+            "WEBHOOK_PORT and WEBHOOK_MAX_CONNECTIONS must be numbers"
+        ) from exc
 
 
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -64,31 +231,111 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
     logger.error("Update %s caused error %s", update, context.error)
 
 
+def _warm_up_gpt() -> None:
+    """Build the GPT service ahead of the first ``/reflect`` command."""
+
+    try:
+        container.get("gpt")
+    except Exception:
+        logger.warning("GPT service unavailable; /reflect will be disabled")
+
+
+async def _post_init(application: Application) -> None:
+    """Start background services once the bot is initialized."""
+
+    started = application.bot_data.pop("initialize_started", None)
+    if started is not None:
+        container.timings["initialize"] = time.perf_counter() - started
+    with container.timed("reminders"):
+        scheduler = ReminderScheduler(application.bot)
+        application.bot_data["reminders"] = scheduler
+        await scheduler.start()
+    logger.info("Startup: %s", container.report())
+    asyncio.get_running_loop().run_in_executor(None, _warm_up_gpt)
+
+
+async def _shutdown(application: Application) -> None:
+    """Stop the reminder scheduler and close the GPT client on shutdown."""
+
+    scheduler = application.bot_data.get("reminders")
+    if scheduler is not None:
+        await scheduler.stop()
+    await reflect_handler.close()
+
+
 def main() -> None:
     """Start the Telegram bot."""
 
     token = _load_token()
+    webhook = _load_webhook_config()
+    concurrency = _load_concurrency()
+    metrics_port = _load_metrics_port()
+    admin_ids = _load_admin_ids()
 
-    init_mood_db()
-    habit_service.init_db()
-
-    # Build the application and register command handlers
-    application = Application.builder().token(token).build()
+    # Build the application and register command handlers. The databases and
+    # the GPT service are initialized lazily on first use.
+    setup_started = time.perf_counter()
+    application = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(PerUserUpdateProcessor(concurrency))
+        .request(TimedRequest())
+        .post_init(_post_init)
+        .post_shutdown(_shutdown)
+        .build()
+    )
+    application.bot_data["admin_ids"] = admin_ids
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("mood", mood))
     application.add_handler(CommandHandler("moodstats", moodstats))
-    codex/develop-habit-and-routine-tracking-module-2025-08-06
     application.add_handler(CommandHandler("habit", habit))
     application.add_handler(CommandHandler("habit_done", habit_done))
     application.add_handler(CommandHandler("habits", habits))
-
+    application.add_handler(CommandHandler("habit_stats", habit_stats))
+    application.add_handler(CommandHandler("reminder", reminder))
+    application.add_handler(CommandHandler("reminder_off", reminder_off))
     application.add_handler(CommandHandler("reflect", reflect))
-    main
+    application.add_handler(CommandHandler("stats", stats))
     application.add_error_handler(error_handler)
 
-    logger.info("Bot is starting. Press Ctrl-C to stop.")
-    application.run_polling()
+    if application.job_queue is None:
+        logger.warning(
+            "Job queue unavailable; install python-telegram-bot[job-queue] "
+            "to enable the nightly streak job"
+        )
+    else:
+        application.job_queue.run_daily(
+            jobs.recompute_streaks, time=jobs.STREAK_JOB_TIME, name="streaks"
+        )
+
+    if metrics_port is not None:
+        metrics.start_http_server(metrics_port)
+
+    container.timings["setup"] = time.perf_counter() - setup_started
+    application.bot_data["initialize_started"] = time.perf_counter()
+
+    # Both modes stop on SIGINT/SIGTERM: no new updates are accepted, updates
+    # already received are processed, then post_shutdown runs.
+    if webhook is None:
+        logger.info("Bot is starting in polling mode. Press Ctrl-C to stop.")
+        application.run_polling()
+        return
+
+    logger.info(
+        "Bot is starting in webhook mode on %s:%s/%s",
+        webhook.listen,
+        webhook.port,
+        webhook.path,
+    )
+    application.run_webhook(
+        listen=webhook.listen,
+        port=webhook.port,
+        url_path=webhook.path,
+        webhook_url=webhook.webhook_url,
+        secret_token=webhook.secret,
+        max_connections=webhook.max_connections,
+    )
 
 
 if __name__ == "__main__":
@@ -2,45 +2,140 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import List
+from datetime import timedelta
+from typing import TYPE_CHECKING, List
 
-from telegram import Update
+from telegram import Message, Update
+from telegram.error import BadRequest, RetryAfter
 from telegram.ext import ContextTypes
 
-from services import mood_service
-from services.gpt_service import GPTService
+from services import async_db, metrics
+from services.container import container
+from services.metrics import instrument_handler
+
+if TYPE_CHECKING:
+    from services.gpt_service import GPTService
 
 logger = logging.getLogger(__name__)
 
-_gpt_service = GPTService()
+EDIT_INTERVAL = 1.5
+MAX_MESSAGE_LENGTH = 4096
+PLACEHOLDER = "Ich denke nach …"
+USER_BURST = 3
+USER_REFLECTIONS_PER_HOUR = 20
+GLOBAL_BURST = 20
+GLOBAL_REFLECTIONS_PER_SECOND = 2
+
+
+def _create_gpt_service() -> GPTService:
+    """Build the GPT service; ``openai`` is only imported here."""
+    from services import reflection_cache
+    from services.gpt_service import GPTService
+    from services.rate_limit import KeyedRateLimiter, TokenBucket
+    from services.resilience import CircuitBreaker, TemplateFallback
+
+    return GPTService(
+        cache=reflection_cache.ReflectionCache(db_path=reflection_cache.DB_PATH),
+        user_limiter=KeyedRateLimiter(USER_BURST, USER_REFLECTIONS_PER_HOUR / 3600),
+        global_limiter=TokenBucket(GLOBAL_BURST, GLOBAL_REFLECTIONS_PER_SECOND),
+        breaker=CircuitBreaker(),
+        fallback=TemplateFallback(),
+    )
+
 
+container.register("gpt", _create_gpt_service)
 
+
+@instrument_handler
 async def reflect(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the ``/reflect`` command.
 
+    Sends a placeholder right away and fills it in while the reflection is
+    streamed, editing the message at most every ``EDIT_INTERVAL`` seconds.
+
     Args:
         update: Incoming Telegram update.
         context: Callback context from ``python-telegram-bot``.
     """
     user_id = update.effective_user.id
+    try:
+        # Building the service imports openai and loads the cache; keep that
+        # off the event loop.
+        gpt_service: GPTService = container.built("gpt") or await asyncio.to_thread(
+            container.get, "gpt"
+        )
+    except Exception:
+        logger.exception("GPT service is not available")
+        metrics.mark_handler_failed()
+        await update.message.reply_text(
+            "Die Reflexion ist gerade nicht verfügbar. Bitte versuche es später."
+        )
+        return
     try:
         style, user_text = _parse_args(context.args)
-        last_mood = mood_service.get_last_mood(user_id)
+        last_mood = await async_db.get_last_mood(user_id)
         mood_text = last_mood[1] if last_mood else "unbekannt"
         prompt = f"Stimmung: {mood_text}. Nutzertext: {user_text}"
-        reflection = _gpt_service.generate_reflection(prompt, user_id, style)
-        message = f"{reflection}"
+        reply = await update.message.reply_text(PLACEHOLDER)
+        loop = asyncio.get_running_loop()
+        reflection = ""
+        next_edit = 0.0
+        try:
+            async for part in gpt_service.astream_reflection(prompt, user_id, style):
+                reflection += part
+                if loop.time() >= next_edit and reflection.strip():
+                    delay = await _edit(reply, reflection.strip() + " …")
+                    next_edit = loop.time() + max(EDIT_INTERVAL, delay)
+        except RuntimeError as exc:
+            await _edit(reply, str(exc), final=True)
+            return
+        message = reflection.strip() or "Es wurde keine Reflexion erzeugt."
         if user_text:
             message += f"\n\n(Prompt: {user_text})"
-        await update.message.reply_text(message)
+        await _edit(reply, message, final=True)
     except RuntimeError as exc:
         await update.message.reply_text(str(exc))
     except Exception:
         logger.exception("Failed to handle /reflect command")
+        metrics.mark_handler_failed()
         await update.message.reply_text("Es ist ein unerwarteter Fehler aufgetreten.")
 
 
+async def _edit(message: Message, text: str, final: bool = False) -> float:
+    """Replace the text of ``message`` within Telegram's edit limits.
+
+    Args:
+        message: Message sent by the bot.
+        text: New text; cut to Telegram's maximum message length.
+        final: Wait out flood control and retry once instead of skipping.
+
+    Returns:
+        Seconds Telegram asked to wait before the next edit, or ``0``.
+    """
+    try:
+        await message.edit_text(text[:MAX_MESSAGE_LENGTH])
+    except BadRequest as exc:
+        if "not modified" not in str(exc).lower():
+            raise
+    except RetryAfter as exc:
+        delay = exc.retry_after
+        seconds = delay.total_seconds() if isinstance(delay, timedelta) else delay
+        if not final:
+            return float(seconds)
+        await asyncio.sleep(seconds)
+        await message.edit_text(text[:MAX_MESSAGE_LENGTH])
+    return 0.0
+
+
+async def close() -> None:
+    """Release the GPT service's network resources if it was built."""
+    gpt_service = container.built("gpt")
+    if gpt_service is not None:
+        await gpt_service.aclose()
+
+
 def _parse_args(args: List[str]) -> tuple[str, str]:
     """Return style and remaining text from command arguments.
 
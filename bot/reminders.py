@@ -0,0 +1,235 @@
+"""Daily habit reminders with rate-limited delivery.
+
+Reminders are kept in a heap ordered by their next due time. A timer task
+moves due reminders onto a queue, and a fixed set of sender tasks delivers
+them while respecting Telegram's global and per-chat message limits. All of
+this runs as background tasks on the bot's event loop, so even large bursts
+of reminders due in the same minute never block update handling.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from telegram import Bot
+from telegram.error import Forbidden, RetryAfter, TelegramError
+
+from services import async_db
+from services.habit_service import REMINDER_PAGE_SIZE, Reminder
+from services.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+MESSAGES_PER_SECOND = 25
+CHAT_INTERVAL = 1.0
+SEND_WORKERS = 16
+MAX_TIMER_SLEEP = 60.0
+_YIELD_EVERY = 1000
+
+
+class DeliveryLimiter:
+    """Spaces out messages to stay within Telegram's flood limits.
+
+    Telegram allows roughly 30 messages per second overall and one message
+    per second per chat. Callers await :meth:`wait` before each send and are
+    released in order once both limits permit it.
+    """
+
+    def __init__(
+        self,
+        per_second: float = MESSAGES_PER_SECOND,
+        chat_interval: float = CHAT_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self._global = TokenBucket(per_second, per_second, clock)
+        self._chat_interval = chat_interval
+        self._chat_next: Dict[int, float] = {}
+        self._paused_until = 0.0
+        self._clock = clock
+        self._sleep = sleep
+
+    async def wait(self, chat_id: int) -> None:
+        """Wait until a message to ``chat_id`` may be sent."""
+        now = self._clock()
+        slot = max(now, self._chat_next.get(chat_id, 0.0), self._paused_until)
+        self._chat_next[chat_id] = slot + self._chat_interval
+        if len(self._chat_next) > 10_000:
+            self._chat_next = {c: t for c, t in self._chat_next.items() if t > now}
+        if slot > now:
+            await self._sleep(slot - now)
+        delay = self._global.reserve()
+        if delay:
+            await self._sleep(delay)
+        # A flood error may have paused delivery while we were waiting.
+        paused = self._paused_until - self._clock()
+        while paused > 0:
+            await self._sleep(paused)
+            paused = self._paused_until - self._clock()
+
+    def pause(self, seconds: float) -> None:
+        """Hold back all messages for ``seconds``, e.g. after a flood error."""
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+
+class ReminderScheduler:
+    """Schedules and delivers daily habit reminders.
+
+    Attributes:
+        bot: Bot used to send the reminder messages.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        limiter: DeliveryLimiter | None = None,
+        workers: int = SEND_WORKERS,
+        clock: Callable[[], datetime] = datetime.now,
+    ) -> None:
+        self.bot = bot
+        self._limiter = limiter or DeliveryLimiter()
+        self._workers = workers
+        self._clock = clock
+        self._heap: List[Tuple[datetime, int, Reminder]] = []
+        self._active: Dict[int, Reminder] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._queue: asyncio.Queue[Reminder] = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    def _next_due(self, reminder: Reminder, now: datetime) -> datetime:
+        """Return the next time after ``now`` at which ``reminder`` is due."""
+        due = datetime.combine(now.date(), reminder.remind_at)
+        return due if due > now else due + timedelta(days=1)
+
+    def schedule(self, reminder: Reminder) -> None:
+        """Add or replace the reminder for ``reminder.habit_id``."""
+        self._active[reminder.habit_id] = reminder
+        due = self._next_due(reminder, self._clock())
+        heapq.heappush(self._heap, (due, next(self._seq), reminder))
+        self._wakeup.set()
+
+    def cancel(self, habit_id: int) -> None:
+        """Stop reminding about a habit.
+
+        The heap entry is dropped lazily once it becomes due.
+        """
+        self._active.pop(habit_id, None)
+
+    async def load(self) -> int:
+        """Load all stored reminders page by page and return their count."""
+        after_id = 0
+        count = 0
+        while True:
+            page = await async_db.get_reminders(after_id)
+            for reminder in page:
+                self.schedule(reminder)
+            count += len(page)
+            if len(page) < REMINDER_PAGE_SIZE:
+                break
+            after_id = page[-1].habit_id
+        logger.info("Loaded %s habit reminders", count)
+        return count
+
+    async def start(self) -> None:
+        """Start the timer, the sender tasks and the initial load."""
+        self._tasks = [asyncio.create_task(self._run_timer())]
+        self._tasks += [
+            asyncio.create_task(self._run_sender()) for _ in range(self._workers)
+        ]
+        self._tasks.append(asyncio.create_task(self.load()))
+
+    async def stop(self) -> None:
+        """Cancel all background tasks."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def pop_due(self) -> List[Reminder]:
+        """Remove and return all reminders that are due now.
+
+        Each returned reminder is rescheduled for the following day.
+        """
+        now = self._clock()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, reminder = heapq.heappop(self._heap)
+            if self._active.get(reminder.habit_id) is not reminder:
+                continue
+            due.append(reminder)
+            next_due = self._next_due(reminder, now)
+            heapq.heappush(self._heap, (next_due, next(self._seq), reminder))
+        return due
+
+    async def _run_timer(self) -> None:
+        """Move due reminders onto the send queue as their time arrives."""
+        while True:
+            self._wakeup.clear()
+            due = self.pop_due()
+            for i, reminder in enumerate(due, 1):
+                self._queue.put_nowait(reminder)
+                if i % _YIELD_EVERY == 0:
+                    await asyncio.sleep(0)
+            if due:
+                logger.info("Queued %s habit reminders", len(due))
+            timeout = MAX_TIMER_SLEEP
+            if self._heap:
+                until_due = (self._heap[0][0] - self._clock()).total_seconds()
+                timeout = min(timeout, max(until_due, 0.0))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_sender(self) -> None:
+        """Deliver queued reminders one at a time."""
+        while True:
+            reminder = await self._queue.get()
+            try:
+                await self._deliver(reminder)
+            except Exception:
+                logger.exception(
+                    "Failed to send reminder for habit %s", reminder.habit_id
+                )
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, reminder: Reminder) -> None:
+        """Send one reminder, retrying once after a flood-control error."""
+        text = (
+            f"Erinnerung: Denk an deine Gewohnheit '{reminder.habit_name}'!\n"
+            f"Erledigt? /habit_done {reminder.habit_name}"
+        )
+        for _ in range(2):
+            await self._limiter.wait(reminder.chat_id)
+            try:
+                await self.bot.send_message(chat_id=reminder.chat_id, text=text)
+                return
+            except RetryAfter as exc:
+                delay = exc.retry_after
+                seconds = (
+                    delay.total_seconds()
+                    if isinstance(delay, timedelta)
+                    else float(delay)
+                )
+                logger.warning(
+                    "Flood control hit; pausing reminders for %ss", seconds
+                )
+                self._limiter.pause(seconds)
+            except Forbidden:
+                logger.info(
+                    "Chat %s blocked the bot; deleting reminder", reminder.chat_id
+                )
+                self.cancel(reminder.habit_id)
+                await async_db.delete_reminder(reminder.habit_id)
+                return
+            except TelegramError:
+                logger.exception("Telegram error while sending reminder")
+                return
@@ -0,0 +1,27 @@
+"""HTTP transport that records the latency of Telegram Bot API calls."""
+
+from __future__ import annotations
+
+from typing import Any, Tuple
+
+from telegram.request import HTTPXRequest
+
+from services import metrics
+
+
+class TimedRequest(HTTPXRequest):
+    """:class:`HTTPXRequest` that times each call per Bot API method.
+
+    Only used for the bot's own calls such as ``sendMessage``; long polling
+    keeps its separate, untimed transport because ``getUpdates`` waits for
+    new updates on purpose.
+    """
+
+    __slots__ = ()
+
+    async def do_request(
+        self, url: str, method: str, *args: Any, **kwargs: Any
+    ) -> Tuple[int, bytes]:
+        """Send the request and record its duration under the API method."""
+        with metrics.TELEGRAM_LATENCY.time(method=url.rpartition("/")[2]):
+            return await super().do_request(url, method, *args, **kwargs)
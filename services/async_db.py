@@ -0,0 +1,344 @@
+"""Async facade over the SQLite-backed mood and habit services.
+
+The Telegram handlers run on an asyncio event loop, while the services use the
+blocking :mod:`sqlite3` API. The coroutines in this module run the service
+functions on worker threads so the event loop never waits on disk I/O:
+
+* writes go to one dedicated thread per database, which serializes them in
+  submission order and avoids contention for SQLite's single writer lock;
+* reads share a small bounded pool of threads.
+
+Each database is initialized lazily on its first use, so the bot does not have
+to open and migrate every database before it can answer its first update.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Set, Tuple, TypeVar
+
+from services import habit_service, metrics, mood_service
+
+T = TypeVar("T")
+
+READ_WORKERS = 4
+
+mood_db_path: Path | str = mood_service.DB_PATH
+habit_db_path: Path | str = habit_service.DB_PATH
+
+_writers: Dict[str, ThreadPoolExecutor] = {}
+_reader: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+_initialized: Set[str] = set()
+
+
+def configure(
+    mood_db: Path | str | None = None, habit_db: Path | str | None = None
+) -> None:
+    """Set the database files used by the facade.
+
+    Args:
+        mood_db: Path to the mood database; unchanged if ``None``.
+        habit_db: Path to the habit database; unchanged if ``None``.
+    """
+    global mood_db_path, habit_db_path
+    if mood_db is not None:
+        mood_db_path = mood_db
+    if habit_db is not None:
+        habit_db_path = habit_db
+
+
+def _writer_for(db_path: Path | str) -> ThreadPoolExecutor:
+    """Return the single-threaded write executor for ``db_path``."""
+    key = str(db_path)
+    with _lock:
+        executor = _writers.get(key)
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"db-writer-{Path(key).stem}"
+            )
+            _writers[key] = executor
+        return executor
+
+
+def _read_executor() -> ThreadPoolExecutor:
+    """Return the shared read executor."""
+    global _reader
+    with _lock:
+        if _reader is None:
+            _reader = ThreadPoolExecutor(
+                max_workers=READ_WORKERS, thread_name_prefix="db-reader"
+            )
+        return _reader
+
+
+async def _run(
+    executor: ThreadPoolExecutor | None,
+    func: Callable[..., T],
+    *args: Any,
+    **kwargs: Any,
+) -> T:
+    """Run ``func`` on ``executor`` and await its result.
+
+    ``None`` selects the event loop's default executor, which is used for
+    long-running maintenance work that must not occupy the writer threads.
+
+    The latency, including the time spent waiting for a free thread, is
+    recorded per service function, e.g. ``mood_service.save_mood``.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    operation = f"{func.__module__.rpartition('.')[2]}.{func.__name__}"
+    with metrics.track(metrics.DB_LATENCY, metrics.DB_ERRORS, operation=operation):
+        return await loop.run_in_executor(executor, call)
+
+
+def _initialize(db_path: Path | str, init: Callable[[Path | str], None]) -> None:
+    """Run ``init`` for ``db_path`` unless that already happened."""
+    key = str(db_path)
+    with _lock:
+        if key in _initialized:
+            return
+    init(db_path)
+    with _lock:
+        _initialized.add(key)
+
+
+async def _ready(db_path: Path | str, init: Callable[[Path | str], None]) -> None:
+    """Initialize the database at ``db_path`` on first use.
+
+    Runs on the database's writer thread, which serializes concurrent first
+    calls; afterwards this returns without leaving the event loop.
+    """
+    if str(db_path) not in _initialized:
+        await _run(_writer_for(db_path), _initialize, db_path, init)
+
+
+async def save_mood(user_id: int, mood: str, timestamp: datetime | None = None) -> None:
+    """Awaitable version of :func:`services.mood_service.save_mood`."""
+    await _ready(mood_db_path, mood_service.init_db)
+    await _run(
+        _writer_for(mood_db_path),
+        mood_service.save_mood,
+        user_id,
+        mood,
+        timestamp,
+        db_path=mood_db_path,
+    )
+
+
+async def record_mood(
+    user_id: int, mood: str, timestamp: datetime | None = None
+) -> Tuple[Tuple[datetime, str] | None, mood_service.MoodSummary]:
+    """Awaitable version of :func:`services.mood_service.record_mood`."""
+    await _ready(mood_db_path, mood_service.init_db)
+    return await _run(
+        _writer_for(mood_db_path),
+        mood_service.record_mood,
+        user_id,
+        mood,
+        timestamp,
+        db_path=mood_db_path,
+    )
+
+
+async def get_moods(
+    user_id: int, start_date: date, end_date: date
+) -> List[Tuple[datetime, str]]:
+    """Awaitable version of :func:`services.mood_service.get_moods`."""
+    await _ready(mood_db_path, mood_service.init_db)
+    return await _run(
+        _read_executor(),
+        mood_service.get_moods,
+        user_id,
+        start_date,
+        end_date,
+        db_path=mood_db_path,
+    )
+
+
+async def get_last_mood(user_id: int) -> Tuple[datetime, str] | None:
+    """Awaitable version of :func:`services.mood_service.get_last_mood`."""
+    await _ready(mood_db_path, mood_service.init_db)
+    return await _run(
+        _read_executor(), mood_service.get_last_mood, user_id, db_path=mood_db_path
+    )
+
+
+async def get_mood_summary(user_id: int) -> mood_service.MoodSummary:
+    """Awaitable version of :func:`services.mood_service.get_mood_summary`."""
+    await _ready(mood_db_path, mood_service.init_db)
+    return await _run(
+        _read_executor(), mood_service.get_mood_summary, user_id, db_path=mood_db_path
+    )
+
+
+async def create_habit(user_id: int, name: str) -> int:
+    """Awaitable version of :func:`services.habit_service.create_habit`."""
+    await _ready(habit_db_path, habit_service.init_db)
+    return await _run(
+        _writer_for(habit_db_path),
+        habit_service.create_habit,
+        user_id,
+        name,
+        db_path=habit_db_path,
+    )
+
+
+async def complete_habit(
+    user_id: int, habit_id: int, log_date: date | None = None
+) -> None:
+    """Awaitable version of :func:`services.habit_service.complete_habit`."""
+    await _ready(habit_db_path, habit_service.init_db)
+    await _run(
+        _writer_for(habit_db_path),
+        habit_service.complete_habit,
+        user_id,
+        habit_id,
+        log_date,
+        db_path=habit_db_path,
+    )
+
+
+async def complete_habit_by_name(
+    user_id: int, name: str, log_date: date | None = None
+) -> Tuple[str, int]:
+    """Awaitable version of :func:`services.habit_service.complete_habit_by_name`."""
+    await _ready(habit_db_path, habit_service.init_db)
+    return await _run(
+        _writer_for(habit_db_path),
+        habit_service.complete_habit_by_name,
+        user_id,
+        name,
+        log_date,
+        db_path=habit_db_path,
+    )
+
+
+async def get_user_habits(
+    user_id: int, days: int = habit_service.HISTORY_DAYS
+) -> List[Dict[str, object]]:
+    """Awaitable version of :func:`services.habit_service.get_user_habits`."""
+    await _ready(habit_db_path, habit_service.init_db)
+    return await _run(
+        _read_executor(),
+        habit_service.get_user_habits,
+        user_id,
+        db_path=habit_db_path,
+        days=days,
+    )
+
+
+async def get_habit_overview(
+    user_id: int, name: str | None = None
+) -> List[Dict[str, object]]:
+    """Awaitable version of :func:`services.habit_service.get_habit_overview`."""
+    await _ready(habit_db_path, habit_service.init_db)
+    return await _run(
+        _read_executor(),
+        habit_service.get_habit_overview,
+        user_id,
+        name,
+        db_path=habit_db_path,
+    )
+
+
+async def get_habit_streak(user_id: int, habit_id: int) -> int:
+    """Awaitable version of :func:`services.habit_service.get_habit_streak`."""
+    await _ready(habit_db_path, habit_service.init_db)
+    return await _run(
+        _read_executor(),
+        habit_service.get_habit_streak,
+        user_id,
+        habit_id,
+        db_path=habit_db_path,
+    )
+
+
+async def set_reminder(
+    user_id: int, name: str, remind_at: time, chat_id: int
+) -> habit_service.Reminder:
+    """Awaitable version of :func:`services.habit_service.set_reminder`."""
+    await _ready(habit_db_path, habit_service.init_db)
+    return await _run(
+        _writer_for(habit_db_path),
+        habit_service.set_reminder,
+        user_id,
+        name,
+        remind_at,
+        chat_id,
+        db_path=habit_db_path,
+    )
+
+
+async def remove_reminder(user_id: int, name: str) -> int | None:
+    """Awaitable version of :func:`services.habit_service.remove_reminder`."""
+    await _ready(habit_db_path, habit_service.init_db)
+    return await _run(
+        _writer_for(habit_db_path),
+        habit_service.remove_reminder,
+        user_id,
+        name,
+        db_path=habit_db_path,
+    )
+
+
+async def delete_reminder(habit_id: int) -> bool:
+    """Awaitable version of :func:`services.habit_service.delete_reminder`."""
+    await _ready(habit_db_path, habit_service.init_db)
+    return await _run(
+        _writer_for(habit_db_path),
+        habit_service.delete_reminder,
+        habit_id,
+        db_path=habit_db_path,
+    )
+
+
+async def get_reminders(
+    after_id: int = 0, limit: int = habit_service.REMINDER_PAGE_SIZE
+) -> List[habit_service.Reminder]:
+    """Awaitable version of :func:`services.habit_service.get_reminders`."""
+    await _ready(habit_db_path, habit_service.init_db)
+    return await _run(
+        _read_executor(),
+        habit_service.get_reminders,
+        after_id,
+        limit,
+        db_path=habit_db_path,
+    )
+
+
+async def recompute_streaks(today: date | None = None) -> int:
+    """Awaitable version of :func:`services.habit_service.recompute_streaks`.
+
+    Runs outside the habit writer thread: the job commits in short chunks, so
+    completions from handlers can interleave with it.
+    """
+    await _ready(habit_db_path, habit_service.init_db)
+    return await _run(
+        None, habit_service.recompute_streaks, today, db_path=habit_db_path
+    )
+
+
+def shutdown(wait: bool = True) -> None:
+    """Stop all worker threads, e.g. when the bot shuts down.
+
+    Executors are recreated on the next call, so the facade stays usable.
+
+    Args:
+        wait: Whether to wait for queued database work to finish.
+    """
+    global _reader
+    with _lock:
+        executors = list(_writers.values())
+        if _reader is not None:
+            executors.append(_reader)
+        _writers.clear()
+        _reader = None
+    for executor in executors:
+        executor.shutdown(wait=wait)
@@ -0,0 +1,144 @@
+"""Command line tools for maintaining the mood and habit databases.
+
+Usage examples::
+
+    python -m services.cli import-moods moods.csv
+    python -m services.cli import-habits habit_logs.csv
+    python -m services.cli export-moods backup.csv.gz --gzip
+    python -m services.cli recompute-streaks
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import logging
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from services import habit_service, mood_service
+
+logger = logging.getLogger(__name__)
+
+
+def _read_moods(path: Path) -> Iterator[Tuple[int, str, datetime]]:
+    """Yield mood records from a CSV file with ``user_id,timestamp,mood``."""
+    with open(path, newline="", encoding="utf-8") as csvfile:
+        for row in csv.DictReader(csvfile):
+            yield (
+                int(row["user_id"]),
+                row["mood"],
+                datetime.fromisoformat(row["timestamp"]),
+            )
+
+
+def _read_habit_logs(path: Path) -> Iterator[Tuple[int, str, date]]:
+    """Yield habit completions from a CSV file with ``user_id,habit,log_date``."""
+    with open(path, newline="", encoding="utf-8") as csvfile:
+        for row in csv.DictReader(csvfile):
+            yield (
+                int(row["user_id"]),
+                row["habit"],
+                date.fromisoformat(row["log_date"]),
+            )
+
+
+def _import_moods(args: argparse.Namespace) -> None:
+    """Handle the ``import-moods`` command."""
+    mood_service.init_db(args.db)
+    count = mood_service.import_moods(
+        _read_moods(args.file), batch_size=args.batch_size, db_path=args.db
+    )
+    logger.info("Imported %s mood entries from %s", count, args.file)
+
+
+def _import_habits(args: argparse.Namespace) -> None:
+    """Handle the ``import-habits`` command."""
+    habit_service.init_db(args.db)
+    count = habit_service.import_habit_logs(
+        _read_habit_logs(args.file), batch_size=args.batch_size, db_path=args.db
+    )
+    logger.info("Imported %s habit log entries from %s", count, args.file)
+
+
+def _export_moods(args: argparse.Namespace) -> None:
+    """Handle the ``export-moods`` command."""
+    mood_service.init_db(args.db)
+    count = mood_service.export_moods(
+        args.file, user_ids=args.user, compress=args.gzip, db_path=args.db
+    )
+    logger.info("Exported %s mood entries to %s", count, args.file)
+
+
+def _recompute_streaks(args: argparse.Namespace) -> None:
+    """Handle the ``recompute-streaks`` command."""
+    habit_service.init_db(args.db)
+    habit_service.recompute_streaks(
+        today=args.today, chunk_size=args.chunk_size, db_path=args.db
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the argument parser for all maintenance commands."""
+    parser = argparse.ArgumentParser(prog="python -m services.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    moods = commands.add_parser(
+        "import-moods", help="Import moods from a CSV file (user_id,timestamp,mood)"
+    )
+    moods.add_argument("file", type=Path)
+    moods.add_argument("--db", type=Path, default=mood_service.DB_PATH)
+    moods.add_argument(
+        "--batch-size", type=int, default=mood_service.IMPORT_BATCH_SIZE
+    )
+    moods.set_defaults(func=_import_moods)
+
+    habits = commands.add_parser(
+        "import-habits",
+        help="Import habit completions from a CSV file (user_id,habit,log_date)",
+    )
+    habits.add_argument("file", type=Path)
+    habits.add_argument("--db", type=Path, default=habit_service.DB_PATH)
+    habits.add_argument(
+        "--batch-size", type=int, default=habit_service.IMPORT_BATCH_SIZE
+    )
+    habits.set_defaults(func=_import_habits)
+
+    export = commands.add_parser("export-moods", help="Export moods to a CSV file")
+    export.add_argument("file", type=Path)
+    export.add_argument("--db", type=Path, default=mood_service.DB_PATH)
+    export.add_argument(
+        "--user", type=int, action="append", help="Limit the export to this user"
+    )
+    export.add_argument("--gzip", action="store_true", help="Compress the output")
+    export.set_defaults(func=_export_moods)
+
+    streaks = commands.add_parser(
+        "recompute-streaks", help="Recompute and reset stale streaks of all habits"
+    )
+    streaks.add_argument("--db", type=Path, default=habit_service.DB_PATH)
+    streaks.add_argument(
+        "--today",
+        type=date.fromisoformat,
+        help="Reference day in ISO format; defaults to today",
+    )
+    streaks.add_argument(
+        "--chunk-size", type=int, default=habit_service.STREAK_CHUNK_SIZE
+    )
+    streaks.set_defaults(func=_recompute_streaks)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the maintenance command given on the command line."""
+    logging.basicConfig(
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        level=logging.INFO,
+    )
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Lazily built services shared by the bot handlers.
+
+Expensive services, such as the GPT client that pulls in ``openai`` and
+``aiohttp``, are registered as factories and only built on first use. This
+keeps the bot's startup short, and commands that do not need a service keep
+working even if it cannot be configured.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """Registry of lazily created services with startup timings.
+
+    Attributes:
+        timings: Seconds spent per named step, e.g. ``"imports"`` or a
+            service name, in the order the steps were first recorded.
+    """
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, float] = {}
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        """Register ``factory`` to build the service ``name`` on first use."""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Return the service ``name``, building it if necessary.
+
+        A factory that raises is tried again on the next call.
+
+        Raises:
+            KeyError: If no factory is registered under ``name``.
+        """
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                factory = self._factories[name]
+                with self.timed(name):
+                    instance = factory()
+                self._instances[name] = instance
+                logger.info("Built %s in %.3fs", name, self.timings[name])
+            return instance
+
+    def built(self, name: str) -> Any | None:
+        """Return the service ``name`` if it was built already, else ``None``."""
+        return self._instances.get(name)
+
+    @contextmanager
+    def timed(self, step: str) -> Iterator[None]:
+        """Add the time spent in the ``with`` block to ``timings[step]``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[step] = self.timings.get(step, 0.0) + elapsed
+
+    def report(self) -> str:
+        """Return the recorded timings as a one-line summary."""
+        parts = [f"{step} {seconds:.3f}s" for step, seconds in self.timings.items()]
+        total = sum(self.timings.values())
+        return f"{', '.join(parts)} (total {total:.3f}s)"
+
+
+container = ServiceContainer()
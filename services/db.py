@@ -0,0 +1,200 @@
+"""Shared SQLite connection management for the service layer."""
+
+from __future__ import annotations
+
+import logging
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+POOL_SIZE = 8
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+)
+
+
+class ConnectionPool:
+    """Thread-safe pool of long-lived connections to a single database file.
+
+    Connections are created lazily up to ``max_size`` and configured once with
+    WAL journaling, relaxed ``synchronous`` and a busy timeout. Each connection
+    keeps its own prepared statement cache across calls.
+
+    Attributes:
+        db_path: Path to the SQLite database file.
+        max_size: Maximum number of open connections.
+    """
+
+    def __init__(self, db_path: Path | str, max_size: int = POOL_SIZE) -> None:
+        self.db_path = str(db_path)
+        self.max_size = max_size
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open and configure a new connection."""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self, timeout: float | None = None) -> sqlite3.Connection:
+        """Return an idle connection, opening a new one if the pool allows it.
+
+        Args:
+            timeout: Seconds to wait for a free connection once the pool is
+                exhausted; ``None`` waits indefinitely.
+
+        Raises:
+            sqlite3.OperationalError: If the pool is closed or no connection
+                became available in time.
+        """
+        if self._closed:
+            raise sqlite3.OperationalError("Connection pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._connect()
+            except sqlite3.Error:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty as exc:
+            raise sqlite3.OperationalError(
+                f"No database connection available for {self.db_path}"
+            ) from exc
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection to the pool.
+
+        Any transaction left open by the caller is rolled back first.
+        """
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    def close(self) -> None:
+        """Close all idle connections and reject further use of the pool."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    @contextmanager
+    def connection(self, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+        """Yield a pooled connection wrapped in a transaction.
+
+        The transaction is committed when the block exits normally and rolled
+        back if it raises.
+
+        Args:
+            immediate: Start the transaction with ``BEGIN IMMEDIATE`` so reads
+                and writes in the block see one consistent snapshot.
+        """
+        conn = self.acquire()
+        try:
+            with conn:
+                if immediate:
+                    conn.execute("BEGIN IMMEDIATE")
+                yield conn
+        finally:
+            self.release(conn)
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def database_key(db_path: Path | str) -> str:
+    """Return a normalized key identifying the database file at ``db_path``."""
+    return str(Path(db_path).resolve())
+
+
+def get_pool(db_path: Path | str) -> ConnectionPool:
+    """Return the shared connection pool for ``db_path``, creating it if needed.
+
+    Args:
+        db_path: Path to the SQLite database file.
+    """
+    key = database_key(db_path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(key)
+                _pools[key] = pool
+    return pool
+
+
+@contextmanager
+def connect(
+    db_path: Path | str, immediate: bool = False
+) -> Iterator[sqlite3.Connection]:
+    """Yield a pooled connection to ``db_path`` inside a transaction.
+
+    This is a drop-in replacement for ``with sqlite3.connect(db_path) as conn``
+    that reuses long-lived connections instead of opening a new one per call.
+
+    Args:
+        db_path: Path to the SQLite database file.
+        immediate: Take the write lock up front with ``BEGIN IMMEDIATE``.
+    """
+    with get_pool(db_path).connection(immediate) as conn:
+        yield conn
+
+
+def close_all() -> None:
+    """Close every pool and forget them, e.g. on shutdown or between tests."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+        logger.debug("Closed connection pool for %s", pool.db_path)
+
+
+def batched(records: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Yield lists of at most ``size`` items from ``records``.
+
+    Used to split bulk writes into transactions of bounded size.
+    """
+    iterator = iter(records)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -0,0 +1,183 @@
+"""Append-only store for anonymized GPT interactions."""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, List
+
+from services import db
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(__file__).resolve().parents[1] / "data" / "gpt_logs.db"
+KEEP_PER_USER = 5
+
+
+def user_hash(user_id: int) -> str:
+    """Return the anonymized key under which a user's interactions are stored."""
+    return sha256(str(user_id).encode()).hexdigest()
+
+
+def init_db(db_path: Path | str = DB_PATH) -> None:
+    """Create the interaction log table if it does not exist yet.
+
+    Args:
+        db_path: Path to the SQLite database file.
+    """
+    try:
+        path = Path(db_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with db.connect(path) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS gpt_logs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_hash TEXT NOT NULL,
+                    prompt TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    prompt_tokens INTEGER,
+                    completion_tokens INTEGER
+                )
+                """
+            )
+            _migrate_token_columns(conn)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_gpt_logs_user "
+                "ON gpt_logs(user_hash, id)"
+            )
+    except sqlite3.Error:
+        logger.exception("Failed to initialize GPT log database")
+        raise
+
+
+def _migrate_token_columns(conn: sqlite3.Connection) -> None:
+    """Add the token count columns to logs created before they existed."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(gpt_logs)")}
+    if "prompt_tokens" in columns:
+        return
+    conn.execute("ALTER TABLE gpt_logs ADD COLUMN prompt_tokens INTEGER")
+    conn.execute("ALTER TABLE gpt_logs ADD COLUMN completion_tokens INTEGER")
+
+
+def migrate_json(json_path: Path | str, db_path: Path | str = DB_PATH) -> int:
+    """Import entries from the former ``gpt_logs.json`` file once.
+
+    The file maps user hashes to lists of ``{"prompt", "response"}`` entries.
+    After a successful import it is renamed to ``*.migrated`` so later starts
+    skip it.
+
+    Args:
+        json_path: Path to the legacy JSON log.
+        db_path: Path to the SQLite database file.
+
+    Returns:
+        The number of imported entries.
+    """
+    path = Path(json_path)
+    if not path.exists():
+        return 0
+    try:
+        data: Dict[str, List[Dict[str, str]]] = json.loads(path.read_text())
+    except json.JSONDecodeError:
+        logger.warning("Could not decode legacy GPT log %s; skipping migration", path)
+        return 0
+    rows = [
+        (hashed, entry["prompt"], entry["response"])
+        for hashed, entries in data.items()
+        for entry in entries[-KEEP_PER_USER:]
+    ]
+    try:
+        with db.connect(db_path, immediate=True) as conn:
+            conn.executemany(
+                "INSERT INTO gpt_logs (user_hash, prompt, response) VALUES (?, ?, ?)",
+                rows,
+            )
+    except sqlite3.Error:
+        logger.exception("Failed to migrate legacy GPT log %s", path)
+        raise
+    path.rename(path.with_name(path.name + ".migrated"))
+    logger.info("Migrated %s GPT log entries from %s", len(rows), path)
+    return len(rows)
+
+
+def log_interaction(
+    user_id: int,
+    prompt: str,
+    response: str,
+    db_path: Path | str = DB_PATH,
+    prompt_tokens: int | None = None,
+    completion_tokens: int | None = None,
+) -> None:
+    """Append an interaction and drop the user's entries beyond the newest five.
+
+    Both statements only touch the user's rows through the ``(user_hash, id)``
+    index, so the cost does not grow with the size of the log.
+
+    Args:
+        user_id: Telegram user identifier; only its hash is stored.
+        prompt: Prompt sent to the GPT model.
+        response: Response received from the GPT model.
+        db_path: Path to the SQLite database file.
+        prompt_tokens: Input tokens of the request; ``None`` for cache hits.
+        completion_tokens: Output tokens of the request.
+    """
+    hashed = user_hash(user_id)
+    try:
+        with db.connect(db_path, immediate=True) as conn:
+            conn.execute(
+                "INSERT INTO gpt_logs "
+                "(user_hash, prompt, response, prompt_tokens, completion_tokens) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (hashed, prompt, response, prompt_tokens, completion_tokens),
+            )
+            conn.execute(
+                """
+                DELETE FROM gpt_logs
+                WHERE user_hash = ? AND id <= (
+                    SELECT id FROM gpt_logs WHERE user_hash = ?
+                    ORDER BY id DESC LIMIT 1 OFFSET ?
+                )
+                """,
+                (hashed, hashed, KEEP_PER_USER),
+            )
+    except sqlite3.Error:
+        logger.exception("Failed to log GPT interaction")
+        raise
+
+
+def get_interactions(
+    user_id: int, db_path: Path | str = DB_PATH
+) -> List[Dict[str, object]]:
+    """Return the stored interactions of a user, oldest first.
+
+    Each entry has the keys ``prompt``, ``response``, ``prompt_tokens`` and
+    ``completion_tokens``.
+
+    Args:
+        user_id: Telegram user identifier.
+        db_path: Path to the SQLite database file.
+    """
+    try:
+        with db.connect(db_path) as conn:
+            cur = conn.execute(
+                "SELECT prompt, response, prompt_tokens, completion_tokens "
+                "FROM gpt_logs WHERE user_hash = ? ORDER BY id",
+                (user_hash(user_id),),
+            )
+            return [
+                {
+                    "prompt": prompt,
+                    "response": response,
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                }
+                for prompt, response, prompt_tokens, completion_tokens in cur
+            ]
+    except sqlite3.Error:
+        logger.exception("Failed to fetch GPT interactions")
+        raise
@@ -2,38 +2,120 @@
 
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
 import os
-from dataclasses import dataclass
-from hashlib import sha256
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, ContextManager, Dict, List, Tuple
 
+import aiohttp
 import openai
 
+from services import gpt_log, metrics
+from services.prompts import PromptRegistry
+from services.rate_limit import (
+    KeyedRateLimiter,
+    RateLimitExceeded,
+    SingleFlight,
+    TokenBucket,
+)
+from services.reflection_cache import ReflectionCache, make_key
+from services.resilience import (
+    CircuitBreaker,
+    CircuitOpen,
+    TemplateFallback,
+    aretry_call,
+    retry_call,
+)
+
 logger = logging.getLogger(__name__)
 
 
+def _is_transient(exc: Exception) -> bool:
+    """Return whether a failed request is worth retrying."""
+    error = openai.error  # type: ignore[attr-defined]
+    if isinstance(exc, asyncio.TimeoutError):
+        return True
+    if isinstance(
+        exc,
+        (
+            error.Timeout,
+            error.TryAgain,
+            error.APIConnectionError,
+            error.RateLimitError,
+            error.ServiceUnavailableError,
+        ),
+    ):
+        return True
+    if isinstance(exc, error.APIError):
+        return exc.http_status is None or exc.http_status >= 500
+    return False
+
+
 @dataclass
 class GPTService:
     """Service class for generating reflective GPT responses.
 
     Attributes:
         model: Name of the OpenAI model to use.
-        log_path: Path to the JSON file where anonymized interactions are stored.
+        log_path: Path to the SQLite database where anonymized interactions
+            are stored.
+        legacy_log_path: Former JSON log; migrated into ``log_path`` once.
+        max_concurrency: Maximum number of requests in flight at once on the
+            async path; further callers wait for a free slot.
+        request_timeout: Deadline in seconds for a single request, including
+            the time spent waiting for a slot and all retries.
+        attempt_timeout: Deadline in seconds for one attempt.
+        retries: Additional attempts after transient upstream errors.
+        cache: Optional cache that answers repeated requests without a
+            model call.
+        user_limiter: Optional per-user token buckets for model calls.
+        global_limiter: Optional token bucket shared by all model calls.
+        breaker: Optional circuit breaker that skips the model while it keeps
+            failing.
+        fallback: Optional template reflection returned instead of an error
+            when the model cannot be reached.
+        prompts: Registry providing the prompt templates and token counts;
+            loaded from ``prompts/`` if not given.
+        max_prompt_tokens: Budget for the user prompt; longer prompts are cut.
     """
 
     model: str = "gpt-3.5-turbo"
-    log_path: Path = Path("data") / "gpt_logs.json"
+    log_path: Path = gpt_log.DB_PATH
+    legacy_log_path: Path = Path("data") / "gpt_logs.json"
+    max_concurrency: int = 8
+    request_timeout: float = 30.0
+    attempt_timeout: float = 10.0
+    retries: int = 2
+    cache: ReflectionCache | None = None
+    user_limiter: KeyedRateLimiter | None = None
+    global_limiter: TokenBucket | None = None
+    breaker: CircuitBreaker | None = None
+    fallback: TemplateFallback | None = None
+    prompts: PromptRegistry | None = None
+    max_prompt_tokens: int = 400
+    _semaphore: asyncio.Semaphore = field(init=False, repr=False)
+    _session: aiohttp.ClientSession | None = field(
+        default=None, init=False, repr=False
+    )
+    _flights: SingleFlight = field(default_factory=SingleFlight, init=False, repr=False)
 
     def __post_init__(self) -> None:
-        """Configure the OpenAI API key and ensure the log path exists."""
+        """Configure the OpenAI API key and prepare the interaction log."""
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY is not set")
         openai.api_key = api_key
-        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.prompts is None:
+            self.prompts = PromptRegistry(model=self.model)
+        gpt_log.init_db(self.log_path)
+        try:
+            gpt_log.migrate_json(self.legacy_log_path, self.log_path)
+        except Exception:
+            logger.exception("Failed to migrate legacy GPT log")
 
     def generate_reflection(self, prompt: str, user_id: int, style: str = "motivierend") -> str:
         """Generate a reflective message using GPT.
@@ -47,51 +129,409 @@ class GPTService:
             The text response generated by GPT.
 
         Raises:
-            RuntimeError: If the GPT request fails for any reason.
+            RateLimitExceeded: If the user or the service exceeded its budget.
+            RuntimeError: If the GPT request fails and no fallback is set.
         """
-        system_prompt = (
-            "Ziel: Unterstütze den Nutzer mit einer kurzen Reflexion. "
-            "Kontext: Du bist ein einfühlsamer Coach und sollst im Stil '"
-            f"{style}' antworten. Frage: {prompt} Ausgabeformat: Reiner Text."
-        )
+        key = make_key(self.model, style, prompt)
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            self._log_interaction(user_id, prompt, cached)
+            return cached
+        self._check_limits(user_id)
+        messages, prompt_tokens = self._build_messages(prompt, style)
         try:
-            response: Any = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt},
-                ],
-                timeout=30,
+            response = retry_call(
+                lambda: self._complete(messages), _is_transient, self.retries
             )
+        except Exception as exc:
+            return self._fallback(style, exc)
+        message = response["choices"][0]["message"]["content"].strip()
+        if self.cache:
+            self.cache.put(key, message)
+        usage = self._usage(response, prompt_tokens, message)
+        self._log_interaction(user_id, prompt, message, usage)
+        return message
+
+    async def agenerate_reflection(
+        self, prompt: str, user_id: int, style: str = "motivierend"
+    ) -> str:
+        """Generate a reflective message without blocking the event loop.
+
+        Requests share one HTTP connection pool and at most ``max_concurrency``
+        of them are in flight at once. Transient errors are retried with
+        jittered backoff, but each call must finish within ``request_timeout``
+        seconds. Cache hits return without a model call,
+        and an identical request that is already in flight, from any user, is
+        shared instead of sent again.
+
+        Args:
+            prompt: The user-specific prompt containing mood or journal data.
+            user_id: Telegram user identifier used for anonymized logging.
+            style: Desired reflection style (e.g., motivierend, analytisch, humorvoll).
+
+        Returns:
+            The text response generated by GPT.
+
+        Raises:
+            RateLimitExceeded: If the user or the service exceeded its budget.
+            RuntimeError: If the GPT request fails or exceeds its deadline and
+                no fallback is set.
+        """
+        key = make_key(self.model, style, prompt)
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            await asyncio.to_thread(self._log_interaction, user_id, prompt, cached)
+            return cached
+        pending = self._flights.pending(key)
+        if pending is not None:
+            return await self._join(pending, user_id, prompt)
+        self._check_limits(user_id)
+        messages, prompt_tokens = self._build_messages(prompt, style)
+
+        async def request() -> str:
+            try:
+                response = await asyncio.wait_for(
+                    aretry_call(
+                        lambda: self._acomplete(messages), _is_transient, self.retries
+                    ),
+                    self.request_timeout,
+                )
+            except Exception as exc:
+                return self._fallback(style, exc), False
             message = response["choices"][0]["message"]["content"].strip()
-            self._log_interaction(user_id, prompt, message)
-            return message
-        except openai.error.OpenAIError as exc:  # type: ignore[attr-defined]
+            if self.cache:
+                await asyncio.to_thread(self.cache.put, key, message)
+            usage = self._usage(response, prompt_tokens, message)
+            await asyncio.to_thread(
+                self._log_interaction, user_id, prompt, message, usage
+            )
+            return message, True
+
+        message, _ = await self._flights.do(key, request)
+        return message
+
+    async def astream_reflection(
+        self, prompt: str, user_id: int, style: str = "motivierend"
+    ) -> AsyncIterator[str]:
+        """Yield a reflection piece by piece as the model produces it.
+
+        Shares the connection pool and concurrency limit of
+        :meth:`agenerate_reflection`. The first piece and every following one
+        must arrive within ``request_timeout`` seconds. Opening the stream is
+        retried after transient errors. A cached reflection, the fallback, or
+        the result of an identical request that is already in flight, from
+        any user, is yielded as a single piece.
+
+        Args:
+            prompt: The user-specific prompt containing mood or journal data.
+            user_id: Telegram user identifier used for anonymized logging.
+            style: Desired reflection style (e.g., motivierend, analytisch, humorvoll).
+
+        Yields:
+            Consecutive parts of the reflection text.
+
+        Raises:
+            RateLimitExceeded: If the user or the service exceeded its budget.
+            RuntimeError: If the GPT request fails or stalls and no fallback
+                can be used.
+        """
+        key = make_key(self.model, style, prompt)
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            await asyncio.to_thread(self._log_interaction, user_id, prompt, cached)
+            yield cached
+            return
+        pending = self._flights.pending(key)
+        if pending is not None:
+            yield await self._join(pending, user_id, prompt)
+            return
+        self._check_limits(user_id)
+        messages, prompt_tokens = self._build_messages(prompt, style)
+        self._flights.start(key)
+        parts: List[str] = []
+        opened = False
+        try:
+            async with self._semaphore:
+                openai.aiosession.set(self._client_session())
+                # Only time spent waiting on the model counts, not the time
+                # the consumer needs to handle each part (e.g. Telegram edits).
+                opening = time.perf_counter()
+                stream: Any = await asyncio.wait_for(
+                    aretry_call(
+                        lambda: self._aopen_stream(messages),
+                        _is_transient,
+                        self.retries,
+                    ),
+                    self.request_timeout,
+                )
+                waited = time.perf_counter() - opening
+                opened = True
+                while True:
+                    started = time.perf_counter()
+                    try:
+                        chunk = await asyncio.wait_for(
+                            stream.__anext__(), self.request_timeout
+                        )
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        waited += time.perf_counter() - started
+                    delta = chunk["choices"][0]["delta"].get("content")
+                    if delta:
+                        if not parts:
+                            metrics.GPT_LATENCY.observe(
+                                waited, operation="stream_first_token"
+                            )
+                        parts.append(delta)
+                        yield delta
+                metrics.GPT_LATENCY.observe(waited, operation="stream")
+            self._record(None)
+            message = "".join(parts).strip()
+            self._flights.finish(key, (message, True))
+        except Exception as exc:
+            if opened:
+                metrics.GPT_ERRORS.inc(operation="stream")
+                self._record(exc)
+            try:
+                if parts:
+                    raise self._request_error(exc) from exc
+                fallback = self._fallback(style, exc)
+            except RuntimeError as error:
+                self._flights.finish(key, exc=error)
+                raise
+            self._flights.finish(key, (fallback, False))
+            yield fallback
+            return
+        finally:
+            # Still pending only if the consumer stopped iterating early.
+            self._flights.finish(
+                key, exc=RuntimeError("Die Reflexion wurde abgebrochen.")
+            )
+        if self.cache and message:
+            await asyncio.to_thread(self.cache.put, key, message)
+        usage = (prompt_tokens, self.prompts.count_tokens(message))
+        await asyncio.to_thread(self._log_interaction, user_id, prompt, message, usage)
+
+    async def _join(
+        self, pending: asyncio.Future[Tuple[str, bool]], user_id: int, prompt: str
+    ) -> str:
+        """Return the result of an identical request that is in flight.
+
+        Like a cache hit, a shared model answer is logged for ``user_id``;
+        a shared fallback is not.
+        """
+        message, answered = await asyncio.shield(pending)
+        if answered:
+            await asyncio.to_thread(self._log_interaction, user_id, prompt, message)
+        return message
+
+    def _check_limits(self, user_id: int) -> None:
+        """Consume one model call from the user's and the global budget.
+
+        Raises:
+            RateLimitExceeded: If either budget is exhausted; nothing is
+                consumed in that case.
+        """
+        bucket = self.user_limiter.bucket(user_id) if self.user_limiter else None
+        if bucket is not None and not bucket.try_acquire():
+            seconds = max(1, round(bucket.retry_after()))
+            raise RateLimitExceeded(
+                f"Bitte warte noch {seconds} Sekunden, bevor du eine neue "
+                "Reflexion anforderst.",
+                seconds,
+            )
+        if self.global_limiter is not None and not self.global_limiter.try_acquire():
+            if bucket is not None:
+                bucket.release()
+            seconds = max(1, round(self.global_limiter.retry_after()))
+            logger.warning("Global GPT budget exhausted")
+            raise RateLimitExceeded(
+                "Der Coach ist gerade stark gefragt. Bitte versuche es in "
+                f"{seconds} Sekunden erneut.",
+                seconds,
+            )
+
+    def _fallback(self, style: str, exc: Exception) -> str:
+        """Return the template reflection for a failed model request.
+
+        Must be called while handling ``exc``.
+
+        Raises:
+            RuntimeError: The user-facing error if no fallback applies.
+        """
+        error = self._request_error(exc)
+        upstream = (
+            CircuitOpen,
+            asyncio.TimeoutError,
+            openai.error.OpenAIError,  # type: ignore[attr-defined]
+        )
+        if self.fallback is None or not isinstance(exc, upstream):
+            raise error from exc
+        logger.info("Answering with template reflection")
+        return self.fallback.render(style)
+
+    def _request_error(self, exc: Exception) -> RuntimeError:
+        """Log a failed request and return the error shown to the user."""
+        if isinstance(exc, CircuitOpen):
+            logger.warning("Skipping GPT request: %s", exc)
+            return RuntimeError(
+                "Der Coach ist gerade nicht erreichbar. "
+                "Bitte versuche es später erneut."
+            )
+        if isinstance(exc, asyncio.TimeoutError):
+            logger.warning("GPT request exceeded %ss deadline", self.request_timeout)
+            return RuntimeError("Die Reflexion hat zu lange gedauert.")
+        if isinstance(exc, openai.error.OpenAIError):  # type: ignore[attr-defined]
             logger.error("OpenAI API error: %s", exc)
-            raise RuntimeError("Fehler beim Abrufen der Reflexion.") from exc
+            return RuntimeError("Fehler beim Abrufen der Reflexion.")
+        logger.exception("Unexpected error during GPT request")
+        return RuntimeError("Unerwarteter Fehler bei der Reflexion.")
+
+    def _guard(self) -> None:
+        """Raise :class:`CircuitOpen` if the breaker rejects calls right now."""
+        if self.breaker is not None and not self.breaker.allow():
+            raise CircuitOpen(f"circuit for {self.model} is open")
+
+    def _record(self, exc: Exception | None) -> None:
+        """Report the outcome of a model call to the breaker.
+
+        Only transient errors count as failures; any other answer shows that
+        the upstream is reachable.
+        """
+        if self.breaker is None or isinstance(exc, CircuitOpen):
+            return
+        if exc is not None and _is_transient(exc):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _complete(self, messages: List[Dict[str, str]]) -> Any:
+        """Send one blocking chat completion request."""
+        self._guard()
+        try:
+            with self._track("complete"):
+                response: Any = openai.ChatCompletion.create(
+                    model=self.model,
+                    messages=messages,
+                    request_timeout=self.attempt_timeout,
+                )
+        except Exception as exc:
+            self._record(exc)
+            raise
+        self._record(None)
+        return response
+
+    async def _acomplete(self, messages: List[Dict[str, str]]) -> Any:
+        """Send one chat completion request once a concurrency slot is free."""
+        self._guard()
+        try:
+            async with self._semaphore:
+                openai.aiosession.set(self._client_session())
+                with self._track("complete"):
+                    response: Any = await asyncio.wait_for(
+                        openai.ChatCompletion.acreate(
+                            model=self.model,
+                            messages=messages,
+                            request_timeout=self.attempt_timeout,
+                        ),
+                        self.attempt_timeout,
+                    )
         except Exception as exc:
-            logger.exception("Unexpected error during GPT request")
-            raise RuntimeError("Unerwarteter Fehler bei der Reflexion.") from exc
+            self._record(exc)
+            raise
+        self._record(None)
+        return response
 
-    def _log_interaction(self, user_id: int, prompt: str, response: str) -> None:
-        """Persist anonymized GPT interactions to ``log_path``.
+    async def _aopen_stream(self, messages: List[Dict[str, str]]) -> Any:
+        """Start one streamed chat completion request."""
+        self._guard()
+        try:
+            with self._track("stream_open"):
+                return await asyncio.wait_for(
+                    openai.ChatCompletion.acreate(
+                        model=self.model,
+                        messages=messages,
+                        stream=True,
+                        request_timeout=self.attempt_timeout,
+                    ),
+                    self.attempt_timeout,
+                )
+        except Exception as exc:
+            self._record(exc)
+            raise
+
+    @staticmethod
+    def _track(operation: str) -> ContextManager[None]:
+        """Record latency, errors and concurrency of one model request."""
+        return metrics.track(
+            metrics.GPT_LATENCY,
+            metrics.GPT_ERRORS,
+            metrics.GPT_IN_FLIGHT,
+            operation=operation,
+        )
+
+    def _client_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency)
+            )
+        return self._session
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP session, e.g. when the bot shuts down."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _build_messages(
+        self, prompt: str, style: str
+    ) -> Tuple[List[Dict[str, str]], int]:
+        """Return the chat messages for a reflection and their token count."""
+        return self.prompts.build_messages(prompt, style, self.max_prompt_tokens)
+
+    def _usage(
+        self, response: Any, prompt_tokens: int, message: str
+    ) -> Tuple[int, int]:
+        """Return ``(prompt, completion)`` tokens, estimated if not reported."""
+        usage = response.get("usage") or {}
+        return (
+            usage.get("prompt_tokens", prompt_tokens),
+            usage.get("completion_tokens", self.prompts.count_tokens(message)),
+        )
+
+    def _log_interaction(
+        self,
+        user_id: int,
+        prompt: str,
+        response: str,
+        usage: Tuple[int, int] | None = None,
+    ) -> None:
+        """Append an anonymized GPT interaction to ``log_path``.
 
         Args:
             user_id: Telegram user identifier used for anonymization.
             prompt: Prompt sent to the GPT model.
             response: Response received from the GPT model.
+            usage: Prompt and completion tokens; ``None`` for cache hits.
         """
+        prompt_tokens, completion_tokens = usage or (None, None)
+        if usage:
+            metrics.GPT_TOKENS.inc(prompt_tokens, kind="prompt")
+            metrics.GPT_TOKENS.inc(completion_tokens, kind="completion")
+            logger.info(
+                "GPT request used %s prompt and %s completion tokens",
+                prompt_tokens,
+                completion_tokens,
+            )
         try:
-            hashed = sha256(str(user_id).encode()).hexdigest()
-            data = {}
-            if self.log_path.exists():
-                try:
-                    data = json.loads(self.log_path.read_text())
-                except json.JSONDecodeError:
-                    logger.warning("Could not decode existing GPT log file; starting new one")
-            entries = data.get(hashed, [])
-            entries.append({"prompt": prompt, "response": response})
-            data[hashed] = entries[-5:]
-            self.log_path.write_text(json.dumps(data, ensure_ascii=False, indent=2))
+            gpt_log.log_interaction(
+                user_id,
+                prompt,
+                response,
+                self.log_path,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+            )
         except Exception:
             logger.exception("Failed to log GPT interaction")
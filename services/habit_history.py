@@ -0,0 +1,150 @@
+"""Compact per-day completion history for habits."""
+
+from __future__ import annotations
+
+import calendar
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Iterable, List, Tuple
+
+DONE = "■"
+MISSED = "□"
+
+
+@dataclass(frozen=True)
+class HabitBitmap:
+    """Completion history of a habit stored as one bit per day.
+
+    Bit ``i`` of ``bits`` is set if the habit was completed on the day
+    ``origin + i``. Python integers grow as needed, so a year of history takes
+    roughly 46 bytes and window queries are shifts, masks and popcounts.
+
+    Attributes:
+        origin: Day represented by bit 0, usually the habit's creation date.
+        bits: Bitset of completed days.
+    """
+
+    origin: date
+    bits: int = 0
+
+    @classmethod
+    def from_dates(cls, origin: date, days: Iterable[date]) -> HabitBitmap:
+        """Build a bitmap from completion dates.
+
+        Args:
+            origin: Preferred first day; moved back if earlier dates occur.
+            days: Days on which the habit was completed.
+        """
+        days = list(days)
+        if days:
+            origin = min(origin, min(days))
+        bits = 0
+        for day in days:
+            bits |= 1 << (day - origin).days
+        return cls(origin, bits)
+
+    def with_day(self, day: date) -> HabitBitmap:
+        """Return a copy with ``day`` marked as completed."""
+        if day < self.origin:
+            shift = (self.origin - day).days
+            return HabitBitmap(day, (self.bits << shift) | 1)
+        return HabitBitmap(self.origin, self.bits | 1 << (day - self.origin).days)
+
+    def __contains__(self, day: date) -> bool:
+        index = (day - self.origin).days
+        return index >= 0 and bool(self.bits >> index & 1)
+
+    def _window(self, start: date, end: date) -> int:
+        """Return the bits for ``start``..``end`` with ``start`` as bit 0."""
+        length = (end - start).days + 1
+        if length <= 0:
+            return 0
+        offset = (start - self.origin).days
+        bits = self.bits >> offset if offset >= 0 else self.bits << -offset
+        return bits & ((1 << length) - 1)
+
+    def history(self, days: int, end: date | None = None) -> List[bool]:
+        """Return completion flags for the ``days`` days ending on ``end``."""
+        end = end or date.today()
+        window = self._window(end - timedelta(days=days - 1), end)
+        return [bool(window >> i & 1) for i in range(days)]
+
+    def render(
+        self,
+        days: int,
+        end: date | None = None,
+        done: str = DONE,
+        missed: str = MISSED,
+    ) -> str:
+        """Return the history of the last ``days`` days as a symbol string.
+
+        Args:
+            days: Number of days, oldest first.
+            end: Last day of the window; today if ``None``.
+            done: Symbol for a completed day.
+            missed: Symbol for a missed day.
+        """
+        return "".join(
+            done if completed else missed for completed in self.history(days, end)
+        )
+
+    def count(self, start: date, end: date) -> int:
+        """Return the number of completed days between ``start`` and ``end``."""
+        return self._window(start, end).bit_count()
+
+    def completion_rate(self, days: int, end: date | None = None) -> float:
+        """Return the share of completed days among the last ``days`` days.
+
+        Days before the origin are not counted, so a habit created three days
+        ago and completed on all of them has a rate of ``1.0``.
+        """
+        end = end or date.today()
+        start = max(end - timedelta(days=days - 1), self.origin)
+        total = (end - start).days + 1
+        return self.count(start, end) / total if total > 0 else 0.0
+
+    def current_streak(self, today: date | None = None) -> int:
+        """Return the run of completed days ending today.
+
+        If today is not completed yet, the run ending yesterday still counts.
+        """
+        end = today or date.today()
+        if end not in self:
+            end -= timedelta(days=1)
+        length = (end - self.origin).days + 1
+        if length <= 0:
+            return 0
+        mask = (1 << length) - 1
+        missed = ~self.bits & mask
+        return length - missed.bit_length()
+
+    def longest_streak(self) -> int:
+        """Return the longest run of consecutive completed days."""
+        bits = self.bits
+        longest = 0
+        while bits:
+            bits &= bits >> 1
+            longest += 1
+        return longest
+
+    def month_heatmap(self, year: int, month: int) -> str:
+        """Return a calendar grid of one month with one row per week."""
+        last = calendar.monthrange(year, month)[1]
+        window = self._window(date(year, month, 1), date(year, month, last))
+        rows = ["Mo Di Mi Do Fr Sa So"]
+        for week in calendar.monthcalendar(year, month):
+            cells = [
+                (DONE if window >> (day - 1) & 1 else MISSED) + " " if day else "  "
+                for day in week
+            ]
+            rows.append(" ".join(cells).rstrip())
+        return "\n".join(rows)
+
+    def year_heatmap(self, year: int) -> List[Tuple[int, int]]:
+        """Return ``(completed days, days in month)`` for each month of ``year``."""
+        months = []
+        for month in range(1, 13):
+            last = calendar.monthrange(year, month)[1]
+            done = self.count(date(year, month, 1), date(year, month, last))
+            months.append((done, last))
+        return months
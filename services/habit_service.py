@@ -4,13 +4,46 @@ from __future__ import annotations
 
 import logging
 import sqlite3
-from datetime import date, datetime, timedelta
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Set, Tuple
+
+from services import db
+from services.habit_history import HabitBitmap
 
 logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).resolve().parents[1] / "data" / "habits.db"
+IMPORT_BATCH_SIZE = 5000
+HISTORY_DAYS = 7
+STREAK_CHUNK_SIZE = 2000
+REMINDER_PAGE_SIZE = 1000
+BITMAP_CACHE_SIZE = 50_000
+
+
+@dataclass(frozen=True)
+class Reminder:
+    """Daily reminder for a habit.
+
+    Attributes:
+        habit_id: Identifier of the habit.
+        chat_id: Telegram chat that receives the reminder.
+        habit_name: Name of the habit.
+        remind_at: Local time of day at which the reminder is sent.
+    """
+
+    habit_id: int
+    chat_id: int
+    habit_name: str
+    remind_at: time
+
+
+_bitmap_cache: OrderedDict[Tuple[str, int], HabitBitmap] = OrderedDict()
+_bitmap_lock = threading.Lock()
+_bitmap_writes = 0
 
 
 def init_db(db_path: Path | str = DB_PATH) -> None:
@@ -24,7 +57,7 @@ def init_db(db_path: Path | str = DB_PATH) -> None:
     try:
         path = Path(db_path)
         path.parent.mkdir(parents=True, exist_ok=True)
-        with sqlite3.connect(path) as conn:
+        with db.connect(path) as conn:
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS habits (
@@ -33,6 +66,9 @@ def init_db(db_path: Path | str = DB_PATH) -> None:
                     name TEXT NOT NULL,
                     created_at DATETIME NOT NULL,
                     streak INTEGER NOT NULL DEFAULT 0,
+                    longest_streak INTEGER NOT NULL DEFAULT 0,
+                    last_log_date DATE,
+                    name_key TEXT,
                     UNIQUE(user_id, name)
                 )
                 """
@@ -48,11 +84,72 @@ def init_db(db_path: Path | str = DB_PATH) -> None:
                 )
                 """
             )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS habit_reminders (
+                    habit_id INTEGER PRIMARY KEY,
+                    chat_id INTEGER NOT NULL,
+                    remind_at TEXT NOT NULL,
+                    FOREIGN KEY(habit_id) REFERENCES habits(id) ON DELETE CASCADE
+                )
+                """
+            )
+            _migrate_streak_columns(conn)
+            _migrate_name_key(conn)
     except sqlite3.Error:
         logger.exception("Failed to initialize habit database")
         raise
 
 
+def _migrate_streak_columns(conn: sqlite3.Connection) -> None:
+    """Add and backfill ``longest_streak`` and ``last_log_date`` if missing."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(habits)")}
+    if "last_log_date" in columns:
+        return
+    conn.execute(
+        "ALTER TABLE habits ADD COLUMN longest_streak INTEGER NOT NULL DEFAULT 0"
+    )
+    conn.execute("ALTER TABLE habits ADD COLUMN last_log_date DATE")
+    habit_ids = [r[0] for r in conn.execute("SELECT DISTINCT habit_id FROM habit_log")]
+    for habit_id in habit_ids:
+        _recompute_streak(conn, habit_id)
+    logger.info("Backfilled streak columns for %s habits", len(habit_ids))
+
+
+def _migrate_name_key(conn: sqlite3.Connection) -> None:
+    """Add, backfill and index the case-insensitive ``name_key`` column.
+
+    The key is ``name.lower()`` rather than SQLite's ``NOCASE`` collation,
+    which only folds ASCII letters and would not match names like "Übung".
+    Databases that already contain case variants of the same name get a
+    non-unique index so the migration does not fail.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(habits)")}
+    if "name_key" not in columns:
+        conn.execute("ALTER TABLE habits ADD COLUMN name_key TEXT")
+        rows = conn.execute("SELECT id, name FROM habits").fetchall()
+        conn.executemany(
+            "UPDATE habits SET name_key = ? WHERE id = ?",
+            ((_name_key(name), habit_id) for habit_id, name in rows),
+        )
+    try:
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_habits_user_name_key "
+            "ON habits (user_id, name_key)"
+        )
+    except sqlite3.IntegrityError:
+        logger.warning("Habit names differing only in case exist; index not unique")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_habits_user_name_key "
+            "ON habits (user_id, name_key)"
+        )
+
+
+def _name_key(name: str) -> str:
+    """Return the case-insensitive lookup key for a habit name."""
+    return name.lower()
+
+
 def create_habit(user_id: int, name: str, db_path: Path | str = DB_PATH) -> int:
     """Create a new habit for a user.
 
@@ -65,13 +162,15 @@ def create_habit(user_id: int, name: str, db_path: Path | str = DB_PATH) -> int:
         The ID of the newly created habit.
 
     Raises:
-        ValueError: If a habit with the same name already exists for the user.
+        ValueError: If a habit with the same name, ignoring case, already
+            exists for the user.
     """
     try:
-        with sqlite3.connect(db_path) as conn:
+        with db.connect(db_path) as conn:
             cur = conn.execute(
-                "INSERT INTO habits (user_id, name, created_at) VALUES (?, ?, ?)",
-                (user_id, name, datetime.utcnow().isoformat()),
+                "INSERT INTO habits (user_id, name, name_key, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (user_id, name, _name_key(name), datetime.utcnow().isoformat()),
             )
             conn.commit()
             return cur.lastrowid
@@ -102,98 +201,424 @@ def complete_habit(
     """
     day = log_date or date.today()
     try:
-        with sqlite3.connect(db_path) as conn:
-            cur = conn.execute(
-                "SELECT 1 FROM habits WHERE id = ? AND user_id = ?",
-                (habit_id, user_id),
-            )
-            if cur.fetchone() is None:
+        with db.connect(db_path, immediate=True) as conn:
+            _complete(conn, user_id, habit_id, day)
+        _mark_bitmap(db_path, habit_id, day)
+    except sqlite3.Error:
+        logger.exception("Failed to complete habit %s for user %s", habit_id, user_id)
+        raise
+
+
+def complete_habit_by_name(
+    user_id: int,
+    name: str,
+    log_date: date | None = None,
+    db_path: Path | str = DB_PATH,
+) -> Tuple[str, int]:
+    """Mark a habit, looked up by name ignoring case, as completed.
+
+    The lookup, the log entry and the streak update run in one transaction.
+
+    Args:
+        user_id: Telegram user identifier.
+        name: Name of the habit in any capitalization.
+        log_date: Date of completion; defaults to today.
+        db_path: Path to the SQLite database file.
+
+    Returns:
+        Tuple of the habit's stored name and its streak after completion.
+
+    Raises:
+        ValueError: If the user has no habit with this name.
+    """
+    day = log_date or date.today()
+    try:
+        with db.connect(db_path, immediate=True) as conn:
+            row = conn.execute(
+                "SELECT id, name FROM habits WHERE user_id = ? AND name_key = ?",
+                (user_id, _name_key(name)),
+            ).fetchone()
+            if row is None:
                 raise ValueError("Habit not found")
+            habit_id, habit_name = row
+            streak = _complete(conn, user_id, habit_id, day)
+        _mark_bitmap(db_path, habit_id, day)
+        return habit_name, streak
+    except sqlite3.Error:
+        logger.exception("Failed to complete habit %r for user %s", name, user_id)
+        raise
 
-            conn.execute(
-                "INSERT OR IGNORE INTO habit_log (habit_id, log_date) VALUES (?, ?)",
-                (habit_id, day.isoformat()),
-            )
 
-            streak = _calculate_streak(conn, habit_id, day)
-            conn.execute(
-                "UPDATE habits SET streak = ? WHERE id = ?",
-                (streak, habit_id),
-            )
-            conn.commit()
+def _complete(conn: sqlite3.Connection, user_id: int, habit_id: int, day: date) -> int:
+    """Log a completion and update the streak columns; return the new streak."""
+    row = conn.execute(
+        "SELECT streak, longest_streak, last_log_date FROM habits "
+        "WHERE id = ? AND user_id = ?",
+        (habit_id, user_id),
+    ).fetchone()
+    if row is None:
+        raise ValueError("Habit not found")
+
+    streak, longest, last = row
+    cur = conn.execute(
+        "INSERT OR IGNORE INTO habit_log (habit_id, log_date) VALUES (?, ?)",
+        (habit_id, day.isoformat()),
+    )
+    if cur.rowcount == 0:
+        return streak
+
+    last_day = date.fromisoformat(last) if last else None
+    if last_day is None or day > last_day + timedelta(days=1):
+        streak = 1
+    elif day == last_day + timedelta(days=1) and streak:
+        streak += 1
+    else:
+        # Backfilled or previously reset days need the full history.
+        return _recompute_streak(conn, habit_id)
+    conn.execute(
+        "UPDATE habits SET streak = ?, longest_streak = ?, last_log_date = ? "
+        "WHERE id = ?",
+        (streak, max(longest, streak), day.isoformat(), habit_id),
+    )
+    return streak
+
+
+def import_habit_logs(
+    records: Iterable[Tuple[int, str, date]],
+    batch_size: int = IMPORT_BATCH_SIZE,
+    db_path: Path | str = DB_PATH,
+) -> int:
+    """Bulk insert historical habit completions.
+
+    Habits that do not exist yet are created on the fly. Logs are written with
+    ``executemany`` in one transaction per batch, and streaks are recomputed
+    once per affected habit after all batches have been written.
+
+    Args:
+        records: Iterable of ``(user_id, habit_name, log_date)`` tuples.
+        batch_size: Number of records written per transaction.
+        db_path: Path to the SQLite database file.
+
+    Returns:
+        Number of inserted log entries.
+    """
+    habit_ids: Dict[Tuple[int, str], int] = {}
+    touched: Set[int] = set()
+    inserted = 0
+    try:
+        with db.connect(db_path) as conn:
+            for batch in db.batched(records, batch_size):
+                names = {(u, _name_key(n)): n for u, n, _ in batch}
+                new_keys = names.keys() - habit_ids.keys()
+                if new_keys:
+                    now = datetime.utcnow().isoformat()
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO habits "
+                        "(user_id, name, name_key, created_at) VALUES (?, ?, ?, ?)",
+                        ((u, names[(u, k)], k, now) for u, k in new_keys),
+                    )
+                    for key in new_keys:
+                        habit_ids[key] = conn.execute(
+                            "SELECT id FROM habits WHERE user_id = ? AND name_key = ?",
+                            key,
+                        ).fetchone()[0]
+
+                rows = [
+                    (habit_ids[(u, _name_key(n))], d.isoformat()) for u, n, d in batch
+                ]
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO habit_log (habit_id, log_date) VALUES (?, ?)",
+                    rows,
+                )
+                inserted += conn.total_changes - before
+                touched.update(habit_id for habit_id, _ in rows)
+                conn.commit()
+
+            for habit_id in touched:
+                _recompute_streak(conn, habit_id)
+        _evict_bitmaps(db_path, touched)
+        return inserted
     except sqlite3.Error:
-        logger.exception("Failed to complete habit %s for user %s", habit_id, user_id)
+        logger.exception("Failed to import habit logs after %s entries", inserted)
         raise
 
 
-def _calculate_streak(conn: sqlite3.Connection, habit_id: int, day: date) -> int:
-    """Calculate the current streak for a habit."""
+def _recompute_streak(conn: sqlite3.Connection, habit_id: int) -> int:
+    """Recompute the streak columns of a habit from its full log history.
+
+    The current streak is the run of consecutive days ending on the latest
+    completion. This is the slow path used for backfills and migrations.
+
+    Returns:
+        The recomputed current streak.
+    """
     cur = conn.execute(
-        "SELECT log_date FROM habit_log WHERE habit_id = ? ORDER BY log_date DESC",
+        "SELECT log_date FROM habit_log WHERE habit_id = ? ORDER BY log_date ASC",
         (habit_id,),
     )
-    streak = 0
-    expected = day
-    for (log_date_str,) in cur.fetchall():
-        log_day = date.fromisoformat(log_date_str)
-        if log_day == expected:
+    streak = longest = 0
+    previous: date | None = None
+    for (log_date_str,) in cur:
+        day = date.fromisoformat(log_date_str)
+        if previous is not None and day - previous == timedelta(days=1):
             streak += 1
-            expected -= timedelta(days=1)
-        elif log_day < expected:
-            break
+        else:
+            streak = 1
+        longest = max(longest, streak)
+        previous = day
+    conn.execute(
+        "UPDATE habits SET streak = ?, longest_streak = ?, last_log_date = ? "
+        "WHERE id = ?",
+        (streak, longest, previous.isoformat() if previous else None, habit_id),
+    )
     return streak
 
 
+_RECOMPUTE_STREAKS_SQL = """
+    WITH runs AS (
+        SELECT habit_id, log_date,
+               julianday(log_date)
+               - ROW_NUMBER() OVER (PARTITION BY habit_id ORDER BY log_date) AS grp
+        FROM habit_log
+        WHERE habit_id > :first AND habit_id <= :last
+    ),
+    islands AS (
+        SELECT habit_id, MAX(log_date) AS run_end, COUNT(*) AS run_length,
+               ROW_NUMBER() OVER (
+                   PARTITION BY habit_id ORDER BY MAX(log_date) DESC
+               ) AS recency
+        FROM runs
+        GROUP BY habit_id, grp
+    ),
+    stats AS (
+        SELECT habit_id,
+               MAX(run_end) AS last_log_date,
+               MAX(run_length) AS longest,
+               MAX(CASE WHEN recency = 1 THEN run_length END) AS current
+        FROM islands
+        GROUP BY habit_id
+    )
+    UPDATE habits SET
+        streak = CASE WHEN s.last_log_date >= :cutoff THEN s.current ELSE 0 END,
+        longest_streak = COALESCE(s.longest, 0),
+        last_log_date = s.last_log_date
+    FROM (
+        SELECT h.id, stats.last_log_date, stats.longest, stats.current
+        FROM habits AS h LEFT JOIN stats ON stats.habit_id = h.id
+        WHERE h.id > :first AND h.id <= :last
+    ) AS s
+    WHERE habits.id = s.id
+"""
+
+
+def recompute_streaks(
+    today: date | None = None,
+    chunk_size: int = STREAK_CHUNK_SIZE,
+    db_path: Path | str = DB_PATH,
+) -> int:
+    """Recompute the streak columns of all habits from ``habit_log``.
+
+    Runs of consecutive days are found with a gaps-and-islands window query.
+    Streaks whose last completion is older than yesterday are reset to zero.
+    Habits are processed in id ranges of ``chunk_size``, each in its own short
+    transaction, so the write lock is never held for the whole run.
+
+    Args:
+        today: Reference day for resetting stale streaks; defaults to today.
+        chunk_size: Number of habits updated per transaction.
+        db_path: Path to the SQLite database file.
+
+    Returns:
+        Number of habits processed.
+    """
+    cutoff = (today or date.today()) - timedelta(days=1)
+    processed = 0
+    last_id = 0
+    try:
+        while True:
+            with db.connect(db_path, immediate=True) as conn:
+                first_id = last_id
+                last_id, count = conn.execute(
+                    "SELECT MAX(id), COUNT(*) FROM "
+                    "(SELECT id FROM habits WHERE id > ? ORDER BY id LIMIT ?)",
+                    (first_id, chunk_size),
+                ).fetchone()
+                if not count:
+                    break
+                conn.execute(
+                    _RECOMPUTE_STREAKS_SQL,
+                    {"first": first_id, "last": last_id, "cutoff": cutoff.isoformat()},
+                )
+            processed += count
+        logger.info("Recomputed streaks for %s habits", processed)
+        return processed
+    except sqlite3.Error:
+        logger.exception("Failed to recompute streaks after %s habits", processed)
+        raise
+
+
+_USER_HABITS_SQL = """
+    SELECT h.id, h.name, h.streak, h.longest_streak, GROUP_CONCAT(l.log_date)
+    FROM habits AS h
+    LEFT JOIN habit_log AS l ON l.habit_id = h.id AND l.log_date >= ?
+    WHERE h.user_id = ?
+    GROUP BY h.id
+    ORDER BY h.id
+"""
+
+
 def get_user_habits(
-    user_id: int, db_path: Path | str = DB_PATH
+    user_id: int, db_path: Path | str = DB_PATH, days: int = HISTORY_DAYS
 ) -> List[Dict[str, object]]:
     """Return all habits for a user including recent history.
 
+    Habits and their recent log entries are fetched with a single joined
+    query that seeks the ``habit_log(habit_id, log_date)`` index per habit.
+
     Args:
         user_id: Telegram user identifier.
         db_path: Path to the SQLite database file.
+        days: Number of days of completion history to include, ending today.
 
     Returns:
-        List of dictionaries containing habit details and the last seven days of
-        completion history.
+        List of dictionaries containing habit details and the completion
+        history of the last ``days`` days.
     """
-    start_day = date.today() - timedelta(days=6)
+    start_day = date.today() - timedelta(days=days - 1)
     try:
-        with sqlite3.connect(db_path) as conn:
-            habits_cur = conn.execute(
-                "SELECT id, name, streak FROM habits WHERE user_id = ? ORDER BY id",
-                (user_id,),
-            )
-            habits = []
-            for habit_id, name, streak in habits_cur.fetchall():
-                log_cur = conn.execute(
-                    """
-                    SELECT log_date FROM habit_log
-                    WHERE habit_id = ? AND log_date >= ?
-                    """,
-                    (habit_id, start_day.isoformat()),
-                )
-                logs = {date.fromisoformat(d[0]) for d in log_cur.fetchall()}
-                habits.append(
-                    {
-                        "id": habit_id,
-                        "name": name,
-                        "streak": streak,
-                        "logs": logs,
-                    }
-                )
-            return habits
+        with db.connect(db_path) as conn:
+            cur = conn.execute(_USER_HABITS_SQL, (start_day.isoformat(), user_id))
+            return [
+                {
+                    "id": habit_id,
+                    "name": name,
+                    "streak": streak,
+                    "longest_streak": longest,
+                    "logs": (
+                        {date.fromisoformat(d) for d in logs.split(",")}
+                        if logs
+                        else set()
+                    ),
+                }
+                for habit_id, name, streak, longest, logs in cur.fetchall()
+            ]
     except sqlite3.Error:
         logger.exception("Failed to fetch habits for user %s", user_id)
         raise
 
 
+def get_habit_overview(
+    user_id: int, name: str | None = None, db_path: Path | str = DB_PATH
+) -> List[Dict[str, object]]:
+    """Return a user's habits together with their complete history.
+
+    The history of each habit is a :class:`HabitBitmap` covering every day
+    since the habit was created. Bitmaps are kept in an in-process LRU cache
+    and updated on completion, so only habits not yet cached touch
+    ``habit_log``.
+
+    Args:
+        user_id: Telegram user identifier.
+        name: Restrict the result to the habit with this name, ignoring case.
+        db_path: Path to the SQLite database file.
+
+    Returns:
+        List of dictionaries with the habit details and a ``history`` bitmap.
+    """
+    db_key = db.database_key(db_path)
+    sql = (
+        "SELECT id, name, streak, longest_streak, created_at FROM habits "
+        "WHERE user_id = ?"
+    )
+    params: List[object] = [user_id]
+    if name is not None:
+        sql += " AND name_key = ?"
+        params.append(_name_key(name))
+    try:
+        with db.connect(db_path) as conn:
+            rows = conn.execute(sql + " ORDER BY id", params).fetchall()
+            with _bitmap_lock:
+                writes = _bitmap_writes
+                bitmaps = {
+                    r[0]: _bitmap_cache[(db_key, r[0])]
+                    for r in rows
+                    if (db_key, r[0]) in _bitmap_cache
+                }
+            missing = [r for r in rows if r[0] not in bitmaps]
+            if missing:
+                logs: Dict[int, List[date]] = defaultdict(list)
+                placeholders = ", ".join("?" for _ in missing)
+                cur = conn.execute(
+                    "SELECT habit_id, log_date FROM habit_log "
+                    f"WHERE habit_id IN ({placeholders})",
+                    [r[0] for r in missing],
+                )
+                for habit_id, log_date in cur:
+                    logs[habit_id].append(date.fromisoformat(log_date))
+                for habit_id, *_, created_at in missing:
+                    origin = datetime.fromisoformat(created_at).date()
+                    bitmaps[habit_id] = HabitBitmap.from_dates(origin, logs[habit_id])
+        _cache_bitmaps(db_key, bitmaps, writes)
+        return [
+            {
+                "id": habit_id,
+                "name": habit_name,
+                "streak": streak,
+                "longest_streak": longest,
+                "history": bitmaps[habit_id],
+            }
+            for habit_id, habit_name, streak, longest, _ in rows
+        ]
+    except sqlite3.Error:
+        logger.exception("Failed to fetch habit overview for user %s", user_id)
+        raise
+
+
+def _cache_bitmaps(db_key: str, bitmaps: Dict[int, HabitBitmap], writes: int) -> None:
+    """Cache bitmaps unless a write happened since they were read.
+
+    ``writes`` is the value of the write counter taken before reading, so a
+    bitmap loaded before a concurrent completion committed is never cached.
+    """
+    with _bitmap_lock:
+        for habit_id, bitmap in bitmaps.items():
+            key = (db_key, habit_id)
+            if key in _bitmap_cache:
+                _bitmap_cache.move_to_end(key)
+            elif writes == _bitmap_writes:
+                _bitmap_cache[key] = bitmap
+        while len(_bitmap_cache) > BITMAP_CACHE_SIZE:
+            _bitmap_cache.popitem(last=False)
+
+
+def _mark_bitmap(db_path: Path | str, habit_id: int, day: date) -> None:
+    """Record a committed completion in the cached bitmap, if there is one."""
+    global _bitmap_writes
+    key = (db.database_key(db_path), habit_id)
+    with _bitmap_lock:
+        _bitmap_writes += 1
+        bitmap = _bitmap_cache.get(key)
+        if bitmap is not None:
+            _bitmap_cache[key] = bitmap.with_day(day)
+
+
+def _evict_bitmaps(db_path: Path | str, habit_ids: Iterable[int]) -> None:
+    """Drop cached bitmaps so they are rebuilt from ``habit_log``."""
+    global _bitmap_writes
+    db_key = db.database_key(db_path)
+    with _bitmap_lock:
+        _bitmap_writes += 1
+        for habit_id in habit_ids:
+            _bitmap_cache.pop((db_key, habit_id), None)
+
+
 def get_habit_streak(
     user_id: int, habit_id: int, db_path: Path | str = DB_PATH
 ) -> int:
     """Return the current streak for a habit."""
     try:
-        with sqlite3.connect(db_path) as conn:
+        with db.connect(db_path) as conn:
             cur = conn.execute(
                 "SELECT streak FROM habits WHERE id = ? AND user_id = ?",
                 (habit_id, user_id),
@@ -205,3 +630,132 @@ def get_habit_streak(
             "Failed to fetch streak for habit %s of user %s", habit_id, user_id
         )
         raise
+
+
+def set_reminder(
+    user_id: int,
+    name: str,
+    remind_at: time,
+    chat_id: int,
+    db_path: Path | str = DB_PATH,
+) -> Reminder:
+    """Create or replace the daily reminder for a habit.
+
+    Args:
+        user_id: Telegram user identifier.
+        name: Name of the habit, ignoring case.
+        remind_at: Local time of day for the reminder.
+        chat_id: Telegram chat that receives the reminder.
+        db_path: Path to the SQLite database file.
+
+    Returns:
+        The stored :class:`Reminder`.
+
+    Raises:
+        ValueError: If the user has no habit with this name.
+    """
+    try:
+        with db.connect(db_path) as conn:
+            row = conn.execute(
+                "SELECT id, name FROM habits WHERE user_id = ? AND name_key = ?",
+                (user_id, _name_key(name)),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Habit not found")
+            conn.execute(
+                "INSERT OR REPLACE INTO habit_reminders (habit_id, chat_id, remind_at) "
+                "VALUES (?, ?, ?)",
+                (row[0], chat_id, remind_at.strftime("%H:%M")),
+            )
+            return Reminder(row[0], chat_id, row[1], remind_at.replace(second=0))
+    except sqlite3.Error:
+        logger.exception(
+            "Failed to set reminder for habit %r of user %s", name, user_id
+        )
+        raise
+
+
+def remove_reminder(
+    user_id: int, name: str, db_path: Path | str = DB_PATH
+) -> int | None:
+    """Delete the reminder of a habit.
+
+    Args:
+        user_id: Telegram user identifier.
+        name: Name of the habit, ignoring case.
+        db_path: Path to the SQLite database file.
+
+    Returns:
+        The habit ID whose reminder was removed, or ``None`` if there was none.
+    """
+    try:
+        with db.connect(db_path) as conn:
+            row = conn.execute(
+                "DELETE FROM habit_reminders WHERE habit_id = "
+                "(SELECT id FROM habits WHERE user_id = ? AND name_key = ?) "
+                "RETURNING habit_id",
+                (user_id, _name_key(name)),
+            ).fetchone()
+            return row[0] if row else None
+    except sqlite3.Error:
+        logger.exception(
+            "Failed to remove reminder for habit %r of user %s", name, user_id
+        )
+        raise
+
+
+def delete_reminder(habit_id: int, db_path: Path | str = DB_PATH) -> bool:
+    """Delete the reminder of a habit by its ID.
+
+    Args:
+        habit_id: Identifier of the habit.
+        db_path: Path to the SQLite database file.
+
+    Returns:
+        ``True`` if a reminder was deleted.
+    """
+    try:
+        with db.connect(db_path) as conn:
+            cur = conn.execute(
+                "DELETE FROM habit_reminders WHERE habit_id = ?", (habit_id,)
+            )
+            return cur.rowcount > 0
+    except sqlite3.Error:
+        logger.exception("Failed to delete reminder for habit %s", habit_id)
+        raise
+
+
+def get_reminders(
+    after_id: int = 0,
+    limit: int = REMINDER_PAGE_SIZE,
+    db_path: Path | str = DB_PATH,
+) -> List[Reminder]:
+    """Return one page of reminders ordered by habit ID.
+
+    Callers load all reminders incrementally by passing the last habit ID of
+    the previous page as ``after_id``.
+
+    Args:
+        after_id: Only return reminders of habits with a larger ID.
+        limit: Maximum number of reminders to return.
+        db_path: Path to the SQLite database file.
+    """
+    try:
+        with db.connect(db_path) as conn:
+            cur = conn.execute(
+                """
+                SELECT r.habit_id, r.chat_id, h.name, r.remind_at
+                FROM habit_reminders AS r JOIN habits AS h ON h.id = r.habit_id
+                WHERE r.habit_id > ?
+                ORDER BY r.habit_id
+                LIMIT ?
+                """,
+                (after_id, limit),
+            )
+            return [
+                Reminder(habit_id, chat_id, name, time.fromisoformat(remind_at))
+                for habit_id, chat_id, name, remind_at in cur.fetchall()
+            ]
+    except sqlite3.Error:
+        logger.exception("Failed to load reminders after habit %s", after_id)
+        raise
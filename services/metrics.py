@@ -0,0 +1,403 @@
+"""In-process latency, error and in-flight metrics.
+
+The metrics are kept in memory and can be exported in the Prometheus text
+format, either through :func:`start_http_server` or :func:`render`. Only the
+standard library is used, so the bot gains no new dependencies.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import contextvars
+import functools
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+Labels = Tuple[str, ...]
+
+_current_handler: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "current_handler", default=None
+)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    """Return a Prometheus label set such as ``{handler="mood"}``."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(ABC):
+    """Common state of a metric family with optional labels."""
+
+    kind = ""
+
+    def __init__(
+        self, name: str, help_text: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Labels:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Return the sample lines of this family."""
+
+    def render(self) -> str:
+        """Return the family in the Prometheus text format."""
+        header = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(header + self.samples())
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. of errors."""
+
+    kind = "counter"
+
+    def __init__(
+        self, name: str, help_text: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Add ``amount`` to the series selected by ``labels``."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Return the current value of one series."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def items(self) -> List[Tuple[Labels, float]]:
+        """Return ``(label values, value)`` for every series."""
+        with self._lock:
+            return sorted(self._values.items())
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value:g}"
+            for key, value in self.items()
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down, e.g. requests in flight."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        """Subtract ``amount`` from the series selected by ``labels``."""
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the series selected by ``labels`` to ``value``."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per series: counts per bucket (last one is +Inf), sum of values
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation in the series selected by ``labels``."""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of the ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def series(self) -> List[Labels]:
+        """Return the label values of all recorded series."""
+        with self._lock:
+            return sorted(self._series)
+
+    def count(self, **labels: str) -> int:
+        """Return the number of observations of one series."""
+        with self._lock:
+            counts, _ = self._series.get(self._key(labels), ([], [0.0]))
+            return sum(counts)
+
+    def quantile(self, q: float, labels: Labels = ()) -> float:
+        """Estimate the ``q`` quantile of a series from its buckets.
+
+        Interpolates linearly inside the bucket that contains the quantile,
+        like Prometheus' ``histogram_quantile``. Values in the overflow bucket
+        are reported as the largest finite bound.
+        """
+        with self._lock:
+            counts, _ = self._series.get(labels, ([], [0.0]))
+            counts = list(counts)
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            series = sorted(
+                (key, list(counts), total[0])
+                for key, (counts, total) in self._series.items()
+            )
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total:g}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+HANDLER_LATENCY = Histogram(
+    "bot_handler_seconds", "Command handler latency.", ["handler"]
+)
+HANDLER_ERRORS = Counter(
+    "bot_handler_errors_total",
+    "Failed command handler calls, raised or answered with an error reply.",
+    ["handler"],
+)
+HANDLER_IN_FLIGHT = Gauge(
+    "bot_handlers_in_flight", "Command handlers currently running.", ["handler"]
+)
+DB_LATENCY = Histogram(
+    "bot_db_seconds", "Database call latency including queueing.", ["operation"]
+)
+DB_ERRORS = Counter("bot_db_errors_total", "Failed database calls.", ["operation"])
+GPT_LATENCY = Histogram(
+    "bot_gpt_seconds",
+    "Latency of OpenAI requests and of streamed reflections up to their first "
+    "part and to their end.",
+    ["operation"],
+)
+GPT_ERRORS = Counter(
+    "bot_gpt_errors_total", "Failed OpenAI requests.", ["operation"]
+)
+GPT_IN_FLIGHT = Gauge(
+    "bot_gpt_in_flight", "OpenAI requests in flight.", ["operation"]
+)
+GPT_TOKENS = Counter(
+    "bot_gpt_tokens_total", "Tokens used by OpenAI requests.", ["kind"]
+)
+TELEGRAM_LATENCY = Histogram(
+    "bot_telegram_seconds", "Latency of Telegram Bot API calls.", ["method"]
+)
+
+REGISTRY: List[_Metric] = [
+    HANDLER_LATENCY,
+    HANDLER_ERRORS,
+    HANDLER_IN_FLIGHT,
+    DB_LATENCY,
+    DB_ERRORS,
+    GPT_LATENCY,
+    GPT_ERRORS,
+    GPT_IN_FLIGHT,
+    GPT_TOKENS,
+    TELEGRAM_LATENCY,
+]
+
+
+@contextmanager
+def track(
+    histogram: Histogram,
+    errors: Counter,
+    in_flight: Gauge | None = None,
+    **labels: str,
+) -> Iterator[None]:
+    """Record latency, errors and optionally in-flight count of a block.
+
+    Cancellation is not counted as an error.
+    """
+    if in_flight is not None:
+        in_flight.inc(**labels)
+    start = time.perf_counter()
+    try:
+        yield
+    except asyncio.CancelledError:
+        raise
+    except BaseException:
+        errors.inc(**labels)
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+        if in_flight is not None:
+            in_flight.dec(**labels)
+
+
+def instrument_handler(
+    func: Callable[..., Awaitable[T]]
+) -> Callable[..., Awaitable[T]]:
+    """Decorate a command handler to record its latency, errors and concurrency.
+
+    The handler's function name is used as the ``handler`` label. Exceptions
+    that escape the handler are counted here; handlers that catch a failure
+    and answer with an error message report it with
+    :func:`mark_handler_failed`.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        token = _current_handler.set(name)
+        try:
+            with track(
+                HANDLER_LATENCY, HANDLER_ERRORS, HANDLER_IN_FLIGHT, handler=name
+            ):
+                return await func(*args, **kwargs)
+        finally:
+            _current_handler.reset(token)
+
+    return wrapper
+
+
+def mark_handler_failed() -> None:
+    """Count a failure the running instrumented handler caught itself."""
+    name = _current_handler.get()
+    if name is None:
+        logger.warning("mark_handler_failed() called outside a handler")
+        return
+    HANDLER_ERRORS.inc(handler=name)
+
+
+def render() -> str:
+    """Return all metrics in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+def summary() -> str:
+    """Return a short per-series latency overview for chat output."""
+    lines = []
+    for histogram, errors in (
+        (HANDLER_LATENCY, HANDLER_ERRORS),
+        (DB_LATENCY, DB_ERRORS),
+        (GPT_LATENCY, GPT_ERRORS),
+        (TELEGRAM_LATENCY, None),
+    ):
+        for key in histogram.series():
+            labels = dict(zip(histogram.labelnames, key))
+            failed = int(errors.value(**labels)) if errors else 0
+            lines.append(
+                f"{histogram.name}[{','.join(key)}] n={histogram.count(**labels)} "
+                f"p50={histogram.quantile(0.5, key) * 1000:.0f}ms "
+                f"p95={histogram.quantile(0.95, key) * 1000:.0f}ms "
+                f"p99={histogram.quantile(0.99, key) * 1000:.0f}ms "
+                f"err={failed}"
+            )
+    return "\n".join(lines)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves :func:`render` under ``/metrics``."""
+
+    def do_GET(self) -> None:  # noqa: N802 - name given by the base class
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Silence the per-request access log."""
+
+
+def start_http_server(port: int, addr: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve the metrics on ``http://addr:port/metrics`` in a daemon thread."""
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    thread = threading.Thread(
+        target=server.serve_forever, name="metrics-http", daemon=True
+    )
+    thread.start()
+    logger.info("Serving metrics on %s:%s/metrics", addr, port)
+    return server
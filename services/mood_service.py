@@ -2,21 +2,67 @@
 
 from __future__ import annotations
 
+import csv
+import gzip
+import io
+import json
 import logging
 import sqlite3
-from datetime import date, datetime
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import List, Tuple
+from typing import IO, Dict, Iterable, Iterator, List, Tuple
+
+from services import db
 
 logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).resolve().parents[1] / "data" / "mood.db"
+EXPORT_CHUNK_SIZE = 1000
+IMPORT_BATCH_SIZE = 5000
+SUMMARY_WINDOW_DAYS = 7
+SUMMARY_CACHE_SIZE = 10_000
+
+
+@dataclass(frozen=True)
+class MoodSummary:
+    """Rolling summary of a user's most recent moods.
+
+    The summary keeps the entries of the ``SUMMARY_WINDOW_DAYS`` days up to the
+    latest entry. Since at most one mood is stored per day this is bounded in
+    size, and the window for any later day is a subset of it.
+
+    Attributes:
+        last: Most recent entry as ``(timestamp, mood)`` or ``None``.
+        recent: ``(day, mood)`` entries ordered by day ascending.
+    """
+
+    last: Tuple[datetime, str] | None
+    recent: Tuple[Tuple[date, str], ...] = ()
+
+    def window(self, today: date | None = None) -> List[Tuple[date, str]]:
+        """Return the entries of the trailing window ending on ``today``."""
+        end = today or date.today()
+        start = end - timedelta(days=SUMMARY_WINDOW_DAYS - 1)
+        return [(day, mood) for day, mood in self.recent if start <= day <= end]
+
+    def counts(self, today: date | None = None) -> Dict[str, int]:
+        """Return how often each mood occurs in the trailing window."""
+        return dict(Counter(mood for _, mood in self.window(today)))
+
+
+_summary_cache: OrderedDict[Tuple[str, int], MoodSummary] = OrderedDict()
+_summary_lock = threading.Lock()
 
 
 def init_db(db_path: Path | str = DB_PATH) -> None:
     """Initialize the SQLite database for mood tracking.
 
-    Creates the database file and required table if they do not yet exist.
+    Creates the database file and required table if they do not yet exist and
+    migrates older databases to the indexed ``day`` column.
 
     Args:
         db_path: Path to the SQLite database file.
@@ -24,14 +70,30 @@ def init_db(db_path: Path | str = DB_PATH) -> None:
     try:
         path = Path(db_path)
         path.parent.mkdir(parents=True, exist_ok=True)
-        with sqlite3.connect(path) as conn:
+        with db.connect(path) as conn:
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS moods (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     user_id INTEGER NOT NULL,
                     mood TEXT NOT NULL,
-                    timestamp DATETIME NOT NULL
+                    timestamp DATETIME NOT NULL,
+                    day DATE NOT NULL
+                )
+                """
+            )
+            _migrate_day_column(conn)
+            conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_moods_user_day "
+                "ON moods (user_id, day)"
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS mood_summary (
+                    user_id INTEGER PRIMARY KEY,
+                    last_timestamp DATETIME NOT NULL,
+                    last_mood TEXT NOT NULL,
+                    recent TEXT NOT NULL
                 )
                 """
             )
@@ -40,6 +102,31 @@ def init_db(db_path: Path | str = DB_PATH) -> None:
         raise
 
 
+def _migrate_day_column(conn: sqlite3.Connection) -> None:
+    """Add and backfill the ``day`` column on databases created without it.
+
+    Older versions enforced one entry per day only in application code, so
+    concurrent requests could store duplicates. Those are reduced to the
+    earliest entry of each day before the unique index is created.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(moods)")}
+    if "day" in columns:
+        return
+    conn.execute("ALTER TABLE moods ADD COLUMN day DATE")
+    conn.execute("UPDATE moods SET day = DATE(timestamp)")
+    cur = conn.execute(
+        """
+        DELETE FROM moods WHERE id NOT IN (
+            SELECT MIN(id) FROM moods GROUP BY user_id, day
+        )
+        """
+    )
+    if cur.rowcount:
+        logger.warning(
+            "Removed %s duplicate mood entries during migration", cur.rowcount
+        )
+
+
 def has_entry_for_date(
     user_id: int, day: date, db_path: Path | str = DB_PATH
 ) -> bool:
@@ -54,9 +141,9 @@ def has_entry_for_date(
         True if an entry for the user on ``day`` exists, otherwise False.
     """
     try:
-        with sqlite3.connect(db_path) as conn:
+        with db.connect(db_path) as conn:
             cur = conn.execute(
-                "SELECT 1 FROM moods WHERE user_id = ? AND DATE(timestamp) = ?",
+                "SELECT 1 FROM moods WHERE user_id = ? AND day = ?",
                 (user_id, day.isoformat()),
             )
             return cur.fetchone() is not None
@@ -82,22 +169,226 @@ def save_mood(
     Raises:
         ValueError: If a mood for the user has already been recorded today.
     """
-    ts = timestamp or datetime.utcnow()
-    if has_entry_for_date(user_id, ts.date(), db_path=db_path):
-        raise ValueError("Mood already recorded for today")
+    record_mood(user_id, mood, timestamp, db_path)
 
+
+def record_mood(
+    user_id: int,
+    mood: str,
+    timestamp: datetime | None = None,
+    db_path: Path | str = DB_PATH,
+) -> Tuple[Tuple[datetime, str] | None, MoodSummary]:
+    """Store a mood entry and return the previous entry and the new summary.
+
+    Reading the previous entry, inserting the new one and updating the
+    summary happen in a single ``BEGIN IMMEDIATE`` transaction, so the result
+    is a consistent snapshot even with concurrent writers.
+
+    Args:
+        user_id: Telegram user identifier.
+        mood: Mood description or emoji.
+        timestamp: Time of the entry; defaults to current UTC time.
+        db_path: Path to the SQLite database file.
+
+    Returns:
+        Tuple of the previous entry as ``(timestamp, mood)`` or ``None`` and
+        the updated :class:`MoodSummary`.
+
+    Raises:
+        ValueError: If a mood for the user has already been recorded today.
+    """
+    ts = timestamp or datetime.utcnow()
     try:
-        with sqlite3.connect(db_path) as conn:
+        with db.connect(db_path, immediate=True) as conn:
+            previous = _load_summary(conn, user_id) or _rebuild_summary(conn, user_id)
             conn.execute(
-                "INSERT INTO moods (user_id, mood, timestamp) VALUES (?, ?, ?)",
-                (user_id, mood, ts.isoformat()),
+                "INSERT INTO moods (user_id, mood, timestamp, day) VALUES (?, ?, ?, ?)",
+                (user_id, mood, ts.isoformat(), ts.date().isoformat()),
             )
-            conn.commit()
+            summary = _advance_summary(conn, user_id, ts, mood, previous)
+        _cache_summary(db_path, user_id, summary)
+        return previous.last, summary
+    except sqlite3.IntegrityError as exc:
+        raise ValueError("Mood already recorded for today") from exc
     except sqlite3.Error:
         logger.exception("Failed to save mood for user %s", user_id)
         raise
 
 
+def get_mood_summary(user_id: int, db_path: Path | str = DB_PATH) -> MoodSummary:
+    """Return the rolling mood summary for a user.
+
+    Summaries are served from an in-process cache, then from the
+    ``mood_summary`` table, and only rebuilt from ``moods`` for users whose
+    summary has not been stored yet.
+
+    Args:
+        user_id: Telegram user identifier.
+        db_path: Path to the SQLite database file.
+
+    Returns:
+        The user's :class:`MoodSummary`.
+    """
+    key = (db.database_key(db_path), user_id)
+    with _summary_lock:
+        summary = _summary_cache.get(key)
+        if summary is not None:
+            _summary_cache.move_to_end(key)
+            return summary
+    try:
+        with db.connect(db_path) as conn:
+            summary = _load_summary(conn, user_id)
+            if summary is None:
+                summary = _rebuild_summary(conn, user_id)
+        return _cache_summary(db_path, user_id, summary, replace=False)
+    except sqlite3.Error:
+        logger.exception("Failed to fetch mood summary for user %s", user_id)
+        raise
+
+
+def _load_summary(conn: sqlite3.Connection, user_id: int) -> MoodSummary | None:
+    """Read a stored summary from the ``mood_summary`` table."""
+    row = conn.execute(
+        "SELECT last_timestamp, last_mood, recent FROM mood_summary WHERE user_id = ?",
+        (user_id,),
+    ).fetchone()
+    if row is None:
+        return None
+    recent = tuple((date.fromisoformat(d), m) for d, m in json.loads(row[2]))
+    return MoodSummary((datetime.fromisoformat(row[0]), row[1]), recent)
+
+
+def _rebuild_summary(conn: sqlite3.Connection, user_id: int) -> MoodSummary:
+    """Compute a summary from the ``moods`` table using the day index."""
+    row = conn.execute(
+        "SELECT timestamp, mood, day FROM moods WHERE user_id = ? "
+        "ORDER BY day DESC LIMIT 1",
+        (user_id,),
+    ).fetchone()
+    if row is None:
+        return MoodSummary(None)
+    last_day = date.fromisoformat(row[2])
+    start = last_day - timedelta(days=SUMMARY_WINDOW_DAYS - 1)
+    cur = conn.execute(
+        "SELECT day, mood FROM moods WHERE user_id = ? AND day BETWEEN ? AND ? "
+        "ORDER BY day ASC",
+        (user_id, start.isoformat(), last_day.isoformat()),
+    )
+    recent = tuple((date.fromisoformat(d), m) for d, m in cur.fetchall())
+    return MoodSummary((datetime.fromisoformat(row[0]), row[1]), recent)
+
+
+def _advance_summary(
+    conn: sqlite3.Connection,
+    user_id: int,
+    ts: datetime,
+    mood: str,
+    previous: MoodSummary,
+) -> MoodSummary:
+    """Update and store the summary after a new entry has been inserted.
+
+    Entries newer than the ``previous`` summary are appended and expired
+    entries dropped in constant time. Out-of-order entries fall back to a
+    rebuild.
+    """
+    day = ts.date()
+    if previous.last is None:
+        summary = MoodSummary((ts, mood), ((day, mood),))
+    elif day > previous.last[0].date():
+        start = day - timedelta(days=SUMMARY_WINDOW_DAYS - 1)
+        recent = tuple(e for e in previous.recent if e[0] >= start)
+        summary = MoodSummary((ts, mood), recent + ((day, mood),))
+    else:
+        summary = _rebuild_summary(conn, user_id)
+    _store_summary(conn, user_id, summary)
+    return summary
+
+
+def _store_summary(
+    conn: sqlite3.Connection, user_id: int, summary: MoodSummary
+) -> None:
+    """Persist ``summary`` in the ``mood_summary`` table."""
+    if summary.last is None:
+        return
+    recent = json.dumps([[d.isoformat(), m] for d, m in summary.recent])
+    conn.execute(
+        "INSERT OR REPLACE INTO mood_summary "
+        "(user_id, last_timestamp, last_mood, recent) VALUES (?, ?, ?, ?)",
+        (user_id, summary.last[0].isoformat(), summary.last[1], recent),
+    )
+
+
+def _cache_summary(
+    db_path: Path | str, user_id: int, summary: MoodSummary, replace: bool = True
+) -> MoodSummary:
+    """Store ``summary`` in the in-process LRU cache and return the cached value.
+
+    Readers pass ``replace=False`` so that a summary read before a concurrent
+    write commits never overwrites the fresher one cached by the writer.
+    """
+    key = (db.database_key(db_path), user_id)
+    with _summary_lock:
+        if replace or key not in _summary_cache:
+            _summary_cache[key] = summary
+        _summary_cache.move_to_end(key)
+        while len(_summary_cache) > SUMMARY_CACHE_SIZE:
+            _summary_cache.popitem(last=False)
+        return _summary_cache[key]
+
+
+def _evict_summaries(db_path: Path | str, user_ids: Iterable[int]) -> None:
+    """Drop cached summaries so they are reloaded on next access."""
+    key = db.database_key(db_path)
+    with _summary_lock:
+        for user_id in user_ids:
+            _summary_cache.pop((key, user_id), None)
+
+
+def import_moods(
+    records: Iterable[Tuple[int, str, datetime]],
+    batch_size: int = IMPORT_BATCH_SIZE,
+    db_path: Path | str = DB_PATH,
+) -> int:
+    """Bulk insert historical mood entries.
+
+    Records are written with ``executemany`` in one transaction per batch.
+    Entries for a day on which the user already has a mood are skipped.
+
+    Args:
+        records: Iterable of ``(user_id, mood, timestamp)`` tuples.
+        batch_size: Number of records written per transaction.
+        db_path: Path to the SQLite database file.
+
+    Returns:
+        Number of inserted entries.
+    """
+    inserted = 0
+    try:
+        with db.connect(db_path) as conn:
+            for batch in db.batched(records, batch_size):
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO moods (user_id, mood, timestamp, day) "
+                    "VALUES (?, ?, ?, ?)",
+                    (
+                        (user_id, mood, ts.isoformat(), ts.date().isoformat())
+                        for user_id, mood, ts in batch
+                    ),
+                )
+                inserted += conn.total_changes - before
+                users = {user_id for user_id, _, _ in batch}
+                conn.executemany(
+                    "DELETE FROM mood_summary WHERE user_id = ?",
+                    ((user_id,) for user_id in users),
+                )
+                conn.commit()
+                _evict_summaries(db_path, users)
+        return inserted
+    except sqlite3.Error:
+        logger.exception("Failed to import moods after %s entries", inserted)
+        raise
+
+
 def get_moods(
     user_id: int,
     start_date: date,
@@ -116,12 +407,12 @@ def get_moods(
         List of tuples ``(timestamp, mood)`` ordered by timestamp ascending.
     """
     try:
-        with sqlite3.connect(db_path) as conn:
+        with db.connect(db_path) as conn:
             cur = conn.execute(
                 """
                 SELECT timestamp, mood FROM moods
-                WHERE user_id = ? AND DATE(timestamp) BETWEEN ? AND ?
-                ORDER BY timestamp ASC
+                WHERE user_id = ? AND day BETWEEN ? AND ?
+                ORDER BY day ASC
                 """,
                 (user_id, start_date.isoformat(), end_date.isoformat()),
             )
@@ -147,10 +438,10 @@ def get_last_mood(
         Tuple of ``(timestamp, mood)`` or ``None`` if no entries exist.
     """
     try:
-        with sqlite3.connect(db_path) as conn:
+        with db.connect(db_path) as conn:
             cur = conn.execute(
                 "SELECT timestamp, mood FROM moods WHERE user_id = ? "
-                "ORDER BY timestamp DESC LIMIT 1",
+                "ORDER BY day DESC LIMIT 1",
                 (user_id,),
             )
             row = cur.fetchone()
@@ -160,6 +451,43 @@ def get_last_mood(
         raise
 
 
+def export_moods(
+    destination: Path | str | IO,
+    user_ids: Iterable[int] | None = None,
+    compress: bool = False,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+    db_path: Path | str = DB_PATH,
+) -> int:
+    """Stream mood entries of several or all users into a CSV file.
+
+    Rows are read from the cursor in chunks of ``chunk_size`` and written
+    immediately, so memory use does not depend on the size of the table.
+
+    Args:
+        destination: Target path or an open file object. File objects must be
+            opened in text mode, or in binary mode when ``compress`` is set.
+        user_ids: Users to export; exports all users when ``None``.
+        compress: Whether to gzip-compress the output on the fly.
+        chunk_size: Number of rows fetched from the database at once.
+        db_path: Path to the SQLite database file.
+
+    Returns:
+        Number of exported mood entries.
+    """
+    count = 0
+    try:
+        with _open_export(destination, compress) as out, db.connect(db_path) as conn:
+            writer = csv.writer(out)
+            writer.writerow(["user_id", "timestamp", "mood"])
+            for rows in _iter_mood_chunks(conn, user_ids, chunk_size):
+                writer.writerows(rows)
+                count += len(rows)
+        return count
+    except Exception:
+        logger.exception("Failed to export moods after %s rows", count)
+        raise
+
+
 def export_moods_to_csv(
     user_id: int, file_path: Path | str, db_path: Path | str = DB_PATH
 ) -> None:
@@ -170,15 +498,54 @@ def export_moods_to_csv(
         file_path: Destination path for the CSV file.
         db_path: Path to the SQLite database file.
     """
-    import csv
-
     try:
-        moods = get_moods(user_id, date.min, date.max, db_path=db_path)
-        with open(file_path, "w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.writer(csvfile)
+        with _open_export(file_path, False) as out, db.connect(db_path) as conn:
+            writer = csv.writer(out)
             writer.writerow(["timestamp", "mood"])
-            for ts, mood in moods:
-                writer.writerow([ts.isoformat(), mood])
+            for rows in _iter_mood_chunks(conn, [user_id], EXPORT_CHUNK_SIZE):
+                writer.writerows(row[1:] for row in rows)
     except Exception:
         logger.exception("Failed to export moods to CSV for user %s", user_id)
         raise
+
+
+def _iter_mood_chunks(
+    conn: sqlite3.Connection, user_ids: Iterable[int] | None, chunk_size: int
+) -> Iterator[List[Tuple[int, str, str]]]:
+    """Yield ``(user_id, timestamp, mood)`` rows in chunks, ordered by user and day."""
+    if user_ids is None:
+        queries: Iterable[Tuple[str, tuple]] = [
+            ("SELECT user_id, timestamp, mood FROM moods ORDER BY user_id, day", ())
+        ]
+    else:
+        queries = (
+            (
+                "SELECT user_id, timestamp, mood FROM moods "
+                "WHERE user_id = ? ORDER BY day",
+                (user_id,),
+            )
+            for user_id in user_ids
+        )
+    for sql, params in queries:
+        cur = conn.execute(sql, params)
+        while rows := cur.fetchmany(chunk_size):
+            yield rows
+
+
+@contextmanager
+def _open_export(destination: Path | str | IO, compress: bool) -> Iterator[IO]:
+    """Open ``destination`` as a text stream for CSV output."""
+    if isinstance(destination, (str, Path)):
+        opener = gzip.open if compress else open
+        with opener(destination, "wt", newline="", encoding="utf-8") as out:
+            yield out
+    elif compress:
+        with gzip.GzipFile(fileobj=destination, mode="wb") as gz:
+            out = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+            try:
+                yield out
+            finally:
+                out.flush()
+                out.detach()
+    else:
+        yield destination
@@ -0,0 +1,133 @@
+"""Prompt templates and token budgeting for GPT requests."""
+
+from __future__ import annotations
+
+import logging
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+try:  # optional, exact token counts for OpenAI models
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIR = Path(__file__).resolve().parents[1] / "prompts"
+SYSTEM_TEMPLATE = "reflection_system"
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """Prompt template following the ``Ziel/Kontext/Frage/Ausgabeformat`` layout.
+
+    Attributes:
+        name: File name without the ``.txt`` suffix.
+        text: Raw template text; ``{placeholders}`` are filled by :meth:`render`.
+        sections: Template lines keyed by their section name, e.g. ``"Frage"``.
+    """
+
+    name: str
+    text: str
+    sections: Dict[str, str]
+
+    @classmethod
+    def parse(cls, name: str, text: str) -> PromptTemplate:
+        """Build a template from the contents of a prompt file."""
+        sections = {}
+        for line in text.splitlines():
+            key, sep, value = line.partition(":")
+            if sep and key.strip():
+                sections[key.strip()] = value.strip()
+        return cls(name, text.strip(), sections)
+
+    def render(self, **values: str) -> str:
+        """Return the template with its placeholders filled in, one line per section."""
+        return " ".join(self.text.format(**values).splitlines())
+
+
+class PromptRegistry:
+    """Loads the templates in ``prompts/`` once and assembles chat messages.
+
+    Attributes:
+        model: Model name used to pick the tokenizer.
+    """
+
+    def __init__(
+        self, directory: Path | str = PROMPTS_DIR, model: str = "gpt-3.5-turbo"
+    ) -> None:
+        self.model = model
+        self._templates: Dict[str, PromptTemplate] = {}
+        for path in sorted(Path(directory).glob("*.txt")):
+            self._templates[path.stem] = PromptTemplate.parse(
+                path.stem, path.read_text(encoding="utf-8")
+            )
+        self._system: Dict[str, str] = {}
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        logger.info("Loaded %s prompt templates", len(self._templates))
+
+    def get(self, name: str) -> PromptTemplate:
+        """Return the template called ``name``.
+
+        Raises:
+            KeyError: If no such template exists.
+        """
+        return self._templates[name]
+
+    def system_prompt(self, style: str) -> str:
+        """Return the rendered system prompt for ``style``, rendering it once."""
+        prompt = self._system.get(style)
+        if prompt is None:
+            prompt = self.get(SYSTEM_TEMPLATE).render(style=style)
+            self._system[style] = prompt
+        return prompt
+
+    def count_tokens(self, text: str) -> int:
+        """Return the number of tokens in ``text``.
+
+        Uses ``tiktoken`` if installed and otherwise estimates four characters
+        per token, which is close for German and English prose.
+        """
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut ``text`` to at most ``max_tokens`` tokens."""
+        if self.count_tokens(text) <= max_tokens:
+            return text
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text)[: max_tokens - 1]
+            return self._encoding.decode(tokens).rstrip() + "…"
+        cut = text[: (max_tokens - 1) * CHARS_PER_TOKEN]
+        if " " in cut:
+            cut = cut.rsplit(" ", 1)[0]
+        return cut.rstrip() + "…"
+
+    def build_messages(
+        self, prompt: str, style: str, max_prompt_tokens: int
+    ) -> Tuple[List[Dict[str, str]], int]:
+        """Return the chat messages for a reflection and their token count.
+
+        The user prompt is sent once, as the user message, cut to
+        ``max_prompt_tokens``.
+        """
+        system = self.system_prompt(style)
+        user = self.truncate(prompt, max_prompt_tokens)
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ]
+        tokens = sum(
+            self.count_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages
+        )
+        return messages, tokens
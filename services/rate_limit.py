@@ -0,0 +1,183 @@
+"""Rate limiting and request coalescing shared by the bot and the services."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class RateLimitExceeded(RuntimeError):
+    """Raised when a request is rejected by a rate limit.
+
+    Attributes:
+        retry_after: Seconds until the request would be permitted.
+    """
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    The bucket holds up to ``capacity`` tokens and refills continuously at
+    ``rate`` tokens per second. Each permitted action consumes one token.
+
+    Attributes:
+        capacity: Maximum number of tokens, i.e. the allowed burst size.
+        rate: Tokens added per second.
+    """
+
+    def __init__(
+        self,
+        capacity: float,
+        rate: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.capacity = capacity
+        self.rate = rate
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        """Add the tokens accumulated since the last update."""
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Consume ``tokens`` if available and report whether that succeeded."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def release(self, tokens: float = 1) -> None:
+        """Return previously acquired ``tokens`` to the bucket."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Consume ``tokens`` unconditionally and return the wait in seconds.
+
+        The bucket may go negative; the returned delay is how long the caller
+        has to wait before the reserved tokens are actually available.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def retry_after(self, tokens: float = 1) -> float:
+        """Return the seconds until ``tokens`` can be acquired."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+
+class KeyedRateLimiter:
+    """One :class:`TokenBucket` per key, e.g. per user.
+
+    At most ``max_keys`` buckets are kept; the least recently used one is
+    dropped first, which at worst grants an idle key a fresh burst.
+
+    Attributes:
+        capacity: Burst size of each bucket.
+        rate: Tokens added per second to each bucket.
+        max_keys: Maximum number of buckets kept in memory.
+    """
+
+    def __init__(
+        self,
+        capacity: float,
+        rate: float,
+        max_keys: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: OrderedDict[Hashable, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bucket(self, key: Hashable) -> TokenBucket:
+        """Return the bucket for ``key``, creating it if necessary."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.capacity, self.rate, self._clock)
+                self._buckets[key] = bucket
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket
+
+    def try_acquire(self, key: Hashable, tokens: float = 1) -> bool:
+        """Consume ``tokens`` from the bucket of ``key`` if available."""
+        return self.bucket(key).try_acquire(tokens)
+
+
+class SingleFlight:
+    """Coalesces concurrent async calls that share a key.
+
+    The first caller for a key runs the call; callers arriving while it is in
+    flight wait for and receive the same result or exception. Must be used
+    from a single event loop.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Future[Any]] = {}
+
+    def pending(self, key: Hashable) -> asyncio.Future[Any] | None:
+        """Return the future of the in-flight call for ``key``, if any."""
+        return self._calls.get(key)
+
+    def start(self, key: Hashable) -> asyncio.Future[Any]:
+        """Register the caller as leader for ``key`` and return its future."""
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        return future
+
+    def finish(
+        self, key: Hashable, result: Any = None, exc: BaseException | None = None
+    ) -> None:
+        """Publish the leader's outcome; does nothing if already finished."""
+        future = self._calls.pop(key, None)
+        if future is None or future.done():
+            return
+        if exc is None:
+            future.set_result(result)
+        elif isinstance(exc, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(exc)
+            future.exception()  # followers are optional; avoid "never retrieved"
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Run ``func`` once for all concurrent callers with ``key``."""
+        pending = self.pending(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        self.start(key)
+        try:
+            result = await func()
+        except BaseException as exc:
+            self.finish(key, exc=exc)
+            raise
+        self.finish(key, result)
+        return result
@@ -0,0 +1,158 @@
+"""Cache for GPT reflections of near-identical requests."""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+from services import db
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(__file__).resolve().parents[1] / "data" / "reflection_cache.db"
+CACHE_SIZE = 1000
+CACHE_TTL = 6 * 60 * 60
+
+
+def make_key(model: str, style: str, prompt: str) -> str:
+    """Return the cache key for a reflection request.
+
+    The prompt is compared case-insensitively and with whitespace collapsed,
+    so ``"Stimmung: gut.  Nutzertext: "`` and ``"stimmung: gut. nutzertext:"``
+    share an entry. Only the hash is kept, so user texts are not stored as
+    keys.
+    """
+    normalized = " ".join(prompt.lower().split())
+    return sha256("\x1f".join((model, style, normalized)).encode()).hexdigest()
+
+
+class ReflectionCache:
+    """Size-bounded LRU cache of reflections with a time to live.
+
+    With a ``db_path`` the entries are written through to SQLite and the
+    newest unexpired ones are loaded again on startup.
+
+    Attributes:
+        max_size: Maximum number of entries kept in memory.
+        ttl: Seconds after which an entry expires.
+        db_path: Optional SQLite file for persistence across restarts.
+        hits: Number of lookups answered from the cache.
+        misses: Number of lookups that found no valid entry.
+    """
+
+    def __init__(
+        self,
+        max_size: int = CACHE_SIZE,
+        ttl: float = CACHE_TTL,
+        db_path: Path | str | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        if db_path is not None:
+            self._load()
+
+    def _load(self) -> None:
+        """Create the cache table and load the newest unexpired entries."""
+        path = Path(self.db_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with db.connect(path) as conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS reflection_cache (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                    """
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_reflection_cache_created "
+                    "ON reflection_cache(created_at)"
+                )
+                cutoff = self._clock() - self.ttl
+                conn.execute(
+                    "DELETE FROM reflection_cache WHERE created_at < ?", (cutoff,)
+                )
+                rows = conn.execute(
+                    "SELECT key, response, created_at FROM reflection_cache "
+                    "ORDER BY created_at DESC LIMIT ?",
+                    (self.max_size,),
+                ).fetchall()
+        except sqlite3.Error:
+            logger.exception("Failed to load reflection cache")
+            return
+        for key, response, created_at in reversed(rows):
+            self._entries[key] = (created_at, response)
+
+    def get(self, key: str) -> str | None:
+        """Return the cached reflection for ``key`` or ``None``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: str) -> None:
+        """Store a reflection, evicting the least recently used entries.
+
+        The table is pruned in the same transaction: expired rows and rows
+        beyond the newest ``max_size`` are deleted, so it does not grow while
+        the bot runs.
+        """
+        created_at = self._clock()
+        with self._lock:
+            self._entries[key] = (created_at, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        if self.db_path is None:
+            return
+        try:
+            with db.connect(self.db_path, immediate=True) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO reflection_cache "
+                    "(key, response, created_at) VALUES (?, ?, ?)",
+                    (key, response, created_at),
+                )
+                conn.execute(
+                    """
+                    DELETE FROM reflection_cache
+                    WHERE created_at < ? OR created_at <= (
+                        SELECT created_at FROM reflection_cache
+                        ORDER BY created_at DESC LIMIT 1 OFFSET ?
+                    )
+                    """,
+                    (created_at - self.ttl, self.max_size),
+                )
+        except sqlite3.Error:
+            logger.exception("Failed to persist reflection cache entry")
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit and miss counters, the hit rate and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+            }
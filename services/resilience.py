@@ -0,0 +1,188 @@
+"""Retries, circuit breaking and offline fallbacks for upstream calls."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterator, TypeVar
+
+from services.prompts import PROMPTS_DIR
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TEMPLATE_PATH = PROMPTS_DIR / "reflection_prompt.txt"
+
+
+class CircuitOpen(RuntimeError):
+    """Raised instead of calling an upstream that is considered unhealthy."""
+
+
+def backoff_delays(
+    retries: int, base: float = 0.5, cap: float = 4.0
+) -> Iterator[float]:
+    """Yield ``retries`` delays with full-jitter exponential backoff.
+
+    The n-th delay is drawn uniformly from ``[0, min(cap, base * 2**n)]``,
+    which spreads retries of many clients instead of synchronizing them.
+    """
+    for attempt in range(retries):
+        yield random.uniform(0, min(cap, base * 2**attempt))
+
+
+def retry_call(
+    func: Callable[[], T],
+    should_retry: Callable[[Exception], bool],
+    retries: int = 2,
+    base: float = 0.5,
+    cap: float = 4.0,
+) -> T:
+    """Call ``func`` and retry it after transient errors.
+
+    Args:
+        func: Callable performing one attempt.
+        should_retry: Decides whether an exception is worth another attempt.
+        retries: Maximum number of additional attempts.
+        base: Backoff base in seconds.
+        cap: Upper bound for a single delay in seconds.
+    """
+    delays = backoff_delays(retries, base, cap)
+    while True:
+        try:
+            return func()
+        except Exception as exc:
+            delay = next(delays, None)
+            if delay is None or not should_retry(exc):
+                raise
+            logger.warning("Transient error, retrying in %.2fs: %s", delay, exc)
+            time.sleep(delay)
+
+
+async def aretry_call(
+    func: Callable[[], Awaitable[T]],
+    should_retry: Callable[[Exception], bool],
+    retries: int = 2,
+    base: float = 0.5,
+    cap: float = 4.0,
+) -> T:
+    """Awaitable version of :func:`retry_call`."""
+    delays = backoff_delays(retries, base, cap)
+    while True:
+        try:
+            return await func()
+        except Exception as exc:
+            delay = next(delays, None)
+            if delay is None or not should_retry(exc):
+                raise
+            logger.warning("Transient error, retrying in %.2fs: %s", delay, exc)
+            await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """Fails fast after repeated upstream failures.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    :meth:`allow` rejects calls for ``reset_timeout`` seconds. Then a single
+    trial call is let through; its outcome closes or reopens the circuit. A
+    trial that never reports back is replaced after another ``reset_timeout``.
+
+    Attributes:
+        failure_threshold: Consecutive failures that open the circuit.
+        reset_timeout: Seconds to stay open before a trial call.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_at: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Return ``"closed"``, ``"open"`` or ``"half-open"``."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        """Return whether a call may go to the upstream now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = self._clock()
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            if self._trial_at is not None and now - self._trial_at < self.reset_timeout:
+                return False
+            self._trial_at = now
+            return True
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful call."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_at = None
+
+    def record_failure(self) -> None:
+        """Count a failed call and open the circuit if necessary."""
+        with self._lock:
+            self._failures += 1
+            if self._trial_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Circuit opened after %s failures", self._failures)
+                self._opened_at = self._clock()
+                self._trial_at = None
+
+
+class TemplateFallback:
+    """Builds a simple reflection from a local prompt template.
+
+    Used when the model cannot be reached, so users still get a reflection
+    question instead of an error. The template follows the repository's
+    ``Ziel/Kontext/Frage/Ausgabeformat`` layout; its ``Frage`` line is used.
+
+    Attributes:
+        question: Reflection question taken from the template.
+    """
+
+    OPENERS: Dict[str, str] = {
+        "motivierend": "Du machst das gut – jeder Schritt zählt!",
+        "analytisch": "Lass uns deinen Tag strukturiert betrachten.",
+        "humorvoll": "Auch Superhelden brauchen mal eine Verschnaufpause.",
+    }
+    DEFAULT_QUESTION = "Was hat dich heute am meisten beschäftigt und warum?"
+
+    def __init__(self, template_path: Path | str = TEMPLATE_PATH) -> None:
+        self.question = self.DEFAULT_QUESTION
+        try:
+            for line in Path(template_path).read_text(encoding="utf-8").splitlines():
+                if line.startswith("Frage:"):
+                    self.question = line.split(":", 1)[1].strip().strip('"')
+        except OSError:
+            logger.warning("Reflection template %s not readable", template_path)
+
+    def render(self, style: str) -> str:
+        """Return the fallback reflection for ``style``."""
+        opener = self.OPENERS.get(style, self.OPENERS["motivierend"])
+        return (
+            f"{opener}\n\n"
+            "Der Coach ist gerade nicht erreichbar, deshalb eine Frage zum "
+            f"Nachdenken: {self.question}"
+        )
@@ -0,0 +1,77 @@
+"""Tests for :mod:`services.async_db`."""
+
+import asyncio
+from datetime import date, datetime
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services import async_db, habit_service, mood_service
+
+
+@pytest.fixture
+def databases(tmp_path):
+    """Point the facade at temporary databases."""
+    mood_db = tmp_path / "mood.db"
+    habit_db = tmp_path / "habits.db"
+    mood_service.init_db(mood_db)
+    habit_service.init_db(habit_db)
+    previous = (async_db.mood_db_path, async_db.habit_db_path)
+    async_db.configure(mood_db, habit_db)
+    yield
+    async_db.shutdown()
+    async_db.configure(*previous)
+
+
+def test_mood_roundtrip(databases) -> None:
+    """Moods saved through the facade can be read back."""
+
+    async def scenario():
+        await async_db.save_mood(1, "gut", datetime(2024, 1, 1, 9, 0))
+        with pytest.raises(ValueError):
+            await async_db.save_mood(1, "schlecht", datetime(2024, 1, 1, 18, 0))
+        last = await async_db.get_last_mood(1)
+        week = await async_db.get_moods(1, date(2024, 1, 1), date(2024, 1, 7))
+        return last, week
+
+    last, week = asyncio.run(scenario())
+    assert last[1] == "gut"
+    assert [m for _, m in week] == ["gut"]
+
+
+def test_concurrent_habit_completions(databases) -> None:
+    """Concurrent writes are serialized by the writer thread."""
+
+    async def scenario():
+        habit_id = await async_db.create_habit(1, "lesen")
+        await asyncio.gather(
+            *(
+                async_db.complete_habit(1, habit_id, date(2024, 1, day))
+                for day in range(1, 6)
+            )
+        )
+        return await async_db.get_habit_streak(1, habit_id)
+
+    assert asyncio.run(scenario()) == 5
+
+
+def test_databases_are_initialized_on_first_use(tmp_path) -> None:
+    """The facade creates the schema itself when a database is first used."""
+    previous = (async_db.mood_db_path, async_db.habit_db_path)
+    async_db.configure(tmp_path / "fresh_mood.db", tmp_path / "fresh_habits.db")
+
+    async def scenario():
+        habit_id = await async_db.create_habit(1, "lesen")
+        summary = await async_db.get_mood_summary(1)
+        return habit_id, summary
+
+    try:
+        habit_id, summary = asyncio.run(scenario())
+    finally:
+        async_db.shutdown()
+        async_db.configure(*previous)
+    assert habit_id == 1
+    assert summary.last is None
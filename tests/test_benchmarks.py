@@ -0,0 +1,50 @@
+"""Tests for the handler benchmark in :mod:`benchmarks.bench_handlers`."""
+
+import asyncio
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from benchmarks import bench_handlers
+from benchmarks.bench_handlers import BenchmarkConfig
+
+
+def test_benchmark_replays_workload_against_stubs(tmp_path: Path) -> None:
+    """Every generated update is measured and /reflect reaches the stub."""
+    config = BenchmarkConfig(users=3, updates=40, concurrency=4, model_latency=0.0)
+
+    result = asyncio.run(bench_handlers.run(config, tmp_path))
+
+    workload = bench_handlers.generate_workload(config)
+    expected = {command for command, _, _ in workload}
+    assert set(result["commands"]) == expected
+    assert result["updates"] == 40
+    assert all(stats["errors"] == 0 for stats in result["commands"].values())
+    assert result["model_requests"] == result["commands"]["reflect"]["count"]
+    assert result["commands"]["mood"]["p50_ms"] <= result["commands"]["mood"]["p99_ms"]
+
+
+def test_production_gpt_counts_rate_limited_reflections(tmp_path: Path) -> None:
+    """With the bot's limits, refused reflections are reported as errors."""
+    config = BenchmarkConfig(
+        users=1,
+        updates=5,
+        mix={"reflect": 1},
+        model_latency=0.0,
+        production_gpt=True,
+    )
+
+    result = asyncio.run(bench_handlers.run(config, tmp_path))
+
+    assert result["commands"]["reflect"]["errors"] == 2
+    assert result["model_requests"] == 3
+
+
+def test_percentile_uses_nearest_rank() -> None:
+    """Percentiles pick an observed value without interpolation."""
+    values = [float(n) for n in range(1, 101)]
+
+    assert bench_handlers.percentile(values, 50) == 50.0
+    assert bench_handlers.percentile(values, 99) == 99.0
+    assert bench_handlers.percentile([3.0], 95) == 3.0
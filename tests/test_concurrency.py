@@ -0,0 +1,68 @@
+"""Tests for :mod:`bot.concurrency`."""
+
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bot.concurrency import PerUserUpdateProcessor
+
+
+def _update(user_id: int) -> SimpleNamespace:
+    return SimpleNamespace(effective_user=SimpleNamespace(id=user_id))
+
+
+def test_updates_are_ordered_per_user_and_concurrent_across_users() -> None:
+    """Same-user updates run in order; other users are not blocked."""
+    events = []
+
+    async def handle(name: str, delay: float) -> None:
+        events.append(f"start {name}")
+        await asyncio.sleep(delay)
+        events.append(f"end {name}")
+
+    async def scenario() -> None:
+        processor = PerUserUpdateProcessor(8)
+        async with processor:
+            await asyncio.gather(
+                processor.process_update(_update(1), handle("a1", 0.02)),
+                processor.process_update(_update(1), handle("a2", 0)),
+                processor.process_update(_update(2), handle("b1", 0)),
+            )
+        assert processor._locks == {}
+
+    asyncio.run(scenario())
+    assert events.index("end a1") < events.index("start a2")
+    assert events.index("end b1") < events.index("end a1")
+
+
+def test_waiting_updates_of_one_user_do_not_take_slots_from_others() -> None:
+    """A slow user with queued follow-ups leaves free slots for other users."""
+    finished = {}
+
+    async def handle(name: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        finished[name] = asyncio.get_running_loop().time()
+
+    async def scenario() -> float:
+        processor = PerUserUpdateProcessor(4)
+        async with processor:
+            start = asyncio.get_running_loop().time()
+            slow = [processor.process_update(_update(1), handle("a1", 0.3))]
+            slow += [
+                processor.process_update(_update(1), handle(f"a{i}", 0))
+                for i in range(2, 5)
+            ]
+            tasks = [asyncio.create_task(call) for call in slow]
+            await asyncio.sleep(0.01)
+            assert processor.current_concurrent_updates == 1
+            await processor.process_update(_update(2), handle("b1", 0))
+            await asyncio.gather(*tasks)
+        assert processor.max_concurrent_updates == 4
+        return start
+
+    start = asyncio.run(scenario())
+    assert finished["b1"] - start < 0.1
+    assert finished["b1"] < finished["a1"] < finished["a2"]
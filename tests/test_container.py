@@ -0,0 +1,32 @@
+"""Tests for :mod:`services.container`."""
+
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.container import ServiceContainer
+
+
+def test_services_are_built_once_on_first_use() -> None:
+    """Factories run lazily, once, and failures are retried later."""
+    container = ServiceContainer()
+    calls = []
+
+    def factory() -> object:
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("not configured")
+        return object()
+
+    container.register("svc", factory)
+    assert calls == [] and container.built("svc") is None
+    with pytest.raises(RuntimeError):
+        container.get("svc")
+    service = container.get("svc")
+    assert container.get("svc") is service
+    assert len(calls) == 2
+    assert "svc" in container.timings
+    assert "total" in container.report()
@@ -0,0 +1,43 @@
+"""Tests for :mod:`services.db`."""
+
+from pathlib import Path
+import sys
+import threading
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services import db
+
+
+def test_connections_are_reused_and_use_wal(tmp_path) -> None:
+    """Pooled connections are configured once and handed out again."""
+    path = tmp_path / "pool.db"
+    with db.connect(path) as conn:
+        first = conn
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    with db.connect(path) as conn:
+        assert conn is first
+    assert mode == "wal"
+    db.close_all()
+
+
+def test_pool_is_thread_safe(tmp_path) -> None:
+    """Concurrent writers share the pool without losing rows."""
+    path = tmp_path / "pool.db"
+    with db.connect(path) as conn:
+        conn.execute("CREATE TABLE t (v INTEGER)")
+
+    def worker(value: int) -> None:
+        for _ in range(20):
+            with db.connect(path) as conn:
+                conn.execute("INSERT INTO t (v) VALUES (?)", (value,))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with db.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 160
+    assert db.get_pool(path)._created <= db.POOL_SIZE
+    db.close_all()
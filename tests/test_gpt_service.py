@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 from hashlib import sha256
 from pathlib import Path
@@ -12,7 +13,11 @@ import pytest
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+from services import gpt_log, metrics
 from services.gpt_service import GPTService
+from services.rate_limit import KeyedRateLimiter, RateLimitExceeded
+from services.reflection_cache import ReflectionCache
+from services.resilience import CircuitBreaker, TemplateFallback
 
 
 def _fake_chat_completion_create(**_: dict) -> dict:
@@ -23,11 +28,225 @@ def test_generate_reflection(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) ->
     """Ensure ``generate_reflection`` returns text and logs interactions."""
     monkeypatch.setenv("OPENAI_API_KEY", "test")
     monkeypatch.setattr(openai.ChatCompletion, "create", _fake_chat_completion_create)
-    log_file = tmp_path / "log.json"
-    service = GPTService(log_path=log_file)
+    log_db = tmp_path / "gpt_logs.db"
+    service = GPTService(log_path=log_db, legacy_log_path=tmp_path / "log.json")
     result = service.generate_reflection("Prompt", user_id=1, style="analytisch")
     assert result == "Reflexion"
-    data = json.loads(log_file.read_text())
+    entries = gpt_log.get_interactions(1, log_db)
+    assert len(entries) == 1
+    assert entries[0]["prompt"] == "Prompt"
+    assert entries[0]["response"] == "Reflexion"
+    assert entries[0]["prompt_tokens"] > 0
+
+
+def test_log_keeps_last_five_and_migrates_json(tmp_path: Path) -> None:
+    """Legacy entries are imported once and only the newest five are kept."""
+    legacy = tmp_path / "gpt_logs.json"
     user_hash = sha256(b"1").hexdigest()
-    assert user_hash in data
-    assert data[user_hash][0]["prompt"] == "Prompt"
+    old = [{"prompt": f"p{i}", "response": f"r{i}"} for i in range(3)]
+    legacy.write_text(json.dumps({user_hash: old}))
+    db = tmp_path / "gpt_logs.db"
+    gpt_log.init_db(db)
+    assert gpt_log.migrate_json(legacy, db) == 3
+    assert not legacy.exists()
+    assert gpt_log.migrate_json(legacy, db) == 0
+
+    for i in range(3, 8):
+        gpt_log.log_interaction(1, f"p{i}", f"r{i}", db)
+    gpt_log.log_interaction(2, "other", "answer", db)
+    entries = gpt_log.get_interactions(1, db)
+    assert [e["prompt"] for e in entries] == [f"p{i}" for i in range(3, 8)]
+    assert len(gpt_log.get_interactions(2, db)) == 1
+
+
+def test_agenerate_reflection_bounds_concurrency(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Concurrent async reflections never exceed ``max_concurrency``."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    in_flight = peak = 0
+
+    async def fake_acreate(**_: dict) -> dict:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {"choices": [{"message": {"content": " Reflexion "}}]}
+
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", fake_acreate)
+    service = GPTService(
+        log_path=tmp_path / "gpt_logs.db",
+        legacy_log_path=tmp_path / "log.json",
+        max_concurrency=2,
+    )
+
+    async def scenario() -> list:
+        try:
+            return await asyncio.gather(
+                *(
+                    service.agenerate_reflection(f"Prompt {i}", user_id=i)
+                    for i in range(5)
+                )
+            )
+        finally:
+            await service.aclose()
+
+    assert asyncio.run(scenario()) == ["Reflexion"] * 5
+    assert peak == 2
+
+
+def test_agenerate_reflection_deadline(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Requests exceeding ``request_timeout`` fail with a readable error."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    async def slow_acreate(**_: dict) -> dict:
+        await asyncio.sleep(1)
+        return {}
+
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", slow_acreate)
+    service = GPTService(
+        log_path=tmp_path / "gpt_logs.db",
+        legacy_log_path=tmp_path / "log.json",
+        request_timeout=0.01,
+    )
+
+    async def scenario() -> None:
+        try:
+            await service.agenerate_reflection("Prompt", user_id=1)
+        finally:
+            await service.aclose()
+
+    with pytest.raises(RuntimeError, match="zu lange"):
+        asyncio.run(scenario())
+
+
+def test_generate_reflection_uses_cache(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Repeated near-identical prompts are answered from the cache."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    calls = []
+
+    def counting_create(**kwargs: dict) -> dict:
+        calls.append(kwargs)
+        return _fake_chat_completion_create()
+
+    monkeypatch.setattr(openai.ChatCompletion, "create", counting_create)
+    service = GPTService(
+        log_path=tmp_path / "gpt_logs.db",
+        legacy_log_path=tmp_path / "log.json",
+        cache=ReflectionCache(),
+    )
+    service.generate_reflection("Stimmung: gut. Nutzertext: ", user_id=1)
+    result = service.generate_reflection("stimmung: gut.  nutzertext:", user_id=2)
+    assert result == "Reflexion"
+    assert len(calls) == 1
+    assert service.cache.hits == 1
+
+
+def test_astream_reflection_yields_parts_and_logs(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Streamed parts arrive in order and the full text is logged once.
+
+    The latency metrics only count waiting on the model, not the consumer.
+    """
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    latency = metrics.Histogram("test_gpt_seconds", "Test.", ["operation"], [0.04])
+    monkeypatch.setattr(metrics, "GPT_LATENCY", latency)
+
+    async def fake_acreate(**kwargs: dict):
+        assert kwargs["stream"] is True
+
+        async def chunks():
+            for text in ("Du ", "schaffst ", "das.", None):
+                yield {"choices": [{"delta": {"content": text} if text else {}}]}
+
+        return chunks()
+
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", fake_acreate)
+    log_db = tmp_path / "gpt_logs.db"
+    service = GPTService(log_path=log_db, legacy_log_path=tmp_path / "log.json")
+
+    async def scenario() -> list:
+        parts = []
+        try:
+            async for part in service.astream_reflection("P", 1):
+                parts.append(part)
+                await asyncio.sleep(0.05)
+            return parts
+        finally:
+            await service.aclose()
+
+    assert asyncio.run(scenario()) == ["Du ", "schaffst ", "das."]
+    samples = latency.render().splitlines()
+    assert 'test_gpt_seconds_bucket{operation="stream",le="0.04"} 1' in samples
+    first = 'test_gpt_seconds_bucket{operation="stream_first_token",le="0.04"} 1'
+    assert first in samples
+    assert gpt_log.get_interactions(1, log_db)[0]["response"] == "Du schaffst das."
+
+
+def test_rate_limits_and_coalescing(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Identical in-flight requests of all users share a call; extras are limited."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    calls = []
+
+    async def fake_acreate(**kwargs: dict) -> dict:
+        calls.append(kwargs)
+        await asyncio.sleep(0.01)
+        return {"choices": [{"message": {"content": "Reflexion"}}]}
+
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", fake_acreate)
+    service = GPTService(
+        log_path=tmp_path / "gpt_logs.db",
+        legacy_log_path=tmp_path / "log.json",
+        user_limiter=KeyedRateLimiter(1, 0.001),
+    )
+
+    async def scenario() -> None:
+        try:
+            same = await asyncio.gather(
+                *(service.agenerate_reflection("Prompt", user_id=u) for u in (1, 1, 3))
+            )
+            assert same == ["Reflexion"] * 3
+            with pytest.raises(RateLimitExceeded):
+                await service.agenerate_reflection("Anders", user_id=1)
+            assert await service.agenerate_reflection("Anders", user_id=2)
+        finally:
+            await service.aclose()
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    log_db = tmp_path / "gpt_logs.db"
+    assert gpt_log.get_interactions(3, log_db)[0]["response"] == "Reflexion"
+
+
+def test_transient_errors_retry_then_fall_back(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Failing upstream calls are retried, open the circuit and fall back."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr("services.resilience.backoff_delays", lambda *_: iter([0, 0]))
+    calls = []
+
+    def failing_create(**kwargs: dict) -> dict:
+        calls.append(kwargs)
+        raise openai.error.ServiceUnavailableError("overloaded")
+
+    monkeypatch.setattr(openai.ChatCompletion, "create", failing_create)
+    service = GPTService(
+        log_path=tmp_path / "gpt_logs.db",
+        legacy_log_path=tmp_path / "log.json",
+        breaker=CircuitBreaker(failure_threshold=3),
+        fallback=TemplateFallback(),
+    )
+    first = service.generate_reflection("Prompt", user_id=1)
+    assert "nicht erreichbar" in first
+    assert len(calls) == 3
+    service.generate_reflection("Prompt", user_id=1)
+    assert len(calls) == 3
@@ -0,0 +1,48 @@
+"""Tests for :mod:`services.habit_history`."""
+
+from datetime import date
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.habit_history import HabitBitmap
+
+
+def _bitmap(*days: int) -> HabitBitmap:
+    return HabitBitmap.from_dates(date(2024, 1, 1), [date(2024, 1, d) for d in days])
+
+
+def test_history_rate_and_streaks() -> None:
+    """Window queries, rates and streaks are computed from the bitset."""
+    bitmap = _bitmap(1, 2, 3, 5, 6, 9, 10)
+    assert bitmap.history(4, date(2024, 1, 10)) == [False, False, True, True]
+    assert bitmap.render(4, date(2024, 1, 10)) == "□□■■"
+    assert bitmap.render(2, date(2024, 1, 10), done="✅", missed="✗") == "✅✅"
+    assert bitmap.count(date(2024, 1, 1), date(2024, 1, 10)) == 7
+    assert bitmap.completion_rate(10, date(2024, 1, 10)) == 0.7
+    assert bitmap.completion_rate(365, date(2024, 1, 10)) == 0.7
+    assert bitmap.current_streak(date(2024, 1, 10)) == 2
+    assert bitmap.current_streak(date(2024, 1, 11)) == 2
+    assert bitmap.current_streak(date(2024, 1, 12)) == 0
+    assert bitmap.longest_streak() == 3
+
+
+def test_with_day_extends_before_origin() -> None:
+    """Adding a day before the origin shifts the bitmap."""
+    bitmap = _bitmap(1).with_day(date(2023, 12, 31)).with_day(date(2024, 1, 3))
+    assert bitmap.origin == date(2023, 12, 31)
+    assert date(2024, 1, 1) in bitmap
+    assert date(2024, 1, 2) not in bitmap
+    assert bitmap.current_streak(date(2024, 1, 1)) == 2
+
+
+def test_heatmaps() -> None:
+    """Month and year heatmaps reflect completed days."""
+    bitmap = _bitmap(1, 2, 31)
+    month = bitmap.month_heatmap(2024, 1).splitlines()
+    assert month[0] == "Mo Di Mi Do Fr Sa So"
+    assert month[1].startswith("■  ■  □")
+    year = bitmap.year_heatmap(2024)
+    assert year[0] == (3, 31)
+    assert year[1] == (0, 29)
@@ -1,7 +1,8 @@
 """Tests for the habit tracking service."""
 
-from datetime import date
+from datetime import date, time, timedelta
 from pathlib import Path
+import sqlite3
 import sys
 
 import pytest
@@ -30,3 +31,175 @@ def test_streak_calculation(tmp_path) -> None:
     habit_service.complete_habit(1, habit_id, date(2024, 1, 2), db)
     streak = habit_service.get_habit_streak(1, habit_id, db)
     assert streak == 2
+
+
+def test_import_habit_logs_creates_habits_and_streaks(tmp_path) -> None:
+    """Imported logs create missing habits and update streaks once at the end."""
+    db = tmp_path / "habits.db"
+    habit_service.init_db(db)
+    records = [(1, "lesen", date(2024, 1, d)) for d in (3, 1, 2, 2)]
+    records.append((2, "laufen", date(2024, 1, 1)))
+    assert habit_service.import_habit_logs(records, batch_size=2, db_path=db) == 4
+    habits = habit_service.get_user_habits(1, db)
+    assert habits[0]["name"] == "lesen"
+    assert habits[0]["streak"] == 3
+    assert habit_service.get_user_habits(2, db)[0]["streak"] == 1
+
+
+def test_streak_resets_after_gap_and_keeps_longest(tmp_path) -> None:
+    """A gap restarts the streak while the longest run is remembered."""
+    db = tmp_path / "habits.db"
+    habit_service.init_db(db)
+    habit_id = habit_service.create_habit(1, "meditieren", db)
+    for day in (1, 2, 3, 5):
+        habit_service.complete_habit(1, habit_id, date(2024, 1, day), db)
+    assert habit_service.get_habit_streak(1, habit_id, db) == 1
+    habit_service.complete_habit(1, habit_id, date(2024, 1, 4), db)
+    assert habit_service.get_habit_streak(1, habit_id, db) == 5
+    with sqlite3.connect(db) as conn:
+        row = conn.execute(
+            "SELECT longest_streak, last_log_date FROM habits WHERE id = ?",
+            (habit_id,),
+        ).fetchone()
+    assert row == (5, "2024-01-05")
+
+
+def test_init_db_backfills_streak_columns(tmp_path) -> None:
+    """Databases without the streak columns are migrated from the log."""
+    db = tmp_path / "habits.db"
+    with sqlite3.connect(db) as conn:
+        conn.execute(
+            "CREATE TABLE habits (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "user_id INTEGER NOT NULL, name TEXT NOT NULL, "
+            "created_at DATETIME NOT NULL, streak INTEGER NOT NULL DEFAULT 0, "
+            "UNIQUE(user_id, name))"
+        )
+        conn.execute(
+            "CREATE TABLE habit_log (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "habit_id INTEGER NOT NULL, log_date DATE NOT NULL, "
+            "UNIQUE(habit_id, log_date))"
+        )
+        conn.execute(
+            "INSERT INTO habits (user_id, name, created_at) "
+            "VALUES (1, 'lesen', '2024-01-01T00:00:00')"
+        )
+        conn.executemany(
+            "INSERT INTO habit_log (habit_id, log_date) VALUES (1, ?)",
+            [("2024-01-01",), ("2024-01-02",), ("2024-01-04",)],
+        )
+    habit_service.init_db(db)
+    habit_service.complete_habit(1, 1, date(2024, 1, 5), db)
+    assert habit_service.get_habit_streak(1, 1, db) == 2
+
+
+def test_get_user_habits_history_window(tmp_path) -> None:
+    """History is returned for the requested window in one indexed query."""
+    db = tmp_path / "habits.db"
+    habit_service.init_db(db)
+    today = date.today()
+    first = habit_service.create_habit(1, "lesen", db)
+    habit_service.create_habit(1, "laufen", db)
+    for offset in (0, 3, 20):
+        habit_service.complete_habit(1, first, today - timedelta(days=offset), db)
+
+    week = habit_service.get_user_habits(1, db)
+    month = habit_service.get_user_habits(1, db, days=30)
+    assert week[0]["logs"] == {today, today - timedelta(days=3)}
+    assert len(month[0]["logs"]) == 3
+    assert week[1]["logs"] == set()
+
+    with sqlite3.connect(db) as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN " + habit_service._USER_HABITS_SQL,
+            (today.isoformat(), 1),
+        ).fetchall()
+    assert any("(habit_id=? AND log_date>?)" in row[-1] for row in plan)
+
+
+def test_complete_habit_by_name_ignores_case(tmp_path) -> None:
+    """Habits are found by name regardless of capitalization, umlauts included."""
+    db = tmp_path / "habits.db"
+    habit_service.init_db(db)
+    habit_service.create_habit(1, "Übung", db)
+    with pytest.raises(ValueError):
+        habit_service.create_habit(1, "ÜBUNG", db)
+    name, streak = habit_service.complete_habit_by_name(
+        1, "übung", date(2024, 1, 1), db
+    )
+    assert (name, streak) == ("Übung", 1)
+    assert habit_service.complete_habit_by_name(1, "ÜBUNG", date(2024, 1, 2), db) == (
+        "Übung",
+        2,
+    )
+    with pytest.raises(ValueError):
+        habit_service.complete_habit_by_name(2, "übung", db_path=db)
+
+
+def test_habit_overview_bitmap_follows_completions(tmp_path) -> None:
+    """Cached bitmaps stay in sync with completions and imports."""
+    db = tmp_path / "habits.db"
+    habit_service.init_db(db)
+    habit_id = habit_service.create_habit(1, "Lesen", db)
+    today = date.today()
+    habit_service.complete_habit(1, habit_id, today, db)
+    overview = habit_service.get_habit_overview(1, db_path=db)
+    assert today in overview[0]["history"]
+
+    yesterday = today - timedelta(days=1)
+    habit_service.complete_habit_by_name(1, "lesen", yesterday, db)
+    habit_service.import_habit_logs(
+        [(1, "Lesen", today - timedelta(days=400))], db_path=db
+    )
+    history = habit_service.get_habit_overview(1, "LESEN", db)[0]["history"]
+    assert history.current_streak(today) == 2
+    assert history.count(today - timedelta(days=400), today) == 3
+    assert habit_service.get_habit_overview(1, "fehlt", db) == []
+
+
+def test_recompute_streaks_resets_stale_runs(tmp_path) -> None:
+    """The batch job recomputes runs in chunks and resets stale streaks."""
+    db = tmp_path / "habits.db"
+    habit_service.init_db(db)
+    active = habit_service.create_habit(1, "lesen", db)
+    stale = habit_service.create_habit(1, "laufen", db)
+    unused = habit_service.create_habit(2, "yoga", db)
+    for day in (1, 2, 3, 5, 6, 9, 10):
+        habit_service.complete_habit(1, active, date(2024, 1, day), db)
+    for day in (1, 2):
+        habit_service.complete_habit(1, stale, date(2024, 1, day), db)
+    with sqlite3.connect(db) as conn:
+        conn.execute("UPDATE habits SET streak = 99, longest_streak = 99")
+
+    processed = habit_service.recompute_streaks(
+        today=date(2024, 1, 11), chunk_size=2, db_path=db
+    )
+    assert processed == 3
+    with sqlite3.connect(db) as conn:
+        rows = dict(
+            (r[0], r[1:])
+            for r in conn.execute(
+                "SELECT id, streak, longest_streak, last_log_date FROM habits"
+            )
+        )
+    assert rows[active] == (2, 3, "2024-01-10")
+    assert rows[stale] == (0, 2, "2024-01-02")
+    assert rows[unused] == (0, 0, None)
+
+
+def test_reminders_are_stored_and_paged(tmp_path) -> None:
+    """Reminders can be set, listed page by page and removed by habit name."""
+    db = tmp_path / "habits.db"
+    habit_service.init_db(db)
+    ids = [habit_service.create_habit(1, f"habit{i}", db) for i in range(3)]
+    for i in range(3):
+        habit_service.set_reminder(1, f"HABIT{i}", time(20, 0), 99, db)
+
+    first = habit_service.get_reminders(limit=2, db_path=db)
+    rest = habit_service.get_reminders(first[-1].habit_id, 2, db)
+    assert [r.habit_id for r in first + rest] == ids
+    assert first[0] == habit_service.Reminder(ids[0], 99, "habit0", time(20, 0))
+
+    assert habit_service.remove_reminder(1, "habit1", db) == ids[1]
+    assert habit_service.remove_reminder(1, "habit1", db) is None
+    with pytest.raises(ValueError):
+        habit_service.set_reminder(1, "unknown", time(8, 0), 99, db)
@@ -0,0 +1,71 @@
+"""Tests for the settings parsing in :mod:`bot.main`."""
+
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+sys.path.append(str(Path(__file__).resolve().parents[1] / "bot"))
+
+import main
+from main import WebhookConfig
+
+
+def _settings(monkeypatch: pytest.MonkeyPatch, **values: str) -> None:
+    """Make ``_load_setting`` see exactly ``values``, ignoring env and ``.env``."""
+    monkeypatch.setattr(main, "_load_setting", values.get)
+
+
+def test_webhook_config_modes_and_defaults(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Polling is the default; webhook mode fills in optional settings."""
+    _settings(monkeypatch)
+    assert main._load_webhook_config() is None
+    _settings(monkeypatch, BOT_MODE="Polling")
+    assert main._load_webhook_config() is None
+
+    _settings(
+        monkeypatch,
+        BOT_MODE="webhook",
+        WEBHOOK_URL="https://bot.example.com/",
+        WEBHOOK_SECRET="abc_DEF-123",
+        WEBHOOK_PORT="8080",
+    )
+    config = main._load_webhook_config()
+    assert config == WebhookConfig(
+        url="https://bot.example.com/", secret="abc_DEF-123", port=8080
+    )
+    assert config.webhook_url == "https://bot.example.com/telegram"
+
+
+@pytest.mark.parametrize(
+    "values, message",
+    [
+        ({"BOT_MODE": "push"}, "Unknown BOT_MODE"),
+        ({"BOT_MODE": "webhook", "WEBHOOK_URL": "https://x"}, "WEBHOOK_SECRET"),
+        (
+            {
+                "BOT_MODE": "webhook",
+                "WEBHOOK_URL": "https://x",
+                "WEBHOOK_SECRET": "a b",
+            },
+            "may only contain",
+        ),
+        (
+            {
+                "BOT_MODE": "webhook",
+                "WEBHOOK_URL": "https://x",
+                "WEBHOOK_SECRET": "s",
+                "WEBHOOK_MAX_CONNECTIONS": "many",
+            },
+            "must be numbers",
+        ),
+    ],
+)
+def test_webhook_config_rejects_invalid_settings(
+    monkeypatch: pytest.MonkeyPatch, values: dict, message: str
+) -> None:
+    """Unknown modes, missing secrets, bad secrets and non-numbers fail early."""
+    _settings(monkeypatch, **values)
+    with pytest.raises(RuntimeError, match=message):
+        main._load_webhook_config()
@@ -0,0 +1,123 @@
+"""Tests for :mod:`services.metrics`."""
+
+import asyncio
+from pathlib import Path
+import sqlite3
+from types import SimpleNamespace
+from urllib.request import urlopen
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bot import handler
+from services import async_db, metrics
+
+
+def test_histogram_quantiles_and_exposition() -> None:
+    """Quantiles are interpolated within buckets and rendered cumulatively."""
+    histogram = metrics.Histogram("test_seconds", "Test.", ["op"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 2.0):
+        histogram.observe(value, op="read")
+
+    assert histogram.count(op="read") == 4
+    assert histogram.quantile(0.5, ("read",)) == pytest.approx(0.1)
+    assert histogram.quantile(0.75, ("read",)) == pytest.approx(1.0)
+    assert histogram.quantile(0.99, ("read",)) == 1.0
+    lines = histogram.render().splitlines()
+    assert 'test_seconds_bucket{op="read",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{op="read",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{op="read"} 4' in lines
+
+
+def test_label_values_are_escaped() -> None:
+    """Backslashes, quotes and newlines in label values are escaped."""
+    counter = metrics.Counter("test_total", "Test.", ["op"])
+    counter.inc(op='a\\b"c\nd')
+
+    assert counter.samples() == ['test_total{op="a\\\\b\\"c\\nd"} 1']
+
+
+def test_instrument_handler_records_latency_errors_and_in_flight() -> None:
+    """Decorated handlers are timed; exceptions are counted and re-raised."""
+    seen_in_flight = []
+
+    @metrics.instrument_handler
+    async def probe_ok() -> None:
+        seen_in_flight.append(metrics.HANDLER_IN_FLIGHT.value(handler="probe_ok"))
+
+    @metrics.instrument_handler
+    async def probe_fail() -> None:
+        raise ValueError("boom")
+
+    asyncio.run(probe_ok())
+    with pytest.raises(ValueError):
+        asyncio.run(probe_fail())
+
+    assert seen_in_flight == [1]
+    assert metrics.HANDLER_IN_FLIGHT.value(handler="probe_ok") == 0
+    assert metrics.HANDLER_LATENCY.count(handler="probe_ok") == 1
+    assert metrics.HANDLER_ERRORS.value(handler="probe_ok") == 0
+    assert metrics.HANDLER_ERRORS.value(handler="probe_fail") == 1
+    assert "bot_handler_seconds[probe_fail] n=1" in metrics.summary()
+
+
+def test_cancelled_handlers_are_not_counted_as_errors() -> None:
+    """Cancelling a handler releases its in-flight slot without an error."""
+
+    @metrics.instrument_handler
+    async def probe_cancel() -> None:
+        await asyncio.sleep(10)
+
+    async def scenario() -> None:
+        task = asyncio.create_task(probe_cancel())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+
+    assert metrics.HANDLER_ERRORS.value(handler="probe_cancel") == 0
+    assert metrics.HANDLER_IN_FLIGHT.value(handler="probe_cancel") == 0
+    assert metrics.HANDLER_LATENCY.count(handler="probe_cancel") == 1
+
+
+def test_http_server_serves_metrics() -> None:
+    """The endpoint returns the Prometheus text format under ``/metrics``."""
+    metrics.DB_LATENCY.observe(0.002, operation="mood_service.save_mood")
+    server = metrics.start_http_server(0, "127.0.0.1")
+    try:
+        port = server.server_address[1]
+        with urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            body = response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert "# TYPE bot_db_seconds histogram" in body
+    assert 'bot_db_seconds_count{operation="mood_service.save_mood"}' in body
+
+
+def test_handled_failures_are_counted(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Errors a handler catches and answers still show up as handler errors."""
+    replies = []
+
+    async def reply_text(text: str) -> None:
+        replies.append(text)
+
+    async def broken_summary(user_id: int) -> None:
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(async_db, "get_mood_summary", broken_summary)
+    update = SimpleNamespace(
+        effective_user=SimpleNamespace(id=1),
+        message=SimpleNamespace(reply_text=reply_text),
+    )
+    before = metrics.HANDLER_ERRORS.value(handler="moodstats")
+
+    asyncio.run(handler.moodstats(update, SimpleNamespace(args=[])))
+
+    assert "Fehler" in replies[0]
+    assert metrics.HANDLER_ERRORS.value(handler="moodstats") == before + 1
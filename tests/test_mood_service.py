@@ -1,7 +1,11 @@
 """Tests for the mood tracking service."""
 
+import csv
 from datetime import date, datetime
+import gzip
+import io
 from pathlib import Path
+import sqlite3
 import sys
 
 import pytest
@@ -29,3 +33,132 @@ def test_duplicate_mood_raises(tmp_path) -> None:
     mood_service.save_mood(1, "gut", now, db)
     with pytest.raises(ValueError):
         mood_service.save_mood(1, "schlecht", now, db)
+
+
+def test_init_db_migrates_legacy_table(tmp_path) -> None:
+    """Databases without the ``day`` column are backfilled and deduplicated."""
+    db_file = tmp_path / "mood.db"
+    with sqlite3.connect(db_file) as conn:
+        conn.execute(
+            "CREATE TABLE moods (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "user_id INTEGER NOT NULL, mood TEXT NOT NULL, "
+            "timestamp DATETIME NOT NULL)"
+        )
+        conn.executemany(
+            "INSERT INTO moods (user_id, mood, timestamp) VALUES (?, ?, ?)",
+            [
+                (1, "gut", "2024-01-01T08:00:00"),
+                (1, "schlecht", "2024-01-01T20:00:00"),
+                (1, "ok", "2024-01-02T09:00:00"),
+            ],
+        )
+    mood_service.init_db(db_file)
+    moods = mood_service.get_moods(1, date(2024, 1, 1), date(2024, 1, 2), db_file)
+    assert [m for _, m in moods] == ["gut", "ok"]
+    with pytest.raises(ValueError):
+        mood_service.save_mood(1, "neu", datetime(2024, 1, 2, 22, 0), db_file)
+
+
+def test_range_query_uses_day_index(tmp_path) -> None:
+    """The weekly range query is answered through the ``(user_id, day)`` index."""
+    db_file = tmp_path / "mood.db"
+    mood_service.init_db(db_file)
+    with sqlite3.connect(db_file) as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT timestamp, mood FROM moods "
+            "WHERE user_id = ? AND day BETWEEN ? AND ? ORDER BY day ASC",
+            (1, "2024-01-01", "2024-01-07"),
+        ).fetchall()
+    assert any("idx_moods_user_day" in row[-1] for row in plan)
+
+
+def test_export_moods_streams_selected_users(tmp_path) -> None:
+    """Exports cover the requested users and can be gzip-compressed."""
+    db_file = tmp_path / "mood.db"
+    mood_service.init_db(db_file)
+    for user_id in (1, 2, 3):
+        for day in (1, 2):
+            mood_service.save_mood(
+                user_id, f"m{user_id}{day}", datetime(2024, 1, day, 9, 0), db_file
+            )
+
+    plain = tmp_path / "moods.csv"
+    assert mood_service.export_moods(plain, chunk_size=2, db_path=db_file) == 6
+    assert plain.read_text(encoding="utf-8").splitlines()[1] == (
+        "1,2024-01-01T09:00:00,m11"
+    )
+
+    buffer = io.BytesIO()
+    count = mood_service.export_moods(
+        buffer, user_ids=[3, 1], compress=True, db_path=db_file
+    )
+    rows = list(csv.reader(io.StringIO(gzip.decompress(buffer.getvalue()).decode())))
+    assert count == 4
+    assert [row[2] for row in rows[1:]] == ["m31", "m32", "m11", "m12"]
+
+
+def test_import_moods_skips_existing_days(tmp_path) -> None:
+    """Bulk imports insert in batches and ignore days that already have a mood."""
+    db_file = tmp_path / "mood.db"
+    mood_service.init_db(db_file)
+    mood_service.save_mood(1, "gut", datetime(2024, 1, 1, 9, 0), db_file)
+    records = [(1, f"m{d}", datetime(2024, 1, d, 10, 0)) for d in range(1, 6)]
+    assert mood_service.import_moods(records, batch_size=2, db_path=db_file) == 4
+    moods = mood_service.get_moods(1, date(2024, 1, 1), date(2024, 1, 5), db_file)
+    assert [m for _, m in moods] == ["gut", "m2", "m3", "m4", "m5"]
+
+
+def test_mood_summary_rolls_forward(tmp_path) -> None:
+    """The stored summary tracks the trailing window as new moods arrive."""
+    db_file = tmp_path / "mood.db"
+    mood_service.init_db(db_file)
+    for day, mood in [(1, "gut"), (3, "ok"), (8, "gut"), (9, "schlecht")]:
+        mood_service.save_mood(1, mood, datetime(2024, 1, day, 9, 0), db_file)
+
+    summary = mood_service.get_mood_summary(1, db_file)
+    assert summary.last == (datetime(2024, 1, 9, 9, 0), "schlecht")
+    assert summary.counts(date(2024, 1, 9)) == {"ok": 1, "gut": 1, "schlecht": 1}
+    assert summary.counts(date(2024, 1, 14)) == {"gut": 1, "schlecht": 1}
+
+    mood_service.save_mood(1, "super", datetime(2024, 1, 7, 9, 0), db_file)
+    summary = mood_service.get_mood_summary(1, db_file)
+    assert [m for _, m in summary.window(date(2024, 1, 9))] == [
+        "ok", "super", "gut", "schlecht"
+    ]
+
+
+def test_mood_summary_rebuilt_after_import(tmp_path) -> None:
+    """Bulk imports invalidate summaries, which are rebuilt from ``moods``."""
+    db_file = tmp_path / "mood.db"
+    mood_service.init_db(db_file)
+    mood_service.save_mood(1, "gut", datetime(2024, 1, 5, 9, 0), db_file)
+    assert mood_service.get_mood_summary(1, db_file).counts(date(2024, 1, 5)) == {
+        "gut": 1
+    }
+    mood_service.import_moods(
+        [(1, "ok", datetime(2024, 1, 4, 9, 0))], db_path=db_file
+    )
+    summary = mood_service.get_mood_summary(1, db_file)
+    assert summary.counts(date(2024, 1, 5)) == {"ok": 1, "gut": 1}
+    assert mood_service.get_mood_summary(2, db_file).last is None
+
+
+def test_record_mood_returns_previous_and_window(tmp_path) -> None:
+    """``record_mood`` reports the prior entry and the updated week at once."""
+    db_file = tmp_path / "mood.db"
+    mood_service.init_db(db_file)
+    previous, summary = mood_service.record_mood(
+        1, "gut", datetime(2024, 1, 1, 9, 0), db_file
+    )
+    assert previous is None
+    previous, summary = mood_service.record_mood(
+        1, "ok", datetime(2024, 1, 2, 9, 0), db_file
+    )
+    assert previous == (datetime(2024, 1, 1, 9, 0), "gut")
+    assert summary.window(date(2024, 1, 2)) == [
+        (date(2024, 1, 1), "gut"),
+        (date(2024, 1, 2), "ok"),
+    ]
+    with pytest.raises(ValueError):
+        mood_service.record_mood(1, "nochmal", datetime(2024, 1, 2, 20, 0), db_file)
+    assert mood_service.get_mood_summary(1, db_file).last[1] == "ok"
@@ -0,0 +1,30 @@
+"""Tests for :mod:`services.prompts`."""
+
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.prompts import PromptRegistry
+
+
+def test_messages_do_not_repeat_user_prompt() -> None:
+    """The user prompt is only sent once and the system prompt is reused."""
+    registry = PromptRegistry()
+    messages, tokens = registry.build_messages("Stimmung: gut.", "analytisch", 100)
+    assert "Stimmung: gut." not in messages[0]["content"]
+    assert "analytisch" in messages[0]["content"]
+    assert messages[1]["content"] == "Stimmung: gut."
+    assert tokens >= registry.count_tokens(messages[0]["content"])
+    assert registry.system_prompt("analytisch") is registry.system_prompt("analytisch")
+    assert registry.get("reflection_prompt").sections["Frage"]
+
+
+def test_truncate_respects_budget() -> None:
+    """Long user text is cut to the token budget."""
+    registry = PromptRegistry()
+    text = "sehr " * 500
+    cut = registry.truncate(text, 50)
+    assert registry.count_tokens(cut) <= 50
+    assert cut.endswith("…")
+    assert registry.truncate("kurz", 50) == "kurz"
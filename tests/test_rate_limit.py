@@ -0,0 +1,59 @@
+"""Tests for :mod:`services.rate_limit`."""
+
+import asyncio
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.rate_limit import KeyedRateLimiter, SingleFlight, TokenBucket
+
+
+def test_token_bucket_reserve_spaces_out_requests() -> None:
+    """Reservations beyond the burst size return increasing delays."""
+    now = [0.0]
+    bucket = TokenBucket(2, 2, clock=lambda: now[0])
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.5
+    assert not bucket.try_acquire()
+    now[0] = 1.0
+    assert bucket.try_acquire()
+
+
+def test_keyed_limiter_separates_keys_and_bounds_memory() -> None:
+    """Each key has its own budget and old buckets are dropped."""
+    limiter = KeyedRateLimiter(1, 0.001, max_keys=2, clock=lambda: 0.0)
+    assert limiter.try_acquire("a")
+    assert not limiter.try_acquire("a")
+    assert limiter.try_acquire("b")
+    assert limiter.try_acquire("c")
+    assert limiter.try_acquire("a")
+
+
+def test_single_flight_shares_result_and_errors() -> None:
+    """Concurrent callers with the same key share one call."""
+    flight = SingleFlight()
+    calls = []
+
+    async def work() -> str:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def failing() -> str:
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario() -> None:
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(3)))
+        assert results == ["done"] * 3
+        assert len(calls) == 1
+        outcomes = await asyncio.gather(
+            flight.do("k", failing), flight.do("k", failing), return_exceptions=True
+        )
+        assert all(isinstance(o, ValueError) for o in outcomes)
+
+    asyncio.run(scenario())
@@ -0,0 +1,36 @@
+"""Tests for :mod:`bot.reflect_handler`."""
+
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bot import reflect_handler
+from services.container import container
+
+
+def test_reflect_replies_when_gpt_service_cannot_be_built() -> None:
+    """Any factory error is answered instead of leaving the user waiting."""
+    replies = []
+
+    async def reply_text(text: str) -> None:
+        replies.append(text)
+
+    def broken_factory() -> None:
+        raise ImportError("openai")
+
+    update = SimpleNamespace(
+        effective_user=SimpleNamespace(id=1),
+        message=SimpleNamespace(reply_text=reply_text),
+    )
+    container.register("gpt", broken_factory)
+    try:
+        asyncio.run(reflect_handler.reflect(update, SimpleNamespace(args=[])))
+    finally:
+        container.register("gpt", reflect_handler._create_gpt_service)
+
+    assert replies == [
+        "Die Reflexion ist gerade nicht verfügbar. Bitte versuche es später."
+    ]
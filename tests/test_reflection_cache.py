@@ -0,0 +1,56 @@
+"""Tests for :mod:`services.reflection_cache`."""
+
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services import db
+from services.reflection_cache import ReflectionCache, make_key
+
+
+def test_key_normalizes_prompt() -> None:
+    """Case and whitespace differences map to the same key."""
+    a = make_key("gpt", "analytisch", "Stimmung: gut.  Nutzertext: ")
+    b = make_key("gpt", "analytisch", "stimmung: gut. nutzertext:")
+    assert a == b
+    assert a != make_key("gpt", "humorvoll", "stimmung: gut. nutzertext:")
+
+
+def test_ttl_lru_and_persistence(tmp_path) -> None:
+    """Entries expire, the least recently used is evicted and data survives."""
+    now = [0.0]
+    db = tmp_path / "cache.db"
+    cache = ReflectionCache(max_size=2, ttl=10, db_path=db, clock=lambda: now[0])
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    now[0] = 5.0
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    restored = ReflectionCache(max_size=2, ttl=10, db_path=db, clock=lambda: now[0])
+    assert restored.get("c") == "C"
+    now[0] = 12.0
+    assert restored.get("c") == "C"
+    assert restored.get("a") is None
+
+
+def test_put_prunes_persisted_rows(tmp_path) -> None:
+    """The table keeps at most ``max_size`` unexpired rows while running."""
+    now = [0.0]
+    db_path = tmp_path / "cache.db"
+    cache = ReflectionCache(max_size=2, ttl=10, db_path=db_path, clock=lambda: now[0])
+    for second, key in enumerate("abc"):
+        now[0] = float(second)
+        cache.put(key, key.upper())
+    with db.connect(db_path) as conn:
+        keys = [row[0] for row in conn.execute("SELECT key FROM reflection_cache")]
+    assert sorted(keys) == ["b", "c"]
+
+    now[0] = 15.0
+    cache.put("d", "D")
+    with db.connect(db_path) as conn:
+        keys = [row[0] for row in conn.execute("SELECT key FROM reflection_cache")]
+    assert keys == ["d"]
@@ -0,0 +1,187 @@
+"""Tests for the habit reminder scheduler."""
+
+import asyncio
+from datetime import datetime, time, timedelta
+from pathlib import Path
+import sys
+
+import pytest
+from telegram.error import Forbidden, RetryAfter, TelegramError
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bot.reminders import DeliveryLimiter, ReminderScheduler
+from services import async_db, habit_service
+from services.habit_service import Reminder
+
+
+class FakeClock:
+    """Monotonic clock that only advances when the limiter sleeps."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps = []
+        self.on_sleep = None
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        if self.on_sleep is not None:
+            self.on_sleep()
+            self.on_sleep = None
+        self.now += seconds
+
+
+class FakeBot:
+    """Records sent messages and raises the queued errors first."""
+
+    def __init__(self, clock=None, errors=()) -> None:
+        self.clock = clock
+        self.errors = list(errors)
+        self.sent = []
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        self.sent.append((chat_id, self.clock() if self.clock else None))
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+@pytest.fixture
+def habit_db(tmp_path):
+    """Point the facade at a temporary habit database."""
+    path = tmp_path / "habits.db"
+    habit_service.init_db(path)
+    previous = async_db.habit_db_path
+    async_db.configure(habit_db=path)
+    yield path
+    async_db.shutdown()
+    async_db.configure(habit_db=previous)
+
+
+def test_scheduler_pops_due_reminders_and_reschedules() -> None:
+    """Due reminders fire once per day; cancelled ones are skipped."""
+
+    async def scenario() -> None:
+        now = [datetime(2024, 1, 1, 7, 0)]
+        scheduler = ReminderScheduler(bot=None, clock=lambda: now[0])
+        morning = Reminder(1, 10, "lesen", time(8, 0))
+        evening = Reminder(2, 10, "laufen", time(20, 0))
+        scheduler.schedule(morning)
+        scheduler.schedule(evening)
+        scheduler.schedule(Reminder(3, 11, "yoga", time(8, 0)))
+        scheduler.cancel(3)
+
+        assert scheduler.pop_due() == []
+        now[0] = datetime(2024, 1, 1, 8, 0)
+        assert scheduler.pop_due() == [morning]
+        assert scheduler.pop_due() == []
+        now[0] = datetime(2024, 1, 2, 8, 0)
+        assert scheduler.pop_due() == [evening, morning]
+
+    asyncio.run(scenario())
+
+
+def test_limiter_spaces_messages_per_chat_and_globally() -> None:
+    """Each chat gets one message per interval and all chats share the rate."""
+    clock = FakeClock()
+    limiter = DeliveryLimiter(
+        per_second=2, chat_interval=1.0, clock=clock, sleep=clock.sleep
+    )
+
+    async def scenario():
+        released = []
+        for chat_id in (1, 2, 3, 1):
+            await limiter.wait(chat_id)
+            released.append((chat_id, clock.now))
+        return released
+
+    released = asyncio.run(scenario())
+
+    assert released == [(1, 0.0), (2, 0.0), (3, 0.5), (1, 1.0)]
+
+
+def test_limiter_honours_pause_started_while_waiting() -> None:
+    """A pause set during the global wait still holds the message back."""
+    clock = FakeClock()
+    limiter = DeliveryLimiter(per_second=1, clock=clock, sleep=clock.sleep)
+
+    async def scenario():
+        await limiter.wait(1)
+        clock.on_sleep = lambda: limiter.pause(5)
+        await limiter.wait(2)
+
+    asyncio.run(scenario())
+
+    assert clock.now == 5.0
+    assert clock.sleeps == [1.0, 4.0]
+
+
+def test_deliver_retries_once_after_flood_control() -> None:
+    """RetryAfter pauses delivery and the message is retried only once."""
+    clock = FakeClock()
+    limiter = DeliveryLimiter(clock=clock, sleep=clock.sleep)
+    reminder = Reminder(1, 10, "lesen", time(8, 0))
+    bot = FakeBot(clock, [RetryAfter(timedelta(seconds=3))])
+    stubborn = FakeBot(clock, [RetryAfter(timedelta(seconds=3)), RetryAfter(timedelta(seconds=3))])
+
+    async def scenario():
+        await ReminderScheduler(bot, limiter)._deliver(reminder)
+        await ReminderScheduler(stubborn, limiter)._deliver(reminder)
+
+    asyncio.run(scenario())
+
+    assert [at for _, at in bot.sent] == [0.0, 3.0]
+    assert len(stubborn.sent) == 2
+    assert stubborn.sent[1][1] - stubborn.sent[0][1] >= 3.0
+
+
+def test_deliver_gives_up_on_telegram_errors() -> None:
+    """Other Telegram errors are logged and not retried."""
+    clock = FakeClock()
+    bot = FakeBot(clock, [TelegramError("Bad Request")])
+    limiter = DeliveryLimiter(clock=clock, sleep=clock.sleep)
+    scheduler = ReminderScheduler(bot, limiter)
+
+    asyncio.run(scheduler._deliver(Reminder(1, 10, "lesen", time(8, 0))))
+
+    assert len(bot.sent) == 1
+
+
+def test_forbidden_deletes_stored_reminder(habit_db) -> None:
+    """A chat that blocked the bot loses its reminder in memory and on disk."""
+
+    async def scenario():
+        await async_db.create_habit(1, "lesen")
+        reminder = await async_db.set_reminder(1, "lesen", time(8, 0), 10)
+        bot = FakeBot(errors=[Forbidden("bot was blocked by the user")])
+        scheduler = ReminderScheduler(bot)
+        scheduler.schedule(reminder)
+        await scheduler._deliver(reminder)
+        return scheduler, reminder, await async_db.get_reminders()
+
+    scheduler, reminder, stored = asyncio.run(scenario())
+
+    assert stored == []
+    assert reminder.habit_id not in scheduler._active
+
+
+def test_senders_drain_the_queue(habit_db) -> None:
+    """The sender tasks deliver every queued reminder exactly once."""
+    bot = FakeBot()
+
+    async def scenario():
+        limiter = DeliveryLimiter(per_second=1000, chat_interval=0.0)
+        scheduler = ReminderScheduler(bot, limiter, workers=3)
+        await scheduler.start()
+        for habit_id in range(1, 21):
+            scheduler._queue.put_nowait(
+                Reminder(habit_id, habit_id, "lesen", time(8, 0))
+            )
+        await asyncio.wait_for(scheduler._queue.join(), 5)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+
+    assert sorted(chat_id for chat_id, _ in bot.sent) == list(range(1, 21))
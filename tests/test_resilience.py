@@ -0,0 +1,56 @@
+"""Tests for :mod:`services.resilience`."""
+
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.resilience import CircuitBreaker, TemplateFallback, retry_call
+
+
+def test_retry_call_retries_only_transient_errors() -> None:
+    """Transient errors are retried up to the limit, others are raised."""
+    attempts = []
+
+    def flaky() -> str:
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("down")
+        return "ok"
+
+    assert retry_call(flaky, lambda e: isinstance(e, ConnectionError), 2, 0) == "ok"
+    attempts.clear()
+    with pytest.raises(ConnectionError):
+        retry_call(flaky, lambda e: isinstance(e, ConnectionError), 1, 0)
+    with pytest.raises(ValueError):
+        retry_call(lambda: int("x"), lambda e: False, 5, 0)
+
+
+def test_circuit_breaker_opens_and_recovers() -> None:
+    """The circuit opens after failures and closes after a good trial call."""
+    now = [0.0]
+    breaker = CircuitBreaker(2, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    now[0] = 10.0
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    now[0] = 20.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_template_fallback_uses_question(tmp_path) -> None:
+    """The fallback quotes the question of the prompt template."""
+    template = tmp_path / "prompt.txt"
+    template.write_text('Ziel: X\nFrage: "Was war heute gut?"\n', encoding="utf-8")
+    text = TemplateFallback(template).render("analytisch")
+    assert "Was war heute gut?" in text
+    assert TemplateFallback(tmp_path / "missing.txt").question